@@ -2,27 +2,65 @@ from typing import Annotated
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 
-from app.db.core import get_session
-from app.db.models import User, Account
+from app.db.core import get_session, get_read_session
 from app.auth.jwt import decode_token
+from app.auth.principal import Principal
+from app.deps import principals
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")  # паттерн bearer в FastAPI [web:467]
 
-async def get_current_user(
-    token: Annotated[str, Depends(oauth2_scheme)],
-    session: AsyncSession = Depends(get_session),
-) -> tuple[User, Account]:
+
+async def _load_user_account(token: str, session: AsyncSession) -> Principal:
     payload = decode_token(token)
     user_id = int(payload["sub"])
 
-    user = (await session.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
+    # снимки из кэша principals (TTL), на промахе — один запрос users JOIN accounts
+    user, acc = await principals.principal(session, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-
-    acc = (await session.execute(select(Account).where(Account.user_id == user_id))).scalar_one_or_none()
     if not acc:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Account not found")
 
     return user, acc
+
+
+async def _load_account_id(token: str, session: AsyncSession) -> int:
+    user_id = int(decode_token(token)["sub"])
+    acc_id = await principals.account_id(session, user_id)
+    if acc_id is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Account not found")
+    return acc_id
+
+
+async def get_current_user(
+    token: Annotated[str, Depends(oauth2_scheme)],
+    session: AsyncSession = Depends(get_session),
+) -> Principal:
+    return await _load_user_account(token, session)
+
+
+async def get_current_user_read(
+    token: Annotated[str, Depends(oauth2_scheme)],
+    session: AsyncSession = Depends(get_read_session),
+) -> Principal:
+    """
+    Для читающих роутеров: та же сессия, что и у роута (Depends кэшируется
+    в рамках запроса), поэтому запрос держит одно соединение, а не два.
+    """
+    return await _load_user_account(token, session)
+
+
+async def get_current_account_id(
+    token: Annotated[str, Depends(oauth2_scheme)],
+    session: AsyncSession = Depends(get_session),
+) -> int:
+    """Лёгкий вариант для роутов, которым нужен только id счёта: без загрузки пользователя."""
+    return await _load_account_id(token, session)
+
+
+async def get_current_account_id_read(
+    token: Annotated[str, Depends(oauth2_scheme)],
+    session: AsyncSession = Depends(get_read_session),
+) -> int:
+    return await _load_account_id(token, session)
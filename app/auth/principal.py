@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import User, Account
+
+
+@dataclass(frozen=True, slots=True)
+class CachedUser:
+    id: int
+    telegram_id: int
+    username: str | None
+    first_name: str | None
+    last_name: str | None
+    photo_url: str | None
+    created_at: datetime | None
+
+
+@dataclass(frozen=True, slots=True)
+class CachedAccount:
+    id: int
+    user_id: int
+    cash: float
+    realized_pnl: float
+    realized_pnl_fifo: float
+
+
+Principal = tuple[CachedUser, CachedAccount]
+
+_USER_COLS = (User.id, User.telegram_id, User.username, User.first_name, User.last_name, User.photo_url, User.created_at)
+_ACC_COLS = (Account.id, Account.user_id, Account.cash, Account.realized_pnl, Account.realized_pnl_fifo)
+
+
+async def load_principal(session: AsyncSession, user_id: int) -> tuple[CachedUser | None, CachedAccount | None]:
+    # пользователь и счёт одним запросом (outer join — чтобы отличать "нет счёта" от "нет пользователя")
+    row = (await session.execute(
+        select(*_USER_COLS, *_ACC_COLS).outerjoin(Account, Account.user_id == User.id).where(User.id == user_id)
+    )).first()
+    if row is None:
+        return None, None
+    n = len(_USER_COLS)
+    user = CachedUser(*row[:n])
+    acc_id, acc_user, cash, rpnl, rpnl_fifo = row[n:]
+    if acc_id is None:
+        return user, None
+    return user, CachedAccount(acc_id, acc_user, float(cash or 0.0), float(rpnl or 0.0), float(rpnl_fifo or 0.0))
+
+
+async def load_account_id(session: AsyncSession, user_id: int) -> int | None:
+    return (await session.execute(select(Account.id).where(Account.user_id == user_id))).scalar_one_or_none()
+
+
+@dataclass
+class _Entry:
+    expires: float
+    account_id: int
+    principal: Principal | None  # None — известен только account_id (лёгкий вариант)
+
+
+class PrincipalCache:
+    """
+    user_id -> (пользователь, счёт) в памяти процесса: LRU на max_size записей с TTL.
+    Сбрасывается при логине (профиль) и после сделок/исполнений (cash в снимке счёта);
+    в других воркерах устаревание ограничено TTL. ttl_s <= 0 — кэш выключен.
+    """
+
+    def __init__(self, *, ttl_s: float, max_size: int) -> None:
+        self.ttl_s = ttl_s
+        self.max_size = max_size
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()
+        self._by_account: dict[int, int] = {}
+        # растёт на каждом сбросе: загрузка, начатая до сброса, в кэш не кладётся
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get(self, user_id: int) -> _Entry | None:
+        e = self._entries.get(user_id)
+        if e is not None and e.expires < time.monotonic():
+            del self._entries[user_id]
+            self._by_account.pop(e.account_id, None)
+            e = None
+        if e is not None:
+            self._entries.move_to_end(user_id)
+        return e
+
+    def _put(self, user_id: int, account_id: int, principal: Principal | None, epoch: int) -> None:
+        if self.ttl_s <= 0 or epoch != self._epoch:
+            return
+        self._entries[user_id] = _Entry(time.monotonic() + self.ttl_s, account_id, principal)
+        self._entries.move_to_end(user_id)
+        self._by_account[account_id] = user_id
+        while len(self._entries) > self.max_size:
+            _, old = self._entries.popitem(last=False)
+            self._by_account.pop(old.account_id, None)
+
+    async def principal(self, session: AsyncSession, user_id: int) -> tuple[CachedUser | None, CachedAccount | None]:
+        e = self._get(user_id)
+        if e is not None and e.principal is not None:
+            self.hits += 1
+            return e.principal
+        self.misses += 1
+        epoch = self._epoch
+        user, acc = await load_principal(session, user_id)
+        if acc is not None:
+            self._put(user_id, acc.id, (user, acc), epoch)
+        return user, acc
+
+    async def account_id(self, session: AsyncSession, user_id: int) -> int | None:
+        e = self._get(user_id)
+        if e is not None:
+            self.hits += 1
+            return e.account_id
+        self.misses += 1
+        epoch = self._epoch
+        acc_id = await load_account_id(session, user_id)
+        if acc_id is not None:
+            self._put(user_id, acc_id, None, epoch)
+        return acc_id
+
+    def invalidate(self, user_id: int) -> None:
+        self._epoch += 1
+        e = self._entries.pop(user_id, None)
+        if e is not None:
+            self._by_account.pop(e.account_id, None)
+
+    def invalidate_account(self, account_id: int) -> None:
+        user_id = self._by_account.get(account_id)
+        if user_id is not None:
+            self.invalidate(user_id)
+        else:
+            self._epoch += 1
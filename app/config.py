@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -13,7 +15,57 @@ class Settings(BaseSettings):
     JWT_EXPIRE_MINUTES: int = 60
     
     DB_URL: str
-    
+    # необязательная read-реплика: если не задана, чтение идёт в основную БД
+    DB_READ_URL: str | None = None
+
+    # пул соединений (одинаковый для primary и реплики)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    # "ping" — pre_ping на каждый checkout, "recycle" — полагаться только на DB_POOL_RECYCLE
+    DB_POOL_PRE_PING: Literal["ping", "recycle"] = "ping"
+
+    # bulk upsert режет VALUES на пачки не больше этого размера (оценка в байтах)
+    BULK_MAX_BYTES: int = 1_000_000
+    # LOAD DATA LOCAL INFILE для больших импортов свечей (нужен local_infile=ON на сервере)
+    DB_LOCAL_INFILE: bool = False
+
+    # "journal" — групповой коммит рыночных заявок (только при одном воркере!)
+    TRADE_INGEST_MODE: Literal["direct", "journal"] = "direct"
+    TRADE_JOURNAL_MAX_DELAY_MS: float = 5.0
+    TRADE_JOURNAL_MAX_BATCH: int = 500
+    # как часто докладывать новые сделки в trade_rollups (/api/stats/trading); 0 — не в приложении,
+    # тогда python -m app.jobs.trade_rollups --fold по расписанию
+    ROLLUP_FOLD_INTERVAL_S: float = 10.0
+
+    # кэш пользователя/счёта для get_current_user (в памяти воркера); 0 — выключен
+    AUTH_CACHE_TTL_S: float = 30.0
+    AUTH_CACHE_SIZE: int = 10_000
+
+    # общий кэш воркеров (popular-today, лидерборд): memory — свой в каждом процессе,
+    # mmap — файл на tmpfs для воркеров одного хоста, redis — внешний
+    CACHE_BACKEND: Literal["memory", "mmap", "redis"] = "memory"
+    CACHE_MEMORY_MAX_ENTRIES: int = 10_000
+    CACHE_MMAP_PATH: str = "/dev/shm/akkb-cache"
+    CACHE_MMAP_SLOTS: int = 4096
+    CACHE_MMAP_SLOT_BYTES: int = 65536
+    CACHE_REDIS_URL: str = "redis://127.0.0.1:6379/0"
+
+    # готовые ответы /market/candles и /market/line в памяти процесса: лимит по байтам тел,
+    # тела от CANDLE_RESPONSE_GZIP_MIN_BYTES хранятся в gzip (0 — без сжатия)
+    CANDLE_RESPONSE_CACHE_BYTES: int = 64 * 1024 * 1024
+    CANDLE_RESPONSE_GZIP_MIN_BYTES: int = 4096
+
+    # /api/metrics/* наружу не светим: включать только за внутренним nginx
+    METRICS_ENABLED: bool = False
+    # /api/replay/* — проигрывание истории в QuoteHub (демо/нагрузка); исполняет реальные заявки!
+    REPLAY_ENABLED: bool = False
+    # /api/export/* — выгрузка свечей и сделок всех счетов (для аналитиков, за внутренним nginx)
+    EXPORT_ENABLED: bool = False
+
+    # как часто обновлять снимок доски TQBR для /api/market/screener (0 — не обновлять)
+    SCREENER_REFRESH_S: float = 60.0
 
 settings = Settings()
 
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import csv
+import os
+import tempfile
+from typing import Any, Callable, Iterable, Iterator, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+
+
+# сколько bind-параметров допускает драйвер в одном запросе
+_MAX_PARAMS = {"sqlite": 32000, "postgresql": 32000, "mysql": 65000}
+
+# update: либо список колонок "перезаписать значением из вставки",
+# либо функция excluded -> [(колонка, выражение)] — порядок важен для MySQL,
+# где присваивания в ON DUPLICATE KEY UPDATE видят уже обновлённые значения.
+UpdateSpec = Sequence[str] | Callable[[Any], list[tuple[str, Any]]]
+
+
+def dialect_name(session: AsyncSession) -> str:
+    return session.get_bind().dialect.name
+
+
+def upsert_stmt(dialect: str, model, values, *, index_elements: Sequence[str], update: UpdateSpec):
+    """
+    INSERT ... ON DUPLICATE KEY UPDATE (MySQL) или INSERT ... ON CONFLICT DO UPDATE (SQLite/Postgres).
+    index_elements — колонки уникального ключа (нужны только для ON CONFLICT).
+    """
+    if dialect == "mysql":
+        stmt = mysql.insert(model).values(values)
+        excluded = stmt.inserted
+    elif dialect in ("sqlite", "postgresql"):
+        ins = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = ins(model).values(values)
+        excluded = stmt.excluded
+    else:
+        raise ValueError(f"upsert is not supported for dialect {dialect!r}")
+
+    if callable(update):
+        pairs = update(excluded)
+    else:
+        pairs = [(c, getattr(excluded, c)) for c in update]
+
+    if dialect == "mysql":
+        return stmt.on_duplicate_key_update(pairs)
+    return stmt.on_conflict_do_update(index_elements=list(index_elements), set_=dict(pairs))
+
+
+def _row_bytes(row: dict) -> int:
+    # грубая оценка размера строки в VALUES (...): значение + кавычки/запятая
+    return sum(len(str(v)) + 4 for v in row.values()) + 8
+
+
+def chunk_rows(rows: Sequence[dict], *, max_bytes: int, max_params: int) -> Iterator[list[dict]]:
+    chunk: list[dict] = []
+    size = 0
+    params = 0
+    for row in rows:
+        rb = _row_bytes(row)
+        if chunk and (size + rb > max_bytes or params + len(row) > max_params):
+            yield chunk
+            chunk, size, params = [], 0, 0
+        chunk.append(row)
+        size += rb
+        params += len(row)
+    if chunk:
+        yield chunk
+
+
+async def bulk_upsert(
+    session: AsyncSession,
+    model,
+    rows: Sequence[dict],
+    *,
+    index_elements: Sequence[str],
+    update: UpdateSpec,
+    max_bytes: int | None = None,
+) -> int:
+    """
+    Upsert пачками, каждая не больше max_bytes (по умолчанию BULK_MAX_BYTES).
+    Коммит — на вызывающей стороне.
+    """
+    if not rows:
+        return 0
+    dialect = dialect_name(session)
+    max_bytes = max_bytes or settings.BULK_MAX_BYTES
+    for chunk in chunk_rows(rows, max_bytes=max_bytes, max_params=_MAX_PARAMS.get(dialect, 32000)):
+        await session.execute(upsert_stmt(dialect, model, chunk, index_elements=index_elements, update=update))
+    return len(rows)
+
+
+def _write_tsv(rows: Iterable[dict], columns: Sequence[str]) -> str:
+    fd, path = tempfile.mkstemp(prefix="bulk_", suffix=".tsv")
+    with os.fdopen(fd, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f, delimiter="\t", lineterminator="\n", quoting=csv.QUOTE_NONE, escapechar="\\")
+        for r in rows:
+            # \N — NULL для LOAD DATA
+            w.writerow(["\\N" if r.get(c) is None else r[c] for c in columns])
+    return path
+
+
+async def load_data_upsert(
+    session: AsyncSession,
+    model,
+    rows: Sequence[dict],
+    *,
+    columns: Sequence[str],
+    index_elements: Sequence[str],
+    update_columns: Sequence[str],
+) -> int:
+    """
+    Быстрый путь для больших загрузок (миллионы свечей):
+    TSV -> LOAD DATA LOCAL INFILE во временную staging-таблицу -> INSERT ... SELECT ... ON DUPLICATE KEY UPDATE.
+    Работает только на MySQL с DB_LOCAL_INFILE=true (и local_infile=ON на сервере),
+    иначе — обычный bulk_upsert пачками.
+    """
+    if not rows:
+        return 0
+    if dialect_name(session) != "mysql" or not settings.DB_LOCAL_INFILE:
+        return await bulk_upsert(session, model, rows, index_elements=index_elements, update=update_columns)
+
+    table = model.__tablename__
+    stg = f"_stg_{table}"
+    cols = ", ".join(f"`{c}`" for c in columns)
+    path = _write_tsv(rows, columns)
+    try:
+        # временная таблица живёт в соединении сессии до конца транзакции/соединения
+        await session.execute(text(f"CREATE TEMPORARY TABLE IF NOT EXISTS `{stg}` LIKE `{table}`"))
+        await session.execute(text(f"TRUNCATE TABLE `{stg}`"))
+        await session.execute(
+            text(
+                f"LOAD DATA LOCAL INFILE :path INTO TABLE `{stg}` "
+                f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' ({cols})"
+            ),
+            {"path": path},
+        )
+        sets = ", ".join(f"`{c}` = `{stg}`.`{c}`" for c in update_columns)
+        await session.execute(text(
+            f"INSERT INTO `{table}` ({cols}) SELECT {cols} FROM `{stg}` ON DUPLICATE KEY UPDATE {sets}"
+        ))
+        await session.execute(text(f"DROP TEMPORARY TABLE IF EXISTS `{stg}`"))
+    finally:
+        os.unlink(path)
+    return len(rows)
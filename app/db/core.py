@@ -1,12 +1,130 @@
-import os
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.util.queue import AsyncAdaptedQueue
 
 from app.config import settings
 
 
-engine = create_async_engine(settings.DB_URL, pool_pre_ping=True)
+@dataclass
+class PoolWaitStats:
+    checkouts: int = 0
+    timeouts: int = 0
+    # ожидания в очереди пула (когда все соединения заняты и overflow исчерпан)
+    queue_waits: int = 0
+    queue_wait_total_s: float = 0.0
+    queue_wait_max_s: float = 0.0
+
+
+class _TimedQueue(AsyncAdaptedQueue):
+    stats: PoolWaitStats
+
+    def get(self, block: bool = True, timeout: float | None = None):
+        if not block:
+            return super().get(block, timeout)
+        t0 = time.perf_counter()
+        try:
+            return super().get(block, timeout)
+        finally:
+            waited = time.perf_counter() - t0
+            self.stats.queue_waits += 1
+            self.stats.queue_wait_total_s += waited
+            self.stats.queue_wait_max_s = max(self.stats.queue_wait_max_s, waited)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    QueuePool со статистикой checkout и чистого времени ожидания в очереди
+    (время создания новых соединений сюда не входит).
+    """
+
+    _queue_class = _TimedQueue
+
+    def __init__(self, *args, max_overflow: int = 10, **kwargs):
+        super().__init__(*args, max_overflow=max_overflow, **kwargs)
+        self.max_overflow = max_overflow
+        self.stats = PoolWaitStats()
+        self._pool.stats = self.stats
+
+    def _do_get(self):
+        try:
+            conn = super()._do_get()
+        except sa_exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        self.stats.checkouts += 1
+        return conn
+
+    def recreate(self):
+        # после invalidate/dispose пул пересоздаётся — статистику переносим
+        new = super().recreate()
+        new.stats = self.stats
+        new._pool.stats = self.stats
+        return new
+
+
+def _make_engine(url: str) -> AsyncEngine:
+    if make_url(url).get_backend_name() == "sqlite":
+        # у sqlite свой пул, размеры к нему не применимы
+        return create_async_engine(url)
+    return create_async_engine(
+        url,
+        poolclass=TimedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING == "ping",
+        connect_args={"local_infile": True} if settings.DB_LOCAL_INFILE else {},
+    )
+
+
+engine = _make_engine(settings.DB_URL)
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 
+# читающие роутеры (свечи, лидерборд, позиции) ходят сюда; без реплики — тот же engine
+read_engine = _make_engine(settings.DB_READ_URL) if settings.DB_READ_URL else engine
+ReadSessionLocal = async_sessionmaker(read_engine, expire_on_commit=False)
+
+
 async def get_session() -> AsyncSession:
     async with SessionLocal() as session:
         yield session
+
+
+async def _get_replica_session() -> AsyncSession:
+    async with ReadSessionLocal() as session:
+        yield session
+
+
+# без реплики — та же зависимость, что get_session: FastAPI кэширует её на запрос, и роут
+# с session + read_session получает одну сессию (одно соединение из пула, а не два)
+get_read_session = _get_replica_session if read_engine is not engine else get_session
+
+
+def pool_stats(eng: AsyncEngine) -> dict:
+    pool = eng.sync_engine.pool
+    out: dict = {"pool": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, TimedQueuePool):
+        size = pool.size()
+        capacity = size + max(pool.max_overflow, 0)
+        checked_out = pool.checkedout()
+        st = pool.stats
+        out.update({
+            "size": size,
+            "max_overflow": pool.max_overflow,
+            "checked_out": checked_out,
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "utilization": checked_out / capacity if capacity else 0.0,
+            "checkouts": st.checkouts,
+            "timeouts": st.timeouts,
+            "queue_waits": st.queue_waits,
+            "queue_wait_avg_ms": (st.queue_wait_total_s / st.queue_waits * 1000.0) if st.queue_waits else 0.0,
+            "queue_wait_max_ms": st.queue_wait_max_s * 1000.0,
+        })
+    return out
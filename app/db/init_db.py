@@ -1,11 +1,51 @@
 import asyncio
 from app.db.core import engine
-from app.db.models import Base
-from sqlalchemy.ext.asyncio import AsyncEngine
+from app.db.models import Base, RollupWatermark, Trade, TradeRollup
+from app.db.repo.lots_repo import accounts_missing_lots, reconcile_account
+from app.db.repo.stats_repo import WATERMARK
+from sqlalchemy import inspect, select, func, insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.schema import CreateColumn
+
+
+def _add_missing_columns(conn: Connection) -> None:
+    # create_all не трогает существующие таблицы — новые колонки (с server_default) докидываем сами
+    insp = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        if not insp.has_table(table.name):
+            continue
+        existing = {c["name"] for c in insp.get_columns(table.name)}
+        for col in table.columns:
+            if col.name in existing:
+                continue
+            ddl = CreateColumn(col).compile(dialect=conn.dialect)
+            conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+
+
+def _seed_rollup_watermark(conn: Connection) -> None:
+    # раньше агрегаты писались вместе со сделками: если они уже есть, все сделки в них учтены
+    if conn.execute(select(RollupWatermark.name)).first() is not None:
+        return
+    has_rollups = conn.execute(select(TradeRollup.d).limit(1)).first() is not None
+    last_id = conn.execute(select(func.max(Trade.id))).scalar() if has_rollups else 0
+    conn.execute(insert(RollupWatermark).values(name=WATERMARK, last_trade_id=last_id or 0))
+
+
+async def _seed_position_lots(engine: AsyncEngine) -> None:
+    # позиции, открытые до появления position_lots, без лотов и с fifo_cost=0 — пересобираем из trades
+    async with AsyncSession(engine) as session:
+        for account_id in await accounts_missing_lots(session):
+            await reconcile_account(session, account_id)
+            await session.commit()
+
 
 async def init_db(engine: AsyncEngine):
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)  # create_all паттерн [web:267]
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_seed_rollup_watermark)
+    await _seed_position_lots(engine)
 
 if __name__ == "__main__":
     asyncio.run(init_db(engine))
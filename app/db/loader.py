@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+# batch_fn(session, keys) -> {key: value}; ключа нет в ответе — значение None
+BatchFn = Callable[[AsyncSession, list], Awaitable[dict]]
+
+# event loop держит на задачи только слабые ссылки; лоадер может уйти из session.info
+# (commit) раньше, чем догрузится пачка, — поэтому ссылки на модульном уровне
+_running: set[asyncio.Task] = set()
+
+
+class DataLoader:
+    """
+    Ключи, запрошенные в одном тике event loop (например, из asyncio.gather),
+    грузятся одним batch_fn — т.е. одним запросом IN (...) на тип сущности.
+    Результат запоминается до commit/rollback сессии: повторный load() не ходит в БД.
+    """
+
+    def __init__(self, session: AsyncSession, batch_fn: BatchFn, lock: asyncio.Lock) -> None:
+        self._session = session
+        self._fn = batch_fn
+        self._lock = lock
+        self._memo: dict[Hashable, asyncio.Future] = {}
+        self._queue: list[Hashable] = []
+        self.batches = 0
+
+    def load(self, key: Hashable) -> Awaitable[Any]:
+        fut = self._memo.get(key)
+        if fut is None:
+            loop = asyncio.get_running_loop()
+            fut = self._memo[key] = loop.create_future()
+            self._queue.append(key)
+            if len(self._queue) == 1:
+                # отправка — после того, как отработают уже запланированные в этом тике задачи
+                loop.call_soon(self._dispatch)
+        return fut
+
+    async def load_many(self, keys: Sequence[Hashable]) -> list[Any]:
+        return list(await asyncio.gather(*(self.load(k) for k in keys)))
+
+    def _dispatch(self) -> None:
+        keys, self._queue = self._queue, []
+        task = asyncio.create_task(self._run(keys))
+        _running.add(task)
+        task.add_done_callback(_running.discard)
+
+    async def _run(self, keys: list) -> None:
+        try:
+            # AsyncSession не умеет параллельные запросы — лоадеры одной сессии идут по очереди
+            async with self._lock:
+                found = await self._fn(self._session, keys)
+            self.batches += 1
+        except BaseException as e:
+            for k in keys:
+                fut = self._memo.pop(k)
+                if not fut.done():
+                    fut.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+        for k in keys:
+            fut = self._memo[k]
+            if not fut.done():
+                fut.set_result(found.get(k))
+
+
+def loader(session: AsyncSession, batch_fn: BatchFn) -> DataLoader:
+    """Лоадер batch_fn, привязанный к сессии (живёт в session.info)."""
+    loaders: dict = session.info.setdefault("loaders", {})
+    dl = loaders.get(batch_fn)
+    if dl is None:
+        lock = session.info.setdefault("loader_lock", asyncio.Lock())
+        dl = loaders[batch_fn] = DataLoader(session, batch_fn, lock)
+    return dl
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _forget(session: Session) -> None:
+    # после записи запомненное могло устареть
+    session.info.pop("loaders", None)
@@ -98,6 +98,9 @@ class Account(Base):
 
     # стартовый баланс 10000
     cash: Mapped[float] = mapped_column(Float, default=10000.0)
+    # реализованный P&L по счёту (средняя цена / FIFO), обновляется на каждой продаже
+    realized_pnl: Mapped[float] = mapped_column(Float, default=0.0, server_default="0")
+    realized_pnl_fifo: Mapped[float] = mapped_column(Float, default=0.0, server_default="0")
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
     
 
@@ -112,6 +115,11 @@ class Position(Base):
     qty: Mapped[float] = mapped_column(Float, default=0.0)
     avg_price: Mapped[float] = mapped_column(Float, default=0.0)
 
+    realized_pnl: Mapped[float] = mapped_column(Float, default=0.0, server_default="0")
+    realized_pnl_fifo: Mapped[float] = mapped_column(Float, default=0.0, server_default="0")
+    # себестоимость открытых лотов (для нереализованного P&L по FIFO)
+    fifo_cost: Mapped[float] = mapped_column(Float, default=0.0, server_default="0")
+
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
 
     __table_args__ = (
@@ -119,6 +127,24 @@ class Position(Base):
     )
 
 
+# Открытые лоты позиции (остатки покупок) для FIFO
+class PositionLot(Base):
+    __tablename__ = "position_lots"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"))
+    instrument_id: Mapped[int] = mapped_column(ForeignKey("instruments.id"))
+
+    qty: Mapped[float] = mapped_column(Float)  # остаток лота
+    price: Mapped[float] = mapped_column(Float)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_lot_position", "account_id", "instrument_id", "id"),
+    )
+
+
 class Trade(Base):
     __tablename__ = "trades"
 
@@ -136,3 +162,129 @@ class Trade(Base):
         CheckConstraint("side IN ('BUY','SELL')", name="ck_trade_side"),
         Index("ix_trade_acc_time", "account_id", "created_at"),
     )
+
+
+class Order(Base):
+    __tablename__ = "orders"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"), index=True)
+    instrument_id: Mapped[int] = mapped_column(ForeignKey("instruments.id"), index=True)
+
+    side: Mapped[str] = mapped_column(String(4))  # BUY/SELL
+    type: Mapped[str] = mapped_column(String(5))  # LIMIT/STOP
+    qty: Mapped[float] = mapped_column(Float)
+    # LIMIT — предельная цена, STOP — цена срабатывания
+    price: Mapped[float] = mapped_column(Float)
+
+    status: Mapped[str] = mapped_column(String(9), default="OPEN")  # OPEN/FILLED/CANCELLED/REJECTED
+    fill_price: Mapped[float | None] = mapped_column(Float, nullable=True)
+    reason: Mapped[str | None] = mapped_column(String(255), nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        CheckConstraint("side IN ('BUY','SELL')", name="ck_order_side"),
+        CheckConstraint("type IN ('LIMIT','STOP')", name="ck_order_type"),
+        Index("ix_order_status", "status", "instrument_id"),
+        Index("ix_order_acc_status", "account_id", "status"),
+    )
+
+
+# Капитал счёта на конец дня (пишет app.jobs.equity_snapshot)
+class EquitySnapshot(Base):
+    __tablename__ = "equity_snapshots"
+
+    d: Mapped[date] = mapped_column(Date, primary_key=True)
+    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"), primary_key=True)
+
+    equity: Mapped[float] = mapped_column(Float)
+    cash: Mapped[float] = mapped_column(Float)
+
+    __table_args__ = (
+        Index("ix_snapshot_acc_d", "account_id", "d"),
+    )
+
+
+# Агрегаты сделок: инструмент x день (UTC, как trades.created_at) x сторона.
+# Дописываются фоновым проходом по сделкам новее водяного знака (stats_repo.fold_new_trades),
+# не в транзакции сделки: общая строка агрегата сериализовала бы все сделки по бумаге.
+# Пересчёт — app.jobs.trade_rollups
+class TradeRollup(Base):
+    __tablename__ = "trade_rollups"
+
+    d: Mapped[date] = mapped_column(Date, primary_key=True)
+    instrument_id: Mapped[int] = mapped_column(ForeignKey("instruments.id"), primary_key=True)
+    side: Mapped[str] = mapped_column(String(4), primary_key=True)
+
+    trades: Mapped[int] = mapped_column(Integer, default=0)
+    qty: Mapped[float] = mapped_column(Float, default=0.0)
+    notional: Mapped[float] = mapped_column(Float, default=0.0)
+
+    __table_args__ = (
+        Index("ix_rollup_inst_d", "instrument_id", "d"),
+    )
+
+
+# До какой сделки (id) агрегаты уже сложены
+class RollupWatermark(Base):
+    __tablename__ = "rollup_watermarks"
+
+    name: Mapped[str] = mapped_column(String(32), primary_key=True)
+    last_trade_id: Mapped[int] = mapped_column(Integer, default=0)
+
+
+# Результаты бэктестов (app.jobs.backtest); batch объединяет прогоны одной сетки
+class BacktestRun(Base):
+    __tablename__ = "backtest_runs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    batch: Mapped[str] = mapped_column(String(32), index=True)
+
+    strategy: Mapped[str] = mapped_column(String(32))
+    secid: Mapped[str] = mapped_column(String(32))
+    interval: Mapped[int] = mapped_column(Integer, default=24)
+    params: Mapped[str] = mapped_column(String(255))  # JSON
+    date_from: Mapped[date | None] = mapped_column(Date, nullable=True)
+    date_to: Mapped[date | None] = mapped_column(Date, nullable=True)
+    fee: Mapped[float] = mapped_column(Float, default=0.0)
+    slippage: Mapped[float] = mapped_column(Float, default=0.0)
+
+    final_equity: Mapped[float] = mapped_column(Float)
+    total_return: Mapped[float] = mapped_column(Float)
+    max_drawdown: Mapped[float] = mapped_column(Float)
+    sharpe: Mapped[float] = mapped_column(Float)
+    trades: Mapped[int] = mapped_column(Integer)
+    exposure: Mapped[float] = mapped_column(Float)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        Index("ix_backtest_strategy_secid", "strategy", "secid"),
+    )
+
+
+class Alert(Base):
+    __tablename__ = "alerts"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
+    instrument_id: Mapped[int] = mapped_column(ForeignKey("instruments.id"), index=True)
+
+    direction: Mapped[str] = mapped_column(String(5))  # ABOVE/BELOW
+    price: Mapped[float] = mapped_column(Float)
+    note: Mapped[str | None] = mapped_column(String(255), nullable=True)
+
+    status: Mapped[str] = mapped_column(String(9), default="ACTIVE")  # ACTIVE/TRIGGERED/CANCELLED
+    triggered_price: Mapped[float | None] = mapped_column(Float, nullable=True)
+    triggered_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        CheckConstraint("direction IN ('ABOVE','BELOW')", name="ck_alert_direction"),
+        Index("ix_alert_status", "status", "instrument_id"),
+        Index("ix_alert_user_status", "user_id", "status"),
+    )
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Alert, Instrument
+
+
+async def create_alert(
+    session: AsyncSession,
+    *,
+    user_id: int,
+    secid: str,
+    direction: str,
+    price: float,
+    note: str | None = None,
+    board: str = "TQBR",
+) -> dict:
+    secid = secid.upper()
+    inst_id = (await session.execute(
+        select(Instrument.id).where(Instrument.secid == secid, Instrument.board == board)
+    )).scalar_one_or_none()
+    if inst_id is None:
+        raise HTTPException(status_code=404, detail=f"Instrument not found: {secid}")
+
+    alert = Alert(
+        user_id=user_id,
+        instrument_id=inst_id,
+        direction=direction,
+        price=float(price),
+        note=note,
+        status="ACTIVE",
+    )
+    session.add(alert)
+    await session.flush()
+    return _alert_dict(alert, secid)
+
+
+async def list_alerts(session: AsyncSession, *, user_id: int, status: str | None = None, limit: int = 100) -> list[dict]:
+    q = (
+        select(Alert, Instrument.secid)
+        .join(Instrument, Instrument.id == Alert.instrument_id)
+        .where(Alert.user_id == user_id)
+        .order_by(Alert.id.desc())
+        .limit(max(1, min(int(limit), 500)))
+    )
+    if status:
+        q = q.where(Alert.status == status)
+    return [_alert_dict(a, secid) for a, secid in (await session.execute(q)).all()]
+
+
+async def update_alert(session: AsyncSession, *, user_id: int, alert_id: int, values: dict) -> dict | None:
+    """Меняет только ACTIVE-алерт пользователя; None — такого нет."""
+    res = await session.execute(
+        update(Alert)
+        .where(Alert.id == alert_id, Alert.user_id == user_id, Alert.status == "ACTIVE")
+        .values(**values, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    if res.rowcount == 0:
+        return None
+    q = select(Alert, Instrument.secid).join(Instrument, Instrument.id == Alert.instrument_id).where(Alert.id == alert_id)
+    a, secid = (await session.execute(q.execution_options(populate_existing=True))).one()
+    return _alert_dict(a, secid)
+
+
+async def cancel_alert(session: AsyncSession, *, user_id: int, alert_id: int) -> str | None:
+    """Возвращает secid отменённого алерта (чтобы сбросить индекс) или None."""
+    res = await session.execute(
+        update(Alert)
+        .where(Alert.id == alert_id, Alert.user_id == user_id, Alert.status == "ACTIVE")
+        .values(status="CANCELLED", updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    if res.rowcount == 0:
+        return None
+    q = select(Instrument.secid).join(Alert, Alert.instrument_id == Instrument.id).where(Alert.id == alert_id)
+    return (await session.execute(q)).scalar_one()
+
+
+async def load_active_alerts(session: AsyncSession, secid: str, board: str = "TQBR") -> list[dict]:
+    q = (
+        select(Alert, Instrument.secid)
+        .join(Instrument, Instrument.id == Alert.instrument_id)
+        .where(Alert.status == "ACTIVE", Instrument.secid == secid, Instrument.board == board)
+    )
+    return [_alert_dict(a, s) for a, s in (await session.execute(q)).all()]
+
+
+async def trigger_alert(session: AsyncSession, alert_id: int, price: float) -> bool:
+    # ACTIVE -> TRIGGERED условным UPDATE: в нескольких воркерах сработает ровно один раз
+    res = await session.execute(
+        update(Alert)
+        .where(Alert.id == alert_id, Alert.status == "ACTIVE")
+        .values(status="TRIGGERED", triggered_price=price, triggered_at=datetime.utcnow(), updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    return res.rowcount > 0
+
+
+def _alert_dict(a: Alert, secid: str) -> dict:
+    return {
+        "id": a.id,
+        "user_id": a.user_id,
+        "secid": secid,
+        "direction": a.direction,
+        "price": float(a.price),
+        "note": a.note,
+        "status": a.status,
+        "triggered_price": a.triggered_price,
+        "triggered_at": a.triggered_at.isoformat() if a.triggered_at else None,
+        "created_at": a.created_at.isoformat() if a.created_at else None,
+    }
@@ -1,17 +1,45 @@
 from __future__ import annotations
 from datetime import date, datetime, timedelta
-from sqlalchemy import select
+from typing import AsyncIterator, Callable
+
+import numpy as np
+from sqlalchemy import select, func, event
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.dialects.mysql import insert as mysql_insert  # upsert MySQL [web:268]
+from sqlalchemy.orm import Session
 
-from app.db.models import Instrument
+from app.db.bulk import bulk_upsert, load_data_upsert
 from app.db.models import Candle, CandleCache
+# раньше жили здесь дублями — оставлены реэкспортом для старых импортов
+from app.db.repo.instruments_repo import upsert_instruments, get_instrument, is_instruments_cache_fresh  # noqa: F401
 
+CANDLE_KEY = ("secid", "board", "interval", "d")
+CANDLE_UPDATE = ("open", "high", "low", "close", "volume", "updated_at")
+CANDLE_COLUMNS = CANDLE_KEY + CANDLE_UPDATE
 
-async def upsert_candles(session: AsyncSession, secid: str, board: str, interval: int, rows: list[dict]) -> None:
-    if not rows:
-        return
+# начиная с какого объёма импорт идёт через LOAD DATA (если включён)
+LOAD_DATA_MIN_ROWS = 50_000
+
+# подписчики на изменение свечей: fn(secid), зовутся после commit сессии, которая их писала
+on_candles_changed: list[Callable[[str], None]] = []
+
+
+def _touch(session: AsyncSession, secids) -> None:
+    session.info.setdefault("candles_changed", set()).update(secids)
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_changed(session: Session) -> None:
+    for secid in session.info.pop("candles_changed", ()):
+        for fn in on_candles_changed:
+            fn(secid)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed(session: Session) -> None:
+    session.info.pop("candles_changed", None)
 
+
+def _candle_values(secid: str, board: str, interval: int, rows: list[dict], now: datetime) -> list[dict]:
     values = []
     for r in rows:
         # ожидаем нормализованные ключи: t(open/high/low/close/volume)
@@ -26,31 +54,55 @@ async def upsert_candles(session: AsyncSession, secid: str, board: str, interval
             "low": float(r["low"]),
             "close": float(r["close"]),
             "volume": float(r["volume"]) if r.get("volume") is not None else None,
-            "updated_at": datetime.utcnow(),
+            "updated_at": now,
         })
+    return values
+
+
+async def upsert_candles(session: AsyncSession, secid: str, board: str, interval: int, rows: list[dict]) -> None:
+    if not rows:
+        return
+    values = _candle_values(secid, board, interval, rows, datetime.utcnow())
+    await bulk_upsert(session, Candle, values, index_elements=CANDLE_KEY, update=CANDLE_UPDATE)
+    _touch(session, (secid,))
 
-    stmt = mysql_insert(Candle).values(values)
-    stmt = stmt.on_duplicate_key_update(  # MySQL upsert [web:268]
-        open=stmt.inserted.open,
-        high=stmt.inserted.high,
-        low=stmt.inserted.low,
-        close=stmt.inserted.close,
-        volume=stmt.inserted.volume,
-        updated_at=stmt.inserted.updated_at,
-    )
-    await session.execute(stmt)
+
+async def import_candles(session: AsyncSession, board: str, interval: int, rows_by_secid: dict[str, list[dict]]) -> int:
+    """
+    Массовый импорт истории (много тикеров, миллионы строк).
+    Большие объёмы идут через LOAD DATA + staging-таблицу, мелкие — обычным upsert пачками.
+    """
+    now = datetime.utcnow()
+    values: list[dict] = []
+    for secid, rows in rows_by_secid.items():
+        values.extend(_candle_values(secid.upper(), board, interval, rows, now))
+    _touch(session, (secid.upper() for secid in rows_by_secid))
+
+    if len(values) >= LOAD_DATA_MIN_ROWS:
+        return await load_data_upsert(
+            session, Candle, values,
+            columns=CANDLE_COLUMNS, index_elements=CANDLE_KEY, update_columns=CANDLE_UPDATE,
+        )
+    return await bulk_upsert(session, Candle, values, index_elements=CANDLE_KEY, update=CANDLE_UPDATE)
 
 
 async def mark_cache_range(session: AsyncSession, secid: str, board: str, interval: int, date_from: date, date_to: date) -> None:
-    stmt = mysql_insert(CandleCache).values({
-        "secid": secid, "board": board, "interval": interval,
-        "date_from": date_from, "date_to": date_to,
-        "updated_at": datetime.utcnow(),
-    }).on_duplicate_key_update(updated_at=datetime.utcnow())  # [web:268]
-    await session.execute(stmt)
+    await bulk_upsert(
+        session,
+        CandleCache,
+        [{
+            "secid": secid, "board": board, "interval": interval,
+            "date_from": date_from, "date_to": date_to,
+            "updated_at": datetime.utcnow(),
+        }],
+        index_elements=("secid", "board", "interval", "date_from", "date_to"),
+        update=("updated_at",),
+    )
 
 
-async def cache_is_fresh(session: AsyncSession, secid: str, board: str, interval: int, date_from: date, date_to: date, ttl_minutes: int = 60) -> bool:
+async def cache_updated_at(session: AsyncSession, secid: str, board: str, interval: int, date_from: date, date_to: date, ttl_minutes: int = 60) -> datetime | None:
+    # когда диапазон последний раз грузился из ISS; None — не грузился или протух.
+    # Заодно версия данных диапазона (для кэша ответов)
     q = select(CandleCache.updated_at).where(
         CandleCache.secid == secid,
         CandleCache.board == board,
@@ -59,9 +111,27 @@ async def cache_is_fresh(session: AsyncSession, secid: str, board: str, interval
         CandleCache.date_to == date_to,
     )
     updated_at = (await session.execute(q)).scalar_one_or_none()
-    if not updated_at:
-        return False
-    return updated_at >= (datetime.utcnow() - timedelta(minutes=ttl_minutes))
+    if not updated_at or updated_at < (datetime.utcnow() - timedelta(minutes=ttl_minutes)):
+        return None
+    return updated_at
+
+
+async def candles_version(session: AsyncSession, secid: str, board: str, interval: int, date_from: date, date_to: date) -> tuple[datetime | None, int]:
+    # версия самих свечей диапазона: (последний updated_at, число строк). Меняется при любом
+    # upsert_candles/import_candles, задевшем диапазон, — в т.ч. загрузкой соседнего/перекрывающего
+    q = select(func.max(Candle.updated_at), func.count()).where(
+        Candle.secid == secid,
+        Candle.board == board,
+        Candle.interval == interval,
+        Candle.d >= date_from,
+        Candle.d <= date_to,
+    )
+    updated_at, n = (await session.execute(q)).one()
+    return updated_at, int(n)
+
+
+async def cache_is_fresh(session: AsyncSession, secid: str, board: str, interval: int, date_from: date, date_to: date, ttl_minutes: int = 60) -> bool:
+    return await cache_updated_at(session, secid, board, interval, date_from, date_to, ttl_minutes) is not None
 
 
 async def read_candles(session: AsyncSession, secid: str, board: str, interval: int, date_from: date, date_to: date) -> list[dict]:
@@ -82,49 +152,195 @@ async def read_candles(session: AsyncSession, secid: str, board: str, interval:
         out.append({"t": d.isoformat(), "open": o, "high": h, "low": l, "close": c, "volume": v})
     return out
 
-async def upsert_instruments(session: AsyncSession, board: str, rows: list[dict]) -> None:
+async def fresh_cache_secids(
+    session: AsyncSession,
+    secids: list[str],
+    board: str,
+    interval: int,
+    date_from: date,
+    date_to: date,
+    ttl_minutes: int = 60,
+) -> set[str]:
+    # тот же cache_is_fresh, но одним запросом на весь список тикеров
+    if not secids:
+        return set()
+    q = select(CandleCache.secid).where(
+        CandleCache.secid.in_(secids),
+        CandleCache.board == board,
+        CandleCache.interval == interval,
+        CandleCache.date_from == date_from,
+        CandleCache.date_to == date_to,
+        CandleCache.updated_at >= (datetime.utcnow() - timedelta(minutes=ttl_minutes)),
+    )
+    return set((await session.execute(q)).scalars().all())
+
+
+async def read_candles_many(
+    session: AsyncSession,
+    secids: list[str],
+    board: str,
+    interval: int,
+    date_from: date,
+    date_to: date,
+) -> dict[str, list[dict]]:
+    out: dict[str, list[dict]] = {s: [] for s in secids}
+    if not secids:
+        return out
+    q = (
+        select(Candle.secid, Candle.d, Candle.open, Candle.high, Candle.low, Candle.close, Candle.volume)
+        .where(
+            Candle.secid.in_(secids),
+            Candle.board == board,
+            Candle.interval == interval,
+            Candle.d >= date_from,
+            Candle.d <= date_to,
+        )
+        .order_by(Candle.secid.asc(), Candle.d.asc())
+    )
+    res = await session.execute(q)
+    for secid, d, o, h, l, c, v in res.all():
+        out[secid].append({"t": d.isoformat(), "open": o, "high": h, "low": l, "close": c, "volume": v})
+    return out
+
+
+async def read_last_closes(
+    session: AsyncSession,
+    secids: list[str],
+    board: str = "TQBR",
+    interval: int = 24,
+) -> dict[str, tuple[float, date]]:
+    # последняя свеча по каждому secid одним запросом (как в leaderboard_repo)
+    if not secids:
+        return {}
+    latest = (
+        select(Candle.secid.label("secid"), func.max(Candle.d).label("max_d"))
+        .where(Candle.secid.in_(secids), Candle.board == board, Candle.interval == interval)
+        .group_by(Candle.secid)
+        .subquery()
+    )
+    q = (
+        select(Candle.secid, Candle.close, Candle.d)
+        .join(latest, (Candle.secid == latest.c.secid) & (Candle.d == latest.c.max_d))
+        .where(Candle.board == board, Candle.interval == interval)
+    )
+    rows = (await session.execute(q)).all()
+    return {secid: (float(close), d) for secid, close, d in rows}
+
+
+async def read_close_matrix(
+    session: AsyncSession,
+    secids: list[str],
+    board: str,
+    interval: int,
+    date_from: date | None,
+    date_to: date | None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Закрытия в виде матрицы [дни x secids] одним запросом.
+    Дни — объединение дат свечей по всем тикерам (datetime64[D]); пропуски — NaN.
+    """
+    if not secids:
+        return np.empty(0, dtype="datetime64[D]"), np.empty((0, 0))
+    q = select(Candle.d, Candle.secid, Candle.close).where(
+        Candle.secid.in_(secids),
+        Candle.board == board,
+        Candle.interval == interval,
+    )
+    if date_from is not None:
+        q = q.where(Candle.d >= date_from)
+    if date_to is not None:
+        q = q.where(Candle.d <= date_to)
+    rows = (await session.execute(q)).all()
     if not rows:
-        return
-    values = []
-    for r in rows:
-        values.append({
-            "secid": (r.get("SECID") or "").upper(),
-            "board": board,
-            "name": r.get("NAME") or r.get("SHORTNAME") or (r.get("SECID") or ""),
-            "shortname": r.get("SHORTNAME") or "",
-            "isin": r.get("ISIN") or "",
-            "lotsize": int(r.get("LOTSIZE") or 1),
-            "updated_at": datetime.utcnow(),
-        })
+        return np.empty(0, dtype="datetime64[D]"), np.empty((0, len(secids)))
+
+    d = np.array([r[0] for r in rows], dtype="datetime64[D]")
+    col_of = {s: i for i, s in enumerate(secids)}
+    cols = np.array([col_of[r[1]] for r in rows], dtype=np.int64)
+    close = np.array([r[2] for r in rows], dtype=np.float64)
+
+    days, rows_idx = np.unique(d, return_inverse=True)
+    out = np.full((len(days), len(secids)), np.nan)
+    out[rows_idx, cols] = close
+    return days, out
 
-    stmt = mysql_insert(Instrument).values(values)
-    stmt = stmt.on_duplicate_key_update(
-        name=stmt.inserted.name,
-        shortname=stmt.inserted.shortname,
-        isin=stmt.inserted.isin,
-        lotsize=stmt.inserted.lotsize,
-        updated_at=stmt.inserted.updated_at,
+
+async def candle_data_version(session: AsyncSession, secid: str, board: str, interval: int) -> tuple:
+    # (кол-во баров, последний день, последнее обновление) — меняется при любом upsert серии
+    q = select(func.count(), func.max(Candle.d), func.max(Candle.updated_at)).where(
+        Candle.secid == secid,
+        Candle.board == board,
+        Candle.interval == interval,
     )
-    await session.execute(stmt)
+    n, last_d, updated_at = (await session.execute(q)).one()
+    return int(n or 0), last_d, updated_at
 
-async def get_instrument(session: AsyncSession, secid: str, board: str = "TQBR") -> dict | None:
-    q = select(Instrument).where(Instrument.secid == secid.upper(), Instrument.board == board)
-    obj = (await session.execute(q)).scalar_one_or_none()
-    if not obj:
-        return None
+
+async def read_candle_columns(
+    session: AsyncSession,
+    secid: str,
+    board: str,
+    interval: int,
+    date_from: date | None = None,
+) -> dict[str, np.ndarray]:
+    """Серия свечей по колонкам: d (datetime64[D]), open/high/low/close/volume (float64)."""
+    q = (
+        select(Candle.d, Candle.open, Candle.high, Candle.low, Candle.close, Candle.volume)
+        .where(Candle.secid == secid, Candle.board == board, Candle.interval == interval)
+        .order_by(Candle.d.asc())
+    )
+    if date_from is not None:
+        q = q.where(Candle.d >= date_from)
+    rows = (await session.execute(q)).all()
+    cols = list(zip(*rows)) if rows else [()] * 6
     return {
-        "secid": obj.secid,
-        "board": obj.board,
-        "name": obj.name,
-        "shortname": obj.shortname,
-        "isin": obj.isin,
-        "lotsize": obj.lotsize,
-        "updated_at": obj.updated_at,
+        "d": np.array(cols[0], dtype="datetime64[D]"),
+        "open": np.array(cols[1], dtype=np.float64),
+        "high": np.array(cols[2], dtype=np.float64),
+        "low": np.array(cols[3], dtype=np.float64),
+        "close": np.array(cols[4], dtype=np.float64),
+        "volume": np.array([np.nan if v is None else v for v in cols[5]], dtype=np.float64),
     }
 
-async def is_instruments_cache_fresh(session: AsyncSession, max_age_hours: int = 24) -> bool:
-    q = select(Instrument.updated_at).order_by(Instrument.updated_at.desc()).limit(1)
-    updated_at = (await session.execute(q)).scalar_one_or_none()
-    if not updated_at:
-        return False
-    return updated_at >= (datetime.utcnow() - timedelta(hours=max_age_hours))
+
+async def list_candle_secids(session: AsyncSession, board: str, interval: int, date_from: date, date_to: date) -> list[str]:
+    q = (
+        select(Candle.secid)
+        .where(Candle.board == board, Candle.interval == interval, Candle.d >= date_from, Candle.d <= date_to)
+        .distinct()
+        .order_by(Candle.secid.asc())
+    )
+    return list((await session.execute(q)).scalars().all())
+
+
+async def iter_candle_batches(
+    session: AsyncSession,
+    secids: list[str] | None,
+    board: str,
+    interval: int,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    *,
+    chunk: int = 10000,
+) -> AsyncIterator[list[tuple]]:
+    """
+    (secid, d, open, high, low, close, volume) пачками через серверный курсор,
+    в порядке (secid, d); secids=None — все бумаги доски.
+    """
+    q = (
+        select(Candle.secid, Candle.d, Candle.open, Candle.high, Candle.low, Candle.close, Candle.volume)
+        .where(Candle.board == board, Candle.interval == interval)
+        .order_by(Candle.secid.asc(), Candle.d.asc())
+    )
+    if secids:
+        q = q.where(Candle.secid.in_([s.upper() for s in secids]))
+    if date_from is not None:
+        q = q.where(Candle.d >= date_from)
+    if date_to is not None:
+        q = q.where(Candle.d <= date_to)
+    result = await session.stream(q.execution_options(yield_per=chunk))
+    try:
+        async for part in result.partitions():
+            yield part
+    finally:
+        await result.close()
@@ -2,13 +2,16 @@ from __future__ import annotations
 from datetime import datetime, timedelta
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+from app.db.bulk import bulk_upsert
+from app.db.loader import loader
 
 from app.db.models import Instrument
 
-async def upsert_instruments(session: AsyncSession, board: str, rows: list[dict]) -> None:
+async def upsert_instruments(session: AsyncSession, board: str, rows: list[dict]) -> list[dict]:
+    # возвращает записанные значения — для точечного обновления поискового индекса
     if not rows:
-        return
+        return []
     values = []
     for r in rows:
         values.append({
@@ -21,21 +24,16 @@ async def upsert_instruments(session: AsyncSession, board: str, rows: list[dict]
             "updated_at": datetime.utcnow(),
         })
 
-    stmt = mysql_insert(Instrument).values(values)
-    stmt = stmt.on_duplicate_key_update(
-        name=stmt.inserted.name,
-        shortname=stmt.inserted.shortname,
-        isin=stmt.inserted.isin,
-        lotsize=stmt.inserted.lotsize,
-        updated_at=stmt.inserted.updated_at,
+    await bulk_upsert(
+        session,
+        Instrument,
+        values,
+        index_elements=("secid", "board"),
+        update=("name", "shortname", "isin", "lotsize", "updated_at"),
     )
-    await session.execute(stmt)
+    return values
 
-async def get_instrument(session: AsyncSession, secid: str, board: str = "TQBR") -> dict | None:
-    q = select(Instrument).where(Instrument.secid == secid.upper(), Instrument.board == board)
-    obj = (await session.execute(q)).scalar_one_or_none()
-    if not obj:
-        return None
+def _instrument_dict(obj: Instrument) -> dict:
     return {
         "secid": obj.secid,
         "board": obj.board,
@@ -46,6 +44,21 @@ async def get_instrument(session: AsyncSession, secid: str, board: str = "TQBR")
         "updated_at": obj.updated_at,
     }
 
+
+async def _instruments_by_key(session: AsyncSession, keys: list[tuple[str, str]]) -> dict:
+    # пачка (secid, board) одним запросом; доски в пачке почти всегда одна
+    out = {}
+    for board in {b for _, b in keys}:
+        q = select(Instrument).where(Instrument.board == board, Instrument.secid.in_([s for s, b in keys if b == board]))
+        for obj in (await session.execute(q)).scalars():
+            out[(obj.secid, obj.board)] = _instrument_dict(obj)
+    return out
+
+
+async def get_instrument(session: AsyncSession, secid: str, board: str = "TQBR") -> dict | None:
+    # через лоадер сессии: параллельные вызовы (asyncio.gather) склеиваются в один IN (...)
+    return await loader(session, _instruments_by_key).load((secid.upper(), board))
+
 async def is_instruments_cache_fresh(session: AsyncSession, max_age_hours: int = 24) -> bool:
     q = select(Instrument.updated_at).order_by(Instrument.updated_at.desc()).limit(1)
     updated_at = (await session.execute(q)).scalar_one_or_none()
@@ -1,20 +1,20 @@
 from __future__ import annotations
 
+from datetime import date, timedelta
+
 from sqlalchemy import select, func
+from sqlalchemy.orm import aliased
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.models import Account, User, Position, Instrument, Candle
+from app.db.models import Account, User, Position, Instrument, Candle, EquitySnapshot
 
 
-async def get_leaderboard(
+async def positions_value_by_account(
     session: AsyncSession,
     *,
-    top: int = 10,
     board: str = "TQBR",
     interval: int = 24,
-) -> list[dict]:
-    top = max(1, min(int(top), 100))
-
+) -> dict[int, float]:
     # 1) last price по каждому secid (берём последнюю свечу по d)
     latest = (
         select(
@@ -53,6 +53,19 @@ async def get_leaderboard(
             continue
         last = last_by_secid.get(secid, 0.0)
         positions_value_by_acc[account_id] = positions_value_by_acc.get(account_id, 0.0) + qty * last
+    return positions_value_by_acc
+
+
+async def get_leaderboard(
+    session: AsyncSession,
+    *,
+    top: int = 10,
+    board: str = "TQBR",
+    interval: int = 24,
+) -> list[dict]:
+    top = max(1, min(int(top), 100))
+
+    positions_value_by_acc = await positions_value_by_account(session, board=board, interval=interval)
 
     # 3) аккаунты + юзеры
     q_acc = (
@@ -97,3 +110,75 @@ async def get_leaderboard(
             "user": it["user"],
         })
     return out
+
+
+def period_start(period: str, today: date) -> date:
+    if period == "week":
+        return today - timedelta(days=today.weekday())
+    if period == "month":
+        return today.replace(day=1)
+    if period == "ytd":
+        return today.replace(month=1, day=1)
+    raise ValueError(f"unknown period: {period}")
+
+
+async def get_period_leaderboard(
+    session: AsyncSession,
+    *,
+    period: str,
+    top: int = 10,
+    today: date | None = None,
+) -> list[dict]:
+    """
+    Доходность за период по снимкам equity_snapshots одним запросом.
+    База — последний снимок до начала периода (закрытие прошлого периода),
+    если истории столько нет — самый ранний снимок; конец — последний снимок.
+    Счета без снимка на базовый день (открытые позже) в рейтинг не попадают.
+    """
+    top = max(1, min(int(top), 100))
+    start = period_start(period, today or date.today())
+
+    base_d = func.coalesce(
+        select(func.max(EquitySnapshot.d)).where(EquitySnapshot.d < start).scalar_subquery(),
+        select(func.min(EquitySnapshot.d)).scalar_subquery(),
+    )
+    end_d = select(func.max(EquitySnapshot.d)).scalar_subquery()
+
+    b = aliased(EquitySnapshot)
+    e = aliased(EquitySnapshot)
+    ret = (e.equity / b.equity - 1.0) * 100.0
+    q = (
+        select(
+            e.equity,
+            b.equity,
+            ret.label("return_pct"),
+            User.username,
+            User.first_name,
+            User.last_name,
+            User.photo_url,
+        )
+        .select_from(e)
+        .join(b, (b.account_id == e.account_id) & (b.d == base_d))
+        .join(Account, Account.id == e.account_id)
+        .join(User, User.id == Account.user_id)
+        .where(e.d == end_d, b.equity > 0)
+        .order_by(ret.desc(), e.account_id.asc())
+        .limit(top)
+    )
+    rows = (await session.execute(q)).all()
+
+    out = []
+    for i, (equity, base_equity, return_pct, username, first_name, last_name, photo_url) in enumerate(rows, start=1):
+        out.append({
+            "rank": i,
+            "equity": float(equity),
+            "base_equity": float(base_equity),
+            "return_pct": float(return_pct),
+            "user": {
+                "username": username,
+                "first_name": first_name,
+                "last_name": last_name,
+                "photo_url": photo_url,
+            },
+        })
+    return out
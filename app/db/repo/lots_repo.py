@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+from collections import deque
+
+from sqlalchemy import select, update, delete, insert, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Account, Position, PositionLot, Trade
+
+
+async def add_lot(session: AsyncSession, *, account_id: int, instrument_id: int, qty: float, price: float) -> None:
+    await session.execute(insert(PositionLot).values(
+        account_id=account_id, instrument_id=instrument_id, qty=float(qty), price=float(price),
+    ))
+
+
+async def consume_lots(
+    session: AsyncSession,
+    *,
+    account_id: int,
+    instrument_id: int,
+    qty: float,
+    price: float,
+) -> tuple[float, float]:
+    """
+    Списывает qty с самых старых лотов. Возвращает (реализованный P&L по FIFO, списанная себестоимость).
+    Пишет только съеденные лоты; читает открытые лоты позиции, а не всю историю сделок.
+    """
+    q = (
+        select(PositionLot.id, PositionLot.qty, PositionLot.price)
+        .where(PositionLot.account_id == account_id, PositionLot.instrument_id == instrument_id)
+        .order_by(PositionLot.id.asc())
+        .with_for_update()
+    )
+    left = float(qty)
+    realized = 0.0
+    cost = 0.0
+    emptied: list[int] = []
+    partial: tuple[int, float] | None = None
+
+    for lot_id, lot_qty, lot_price in (await session.execute(q)).all():
+        take = min(left, float(lot_qty))
+        realized += (price - float(lot_price)) * take
+        cost += float(lot_price) * take
+        left -= take
+        if take >= float(lot_qty):
+            emptied.append(lot_id)
+        else:
+            partial = (lot_id, float(lot_qty) - take)
+        if left <= 1e-12:
+            break
+
+    if emptied:
+        await session.execute(delete(PositionLot).where(PositionLot.id.in_(emptied)))
+    if partial:
+        await session.execute(
+            update(PositionLot).where(PositionLot.id == partial[0]).values(qty=partial[1])
+            .execution_options(synchronize_session=False)
+        )
+    return realized, cost
+
+
+def replay_trades(trades) -> tuple[dict[int, dict], dict[int, deque]]:
+    """
+    trades: (instrument_id, side, qty, price) в порядке исполнения.
+    Возвращает состояние позиций и открытые лоты по инструментам.
+    """
+    positions: dict[int, dict] = {}
+    lots: dict[int, deque] = {}
+    for inst_id, side, qty, price in trades:
+        qty, price = float(qty), float(price)
+        p = positions.setdefault(inst_id, {
+            "qty": 0.0, "avg_price": 0.0, "fifo_cost": 0.0, "realized_pnl": 0.0, "realized_pnl_fifo": 0.0,
+        })
+        q = lots.setdefault(inst_id, deque())
+        if side == "BUY":
+            new_qty = p["qty"] + qty
+            p["avg_price"] = (p["qty"] * p["avg_price"] + qty * price) / new_qty
+            p["qty"] = new_qty
+            p["fifo_cost"] += qty * price
+            q.append([qty, price])
+            continue
+
+        p["realized_pnl"] += (price - p["avg_price"]) * qty
+        left = qty
+        while left > 1e-12 and q:
+            lot = q[0]
+            take = min(left, lot[0])
+            p["realized_pnl_fifo"] += (price - lot[1]) * take
+            p["fifo_cost"] -= lot[1] * take
+            lot[0] -= take
+            left -= take
+            if lot[0] <= 1e-12:
+                q.popleft()
+        p["qty"] -= qty
+        if p["qty"] <= 1e-12:
+            p["qty"] = 0.0
+            p["avg_price"] = 0.0
+            p["fifo_cost"] = 0.0
+    return positions, lots
+
+
+async def reconcile_account(session: AsyncSession, account_id: int) -> dict:
+    rows = (await session.execute(
+        select(Trade.instrument_id, Trade.side, Trade.qty, Trade.price)
+        .where(Trade.account_id == account_id)
+        .order_by(Trade.created_at.asc(), Trade.id.asc())
+    )).all()
+    positions, lots = replay_trades(rows)
+
+    current = {
+        inst_id: (rp, rpf)
+        for inst_id, rp, rpf in (await session.execute(
+            select(Position.instrument_id, Position.realized_pnl, Position.realized_pnl_fifo)
+            .where(Position.account_id == account_id)
+        )).all()
+    }
+
+    await session.execute(delete(PositionLot).where(PositionLot.account_id == account_id))
+    lot_rows = [
+        {"account_id": account_id, "instrument_id": inst_id, "qty": qty, "price": price}
+        for inst_id, q in lots.items() for qty, price in q
+    ]
+    if lot_rows:
+        await session.execute(insert(PositionLot), lot_rows)
+
+    for inst_id, p in positions.items():
+        await session.execute(
+            update(Position)
+            .where(Position.account_id == account_id, Position.instrument_id == inst_id)
+            .values(**p)
+            .execution_options(synchronize_session=False)
+        )
+
+    realized = sum(p["realized_pnl"] for p in positions.values())
+    realized_fifo = sum(p["realized_pnl_fifo"] for p in positions.values())
+    await session.execute(
+        update(Account)
+        .where(Account.id == account_id)
+        .values(realized_pnl=realized, realized_pnl_fifo=realized_fifo)
+        .execution_options(synchronize_session=False)
+    )
+
+    drift = sum(
+        abs(p["realized_pnl"] - float(current.get(i, (0.0, 0.0))[0] or 0.0))
+        + abs(p["realized_pnl_fifo"] - float(current.get(i, (0.0, 0.0))[1] or 0.0))
+        for i, p in positions.items()
+    )
+    return {"account_id": account_id, "trades": len(rows), "realized_pnl": realized,
+            "realized_pnl_fifo": realized_fifo, "drift": drift}
+
+
+async def accounts_missing_lots(session: AsyncSession) -> list[int]:
+    """
+    Счета, у которых открытые позиции не покрыты лотами (позиции старше position_lots:
+    fifo_cost=0 и ни одного лота) — им нужна пересборка из trades.
+    """
+    lots = (
+        select(PositionLot.account_id, PositionLot.instrument_id, func.sum(PositionLot.qty).label("qty"))
+        .group_by(PositionLot.account_id, PositionLot.instrument_id)
+        .subquery()
+    )
+    q = (
+        select(Position.account_id)
+        .outerjoin(lots, (lots.c.account_id == Position.account_id) & (lots.c.instrument_id == Position.instrument_id))
+        .where(Position.qty > 1e-12, func.abs(Position.qty - func.coalesce(lots.c.qty, 0.0)) > 1e-9)
+        .distinct()
+        .order_by(Position.account_id)
+    )
+    return list((await session.execute(q)).scalars().all())
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Order, Instrument
+
+
+async def create_order(
+    session: AsyncSession,
+    *,
+    account_id: int,
+    secid: str,
+    side: str,
+    type: str,
+    qty: float,
+    price: float,
+    board: str = "TQBR",
+) -> dict:
+    secid = secid.upper()
+    inst_id = (await session.execute(
+        select(Instrument.id).where(Instrument.secid == secid, Instrument.board == board)
+    )).scalar_one_or_none()
+    if inst_id is None:
+        raise HTTPException(status_code=404, detail=f"Instrument not found: {secid}")
+
+    order = Order(
+        account_id=account_id,
+        instrument_id=inst_id,
+        side=side,
+        type=type,
+        qty=float(qty),
+        price=float(price),
+        status="OPEN",
+    )
+    session.add(order)
+    await session.flush()
+    return _order_dict(order, secid)
+
+
+async def list_orders(session: AsyncSession, *, account_id: int, status: str | None = None, limit: int = 100) -> list[dict]:
+    q = (
+        select(Order, Instrument.secid)
+        .join(Instrument, Instrument.id == Order.instrument_id)
+        .where(Order.account_id == account_id)
+        .order_by(Order.id.desc())
+        .limit(max(1, min(int(limit), 500)))
+    )
+    if status:
+        q = q.where(Order.status == status)
+    return [_order_dict(o, secid) for o, secid in (await session.execute(q)).all()]
+
+
+async def cancel_order(session: AsyncSession, *, account_id: int, order_id: int) -> str | None:
+    """
+    Возвращает secid отменённой заявки (чтобы убрать её из книги) или None, если OPEN-заявки нет.
+    """
+    res = await session.execute(
+        update(Order)
+        .where(Order.id == order_id, Order.account_id == account_id, Order.status == "OPEN")
+        .values(status="CANCELLED", updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    if res.rowcount == 0:
+        return None
+    q = select(Instrument.secid).join(Order, Order.instrument_id == Instrument.id).where(Order.id == order_id)
+    return (await session.execute(q)).scalar_one()
+
+
+async def load_open_orders(session: AsyncSession) -> list[dict]:
+    q = (
+        select(Order, Instrument.secid)
+        .join(Instrument, Instrument.id == Order.instrument_id)
+        .where(Order.status == "OPEN")
+    )
+    return [_order_dict(o, secid) for o, secid in (await session.execute(q)).all()]
+
+
+async def claim_order(session: AsyncSession, order_id: int, fill_price: float) -> bool:
+    """
+    OPEN -> FILLED условным UPDATE: если заявку уже отменили или исполнил
+    другой воркер, rowcount будет 0.
+    """
+    res = await session.execute(
+        update(Order)
+        .where(Order.id == order_id, Order.status == "OPEN")
+        .values(status="FILLED", fill_price=fill_price, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    return res.rowcount > 0
+
+
+async def reject_order(session: AsyncSession, order_id: int, reason: str) -> None:
+    await session.execute(
+        update(Order)
+        .where(Order.id == order_id, Order.status == "OPEN")
+        .values(status="REJECTED", reason=reason[:255], updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _order_dict(o: Order, secid: str) -> dict:
+    return {
+        "id": o.id,
+        "account_id": o.account_id,
+        "instrument_id": o.instrument_id,
+        "secid": secid,
+        "side": o.side,
+        "type": o.type,
+        "qty": float(o.qty),
+        "price": float(o.price),
+        "status": o.status,
+        "fill_price": o.fill_price,
+        "reason": o.reason,
+        "created_at": o.created_at.isoformat() if o.created_at else None,
+    }
@@ -1,28 +1,44 @@
 from __future__ import annotations
 
+import asyncio
+
 from fastapi import HTTPException
-from sqlalchemy import select
+from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.db.loader import loader
 from app.db.models import Account, Position, Instrument, Candle
 
 
+async def _last_closes(session: AsyncSession, keys: list[tuple[str, str, int]]) -> dict:
+    # последняя свеча по каждой бумаге пачки: max(d) по группе + join обратно на candles
+    out = {}
+    for board, interval in {(b, i) for _, b, i in keys}:
+        secids = [s for s, b, i in keys if (b, i) == (board, interval)]
+        last_d = (
+            select(Candle.secid, func.max(Candle.d).label("d"))
+            .where(Candle.secid.in_(secids), Candle.board == board, Candle.interval == interval)
+            .group_by(Candle.secid)
+            .subquery()
+        )
+        q = select(Candle.secid, Candle.close).join(
+            last_d, (Candle.secid == last_d.c.secid) & (Candle.d == last_d.c.d),
+        ).where(Candle.board == board, Candle.interval == interval)
+        for secid, close in (await session.execute(q)).all():
+            out[(secid, board, interval)] = float(close)
+    return out
+
+
 async def _get_last_price(
     session: AsyncSession,
     secid: str,
     board: str = "TQBR",
     interval: int = 24,
 ) -> float:
-    q = (
-        select(Candle.close)
-        .where(Candle.secid == secid.upper(), Candle.board == board, Candle.interval == interval)
-        .order_by(Candle.d.desc())
-        .limit(1)
-    )
-    last = (await session.execute(q)).scalar_one_or_none()
+    last = await loader(session, _last_closes).load((secid.upper(), board, interval))
     if last is None:
         raise HTTPException(status_code=404, detail=f"No candles in DB for {secid} ({board}, interval={interval})")
-    return float(last)
+    return last
 
 
 async def get_portfolio(
@@ -31,7 +47,13 @@ async def get_portfolio(
     account_id: int,
     board: str = "TQBR",
     interval: int = 24,
+    method: str = "avg",
 ) -> dict:
+    """
+    method: "avg" — P&L от средней цены, "fifo" — от себестоимости открытых лотов.
+    Реализованный P&L хранится готовым в positions/accounts, здесь только читается.
+    """
+    fifo = method == "fifo"
     acc = (await session.execute(select(Account).where(Account.id == account_id))).scalar_one_or_none()
     if not acc:
         raise HTTPException(status_code=404, detail="Account not found")
@@ -40,6 +62,9 @@ async def get_portfolio(
         select(
             Position.qty,
             Position.avg_price,
+            Position.fifo_cost,
+            Position.realized_pnl,
+            Position.realized_pnl_fifo,
             Instrument.secid,
             Instrument.name,
         )
@@ -48,22 +73,21 @@ async def get_portfolio(
         .where(Position.account_id == account_id)
         .order_by(Instrument.secid.asc())
     )
-    rows = (await session.execute(q)).all()
+    rows = [r for r in (await session.execute(q)).all() if float(r.qty or 0.0) > 0]
+    # цены всех бумаг — одним запросом через лоадер
+    lasts = await asyncio.gather(*(_get_last_price(session, r.secid, board=board, interval=interval) for r in rows))
 
     positions: list[dict] = []
 
     total_cost = 0.0
     positions_value = 0.0
 
-    for qty, avg_price, secid, name in rows:
-        qty = float(qty or 0.0)
-        if qty <= 0:
-            continue
-
+    for (qty, avg_price, fifo_cost, realized_avg, realized_fifo, secid, name), last in zip(rows, lasts):
+        qty = float(qty)
         avg_price = float(avg_price or 0.0)
-        last = await _get_last_price(session, secid, board=board, interval=interval)
 
-        cost = qty * avg_price
+        cost = float(fifo_cost or 0.0) if fifo else qty * avg_price
+        realized = float((realized_fifo if fifo else realized_avg) or 0.0)
         value = qty * float(last)
 
         pnl_rub = value - cost
@@ -84,6 +108,9 @@ async def get_portfolio(
 
             "pnl_rub": float(pnl_rub),
             "pnl_pct": float(pnl_pct),
+
+            "realized_pnl": realized,
+            "unrealized_pnl": float(pnl_rub),
         })
 
     cash = float(acc.cash or 0.0)
@@ -91,6 +118,8 @@ async def get_portfolio(
     positions_pnl_rub = positions_value - total_cost
     positions_pnl_pct = (positions_pnl_rub / total_cost * 100.0) if total_cost > 0 else 0.0
     equity = cash + positions_value
+    # по счёту целиком — включая уже закрытые позиции
+    realized_total = float((acc.realized_pnl_fifo if fifo else acc.realized_pnl) or 0.0)
 
     return {
         "account": {"id": acc.id, "cash": cash},
@@ -100,6 +129,10 @@ async def get_portfolio(
             "positions_pnl_rub": float(positions_pnl_rub),
             "positions_pnl_pct": float(positions_pnl_pct),
             "equity": float(equity),
+            "method": "fifo" if fifo else "avg",
+            "realized_pnl": realized_total,
+            "unrealized_pnl": float(positions_pnl_rub),
+            "total_pnl": realized_total + float(positions_pnl_rub),
         },
         "positions": positions,
     }
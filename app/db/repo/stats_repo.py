@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from itertools import takewhile
+from typing import Iterable
+
+from sqlalchemy import select, delete, update, func, case
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.bulk import bulk_upsert
+from app.db.models import Trade, TradeRollup, Instrument, RollupWatermark
+
+WATERMARK = "trade_rollups"
+
+
+def rollup_rows(fills: Iterable[tuple[datetime, int, str, float, float]]) -> list[dict]:
+    """(created_at, instrument_id, side, qty, price) -> строки trade_rollups, сложенные по ключу."""
+    out: dict[tuple, dict] = {}
+    for created_at, inst_id, side, qty, px in fills:
+        key = (created_at.date(), inst_id, side)
+        row = out.get(key)
+        if row is None:
+            row = out[key] = {"d": key[0], "instrument_id": inst_id, "side": side, "trades": 0, "qty": 0.0, "notional": 0.0}
+        row["trades"] += 1
+        row["qty"] += qty
+        row["notional"] += qty * px
+    # в порядке ключа — строки агрегатов блокируются всегда в одном порядке
+    return sorted(out.values(), key=lambda r: (r["d"], r["instrument_id"], r["side"]))
+
+
+async def add_to_rollups(session: AsyncSession, rows: list[dict]) -> int:
+    # приращения, а не перезапись
+    return await bulk_upsert(
+        session, TradeRollup, rows,
+        index_elements=("d", "instrument_id", "side"),
+        update=lambda ex: [
+            ("trades", TradeRollup.trades + ex.trades),
+            ("qty", TradeRollup.qty + ex.qty),
+            ("notional", TradeRollup.notional + ex.notional),
+        ],
+    )
+
+
+async def lock_watermark(session: AsyncSession) -> int:
+    """id последней сложенной сделки; строка блокируется до конца транзакции (один складывающий за раз)."""
+    q = select(RollupWatermark.last_trade_id).where(RollupWatermark.name == WATERMARK).with_for_update()
+    wm = (await session.execute(q)).scalar_one_or_none()
+    if wm is None:
+        session.add(RollupWatermark(name=WATERMARK, last_trade_id=0))
+        await session.flush()
+        wm = 0
+    return wm
+
+
+async def fold_new_trades(session: AsyncSession, *, settle_s: float = 5.0, batch: int = 5000) -> int:
+    """
+    Докладывает в trade_rollups сделки новее водяного знака (не больше batch за раз), двигает знак.
+    Сделки моложе settle_s ждут следующего прохода: id выдаются при вставке, а коммитятся
+    транзакции не по порядку — сделка с меньшим id может стать видна позже.
+    Возвращает число сложенных сделок.
+    """
+    wm = await lock_watermark(session)
+    rows = (await session.execute(
+        select(Trade.id, Trade.created_at, Trade.instrument_id, Trade.side, Trade.qty, Trade.price)
+        .where(Trade.id > wm)
+        .order_by(Trade.id.asc())
+        .limit(batch)
+    )).all()
+    cutoff = datetime.utcnow() - timedelta(seconds=settle_s)
+    ready = list(takewhile(lambda r: r.created_at < cutoff, rows))
+    if not ready:
+        return 0
+    await add_to_rollups(session, rollup_rows((r.created_at, r.instrument_id, r.side, r.qty, r.price) for r in ready))
+    await session.execute(
+        update(RollupWatermark).where(RollupWatermark.name == WATERMARK).values(last_trade_id=ready[-1].id)
+    )
+    return len(ready)
+
+
+def _day(v) -> date:
+    # func.date() в SQLite возвращает строку, в MySQL — date
+    return date.fromisoformat(v) if isinstance(v, str) else v
+
+
+async def rebuild_rollups(session: AsyncSession, date_from: date | None = None, date_to: date | None = None) -> int:
+    """
+    Пересчёт агрегатов по trades за [date_from, date_to] (None — без границы).
+    Считаются только сделки до водяного знака: более новые доложит fold_new_trades.
+    """
+    wm = await lock_watermark(session)
+    day = func.date(Trade.created_at)
+    q = (
+        select(day, Trade.instrument_id, Trade.side, func.count(), func.sum(Trade.qty), func.sum(Trade.qty * Trade.price))
+        .where(Trade.id <= wm)
+        .group_by(day, Trade.instrument_id, Trade.side)
+    )
+    d = delete(TradeRollup)
+    if date_from is not None:
+        q = q.where(Trade.created_at >= datetime.combine(date_from, datetime.min.time()))
+        d = d.where(TradeRollup.d >= date_from)
+    if date_to is not None:
+        q = q.where(Trade.created_at < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+        d = d.where(TradeRollup.d <= date_to)
+
+    rows = [
+        {"d": _day(dd), "instrument_id": inst_id, "side": side, "trades": int(n), "qty": float(qty), "notional": float(notional)}
+        for dd, inst_id, side, n, qty, notional in (await session.execute(q)).all()
+    ]
+    await session.execute(d.execution_options(synchronize_session=False))
+    return await bulk_upsert(
+        session, TradeRollup, rows,
+        index_elements=("d", "instrument_id", "side"),
+        update=("trades", "qty", "notional"),
+    )
+
+
+async def trading_stats(session: AsyncSession, date_from: date, date_to: date, *, top: int = 10) -> dict:
+    period = (TradeRollup.d >= date_from, TradeRollup.d <= date_to)
+    trades_ = func.sum(TradeRollup.trades)
+    qty_ = func.sum(TradeRollup.qty)
+    notional_ = func.sum(TradeRollup.notional)
+
+    sides = {
+        side: {"trades": int(n or 0), "qty": float(q or 0.0), "notional": float(v or 0.0)}
+        for side, n, q, v in (await session.execute(
+            select(TradeRollup.side, trades_, qty_, notional_).where(*period).group_by(TradeRollup.side)
+        )).all()
+    }
+    empty = {"trades": 0, "qty": 0.0, "notional": 0.0}
+    buy, sell = sides.get("BUY", empty), sides.get("SELL", empty)
+
+    days = (await session.execute(
+        select(TradeRollup.d, TradeRollup.side, trades_, notional_)
+        .where(*period)
+        .group_by(TradeRollup.d, TradeRollup.side)
+        .order_by(TradeRollup.d.asc())
+    )).all()
+    by_day: dict[date, dict] = {}
+    for d, side, n, v in days:
+        row = by_day.setdefault(d, {"d": d.isoformat(), "trades": 0, "buy_notional": 0.0, "sell_notional": 0.0})
+        row["trades"] += int(n)
+        row["buy_notional" if side == "BUY" else "sell_notional"] += float(v)
+
+    buy_n = func.sum(case((TradeRollup.side == "BUY", TradeRollup.notional), else_=0.0))
+    tickers = (await session.execute(
+        select(Instrument.secid, trades_, qty_, notional_, buy_n)
+        .join(Instrument, Instrument.id == TradeRollup.instrument_id)
+        .where(*period)
+        .group_by(Instrument.secid)
+        .order_by(notional_.desc())
+        .limit(max(1, min(int(top), 100)))
+    )).all()
+
+    return {
+        "from": date_from.isoformat(),
+        "to": date_to.isoformat(),
+        "total": {
+            "trades": buy["trades"] + sell["trades"],
+            "notional": buy["notional"] + sell["notional"],
+            "buy": buy,
+            "sell": sell,
+            "buy_sell_ratio": buy["notional"] / sell["notional"] if sell["notional"] > 0 else None,
+        },
+        "by_day": list(by_day.values()),
+        "top_tickers": [
+            {
+                "secid": secid,
+                "trades": int(n),
+                "qty": float(q),
+                "notional": float(v),
+                "buy_share": float(b or 0.0) / float(v) if v else None,
+            }
+            for secid, n, q, v, b in tickers
+        ],
+    }
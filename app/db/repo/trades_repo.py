@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import base64
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator
+
+from sqlalchemy import select, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Trade, Instrument
+
+
+async def read_account_trades(
+    session: AsyncSession,
+    account_id: int,
+    *,
+    since_day: date | None = None,
+    after_id: int | None = None,
+) -> list[tuple]:
+    """
+    Сделки счёта в порядке id: (id, secid, side, qty, price, created_at).
+    since_day / after_id — окно для догрузки: сделки начиная с дня ИЛИ новее id.
+    """
+    q = (
+        select(Trade.id, Instrument.secid, Trade.side, Trade.qty, Trade.price, Trade.created_at)
+        .join(Instrument, Instrument.id == Trade.instrument_id)
+        .where(Trade.account_id == account_id)
+        .order_by(Trade.id.asc())
+    )
+    window = []
+    if since_day is not None:
+        window.append(Trade.created_at >= datetime.combine(since_day, datetime.min.time()))
+    if after_id is not None:
+        window.append(Trade.id > after_id)
+    if window:
+        q = q.where(or_(*window))
+    return [tuple(r) for r in (await session.execute(q)).all()]
+
+
+def encode_cursor(created_at: datetime, trade_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{trade_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, tid = raw.split("|")
+        return datetime.fromisoformat(ts), int(tid)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("bad cursor") from e
+
+
+def _history_query(account_id: int, secid: str | None, side: str | None):
+    # новые сверху; (created_at, id) — ключ пагинации, по индексу ix_trade_acc_time
+    q = (
+        select(Trade.id, Trade.created_at, Instrument.secid, Trade.side, Trade.qty, Trade.price)
+        .join(Instrument, Instrument.id == Trade.instrument_id)
+        .where(Trade.account_id == account_id)
+        .order_by(Trade.created_at.desc(), Trade.id.desc())
+    )
+    if secid:
+        q = q.where(Instrument.secid == secid.upper())
+    if side:
+        q = q.where(Trade.side == side)
+    return q
+
+
+def _trade_dict(r) -> dict:
+    tid, created_at, secid, side, qty, price = r
+    return {
+        "id": tid,
+        "created_at": created_at.isoformat(),
+        "secid": secid,
+        "side": side,
+        "qty": float(qty),
+        "price": float(price),
+        "amount": float(qty) * float(price),
+    }
+
+
+async def list_trades(
+    session: AsyncSession,
+    account_id: int,
+    *,
+    secid: str | None = None,
+    side: str | None = None,
+    cursor: str | None = None,
+    limit: int = 100,
+) -> tuple[list[dict], str | None]:
+    """
+    Страница истории сделок и курсор следующей (None — дальше пусто).
+    Без OFFSET: продолжение с (created_at, id) последней строки.
+    """
+    limit = max(1, min(int(limit), 500))
+    q = _history_query(account_id, secid, side)
+    if cursor:
+        ts, tid = decode_cursor(cursor)
+        q = q.where(or_(Trade.created_at < ts, and_(Trade.created_at == ts, Trade.id < tid)))
+    rows = (await session.execute(q.limit(limit + 1))).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return [_trade_dict(r) for r in rows], next_cursor
+
+
+async def iter_trades(
+    session: AsyncSession,
+    account_id: int,
+    *,
+    secid: str | None = None,
+    side: str | None = None,
+    chunk: int = 1000,
+) -> AsyncIterator[list[dict]]:
+    """
+    Вся история пачками по chunk строк через серверный курсор (session.stream):
+    в памяти одновременно только одна пачка.
+    """
+    q = _history_query(account_id, secid, side).execution_options(yield_per=chunk)
+    result = await session.stream(q)
+    try:
+        async for part in result.partitions():
+            yield [_trade_dict(r) for r in part]
+    finally:
+        await result.close()
+
+
+async def iter_trade_batches(
+    session: AsyncSession,
+    *,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    chunk: int = 10000,
+) -> AsyncIterator[list[tuple]]:
+    """
+    Сделки всех счетов (для выгрузки аналитикам) пачками в порядке id:
+    (id, created_at, account_id, secid, side, qty, price).
+    """
+    q = (
+        select(Trade.id, Trade.created_at, Trade.account_id, Instrument.secid, Trade.side, Trade.qty, Trade.price)
+        .join(Instrument, Instrument.id == Trade.instrument_id)
+        .order_by(Trade.id.asc())
+    )
+    if date_from is not None:
+        q = q.where(Trade.created_at >= datetime.combine(date_from, datetime.min.time()))
+    if date_to is not None:
+        q = q.where(Trade.created_at < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    result = await session.stream(q.execution_options(yield_per=chunk))
+    try:
+        async for part in result.partitions():
+            yield part
+    finally:
+        await result.close()
@@ -1,92 +1,170 @@
+from datetime import datetime
+
 from fastapi import HTTPException
-from sqlalchemy import select
+from sqlalchemy import select, update, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.db.bulk import dialect_name, upsert_stmt
 from app.db.models import Account, Position, Trade, Instrument, Candle
+from app.db.repo.lots_repo import add_lot, consume_lots
 
-
-async def _get_instrument(session: AsyncSession, secid: str, board: str = "TQBR") -> Instrument:
-    secid = secid.upper()
-    q = select(Instrument).where(Instrument.secid == secid, Instrument.board == board)
-    inst = (await session.execute(q)).scalar_one_or_none()
-    if not inst:
-        raise HTTPException(status_code=404, detail=f"Instrument not found: {secid}")
-    return inst
+# сколько заявок можно отправить одним батчем
+MAX_BATCH_ORDERS = 100
 
 
-async def _get_last_price(session: AsyncSession, secid: str, board: str = "TQBR", interval: int = 24) -> float:
-    secid = secid.upper()
-    q = (
+async def _resolve_instruments(
+    session: AsyncSession,
+    secids: list[str],
+    board: str = "TQBR",
+    interval: int = 24,
+) -> dict[str, tuple[int, float | None]]:
+    """
+    secid -> (instrument_id, последняя цена) одним запросом: инструмент + коррелированный
+    подзапрос на последнюю свечу (а не два запроса на каждую заявку).
+    """
+    last_close = (
         select(Candle.close)
-        .where(Candle.secid == secid, Candle.board == board, Candle.interval == interval)
-        .order_by(Candle.d.desc())   # "последняя" по дате [web:539]
+        .where(Candle.secid == Instrument.secid, Candle.board == Instrument.board, Candle.interval == interval)
+        .order_by(Candle.d.desc())
         .limit(1)
+        .correlate(Instrument)
+        .scalar_subquery()
     )
-    last = (await session.execute(q)).scalar_one_or_none()
-    if last is None:
-        raise HTTPException(
-            status_code=404,
-            detail=f"No candles in DB for {secid} ({board}, interval={interval}). Load candles first.",
-        )
-    return float(last)
+    q = select(Instrument.secid, Instrument.id, last_close).where(
+        Instrument.secid.in_([s.upper() for s in secids]),
+        Instrument.board == board,
+    )
+    rows = (await session.execute(q)).all()
+    return {secid: (inst_id, float(last) if last is not None else None) for secid, inst_id, last in rows}
 
 
-async def buy(
+def _pick_price(resolved: dict, secid: str, price: float | None, board: str) -> tuple[int, float]:
+    if secid not in resolved:
+        raise HTTPException(status_code=404, detail=f"Instrument not found: {secid}")
+    inst_id, last = resolved[secid]
+    if price is None:
+        if last is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No candles in DB for {secid} ({board}, interval=24). Load candles first.",
+            )
+        price = last
+    px = float(price)
+    if px <= 0:
+        raise HTTPException(status_code=400, detail="price must be > 0")
+    return inst_id, px
+
+
+async def _execute(
     session: AsyncSession,
     *,
     account_id: int,
+    instrument_id: int,
     secid: str,
+    side: str,
     qty: float,
-    price: float | None,
-    board: str = "TQBR",
-):
+    px: float,
+) -> dict:
+    """
+    Исполнение без read-modify-write в Python: условные UPDATE прямо в БД,
+    так что параллельные заявки одного счёта не теряют обновления и не уводят cash в минус.
+    Порядок блокировок всегда accounts -> positions (иначе buy/sell могут взаимно заблокироваться).
+    """
+    qty = float(qty)
     if qty <= 0:
         raise HTTPException(status_code=400, detail="qty must be > 0")
-
-    inst = await _get_instrument(session, secid, board=board)
-    px = float(price) if price is not None else await _get_last_price(session, secid, board=board)
-    if px <= 0:
-        raise HTTPException(status_code=400, detail="price must be > 0")
-
-    # account
-    acc = (await session.execute(select(Account).where(Account.id == account_id))).scalar_one_or_none()
-    if not acc:
-        raise HTTPException(status_code=404, detail="Account not found")
-
-    cost = qty * px
-    if acc.cash < cost:
-        raise HTTPException(status_code=400, detail=f"Not enough cash: need {cost}, have {acc.cash}")
-
-    # position
-    pos = (await session.execute(
-        select(Position).where(
-            Position.account_id == account_id,
-            Position.instrument_id == inst.id,
+    amount = qty * px
+
+    if side == "BUY":
+        res = await session.execute(
+            update(Account)
+            .where(Account.id == account_id, Account.cash >= amount)
+            .values(cash=Account.cash - amount)
+            .execution_options(synchronize_session=False)
+        )
+        if res.rowcount == 0:
+            cash = (await session.execute(select(Account.cash).where(Account.id == account_id))).scalar_one_or_none()
+            if cash is None:
+                raise HTTPException(status_code=404, detail="Account not found")
+            raise HTTPException(status_code=400, detail=f"Not enough cash: need {amount}, have {cash}")
+
+        # новая позиция или усреднение существующей; avg_price считается до изменения qty
+        await session.execute(upsert_stmt(
+            dialect_name(session),
+            Position,
+            {"account_id": account_id, "instrument_id": instrument_id, "qty": qty, "avg_price": px, "fifo_cost": amount},
+            index_elements=("account_id", "instrument_id"),
+            update=lambda ex: [
+                ("avg_price", (Position.qty * Position.avg_price + ex.qty * ex.avg_price) / (Position.qty + ex.qty)),
+                ("qty", Position.qty + ex.qty),
+                ("fifo_cost", Position.fifo_cost + ex.fifo_cost),
+            ],
+        ))
+        await add_lot(session, account_id=account_id, instrument_id=instrument_id, qty=qty, price=px)
+
+    elif side == "SELL":
+        res = await session.execute(
+            update(Account)
+            .where(Account.id == account_id)
+            .values(cash=Account.cash + amount)
+            .execution_options(synchronize_session=False)
+        )
+        if res.rowcount == 0:
+            raise HTTPException(status_code=404, detail="Account not found")
+
+        # позиция под блокировкой строки: дальше считаем P&L по прочитанным значениям
+        pos = (await session.execute(
+            select(Position.id, Position.qty, Position.avg_price)
+            .where(Position.account_id == account_id, Position.instrument_id == instrument_id)
+            .with_for_update()
+        )).first()
+        if pos is None or float(pos.qty) < qty:
+            # cash уже увеличен — транзакция откатится вместе с исключением
+            raise HTTPException(status_code=400, detail="Not enough position qty to sell")
+
+        realized_avg = (px - float(pos.avg_price or 0.0)) * qty
+        realized_fifo, fifo_cost = await consume_lots(
+            session, account_id=account_id, instrument_id=instrument_id, qty=qty, price=px,
+        )
+        closed = float(pos.qty) == qty
+        await session.execute(
+            update(Position)
+            .where(Position.id == pos.id)
+            .values(
+                qty=Position.qty - qty,
+                avg_price=0.0 if closed else Position.avg_price,
+                fifo_cost=0.0 if closed else Position.fifo_cost - fifo_cost,
+                realized_pnl=Position.realized_pnl + realized_avg,
+                realized_pnl_fifo=Position.realized_pnl_fifo + realized_fifo,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await session.execute(
+            update(Account)
+            .where(Account.id == account_id)
+            .values(
+                realized_pnl=Account.realized_pnl + realized_avg,
+                realized_pnl_fifo=Account.realized_pnl_fifo + realized_fifo,
+            )
+            .execution_options(synchronize_session=False)
         )
-    )).scalar_one_or_none()
-
-    if pos is None:
-        pos = Position(account_id=account_id, instrument_id=inst.id, qty=0.0, avg_price=0.0)
-        session.add(pos)
-        await session.flush()
-
-    new_qty = float(pos.qty) + float(qty)
-    new_avg = ((float(pos.qty) * float(pos.avg_price)) + (float(qty) * px)) / new_qty if new_qty > 0 else 0.0
-    pos.qty = new_qty
-    pos.avg_price = new_avg
 
-    acc.cash = float(acc.cash) - cost
+    else:
+        raise HTTPException(status_code=400, detail=f"Unknown side: {side}")
 
-    session.add(Trade(
+    now = datetime.utcnow()
+    await session.execute(insert(Trade).values(
         account_id=account_id,
-        instrument_id=inst.id,
-        side="BUY",
-        qty=float(qty),
+        instrument_id=instrument_id,
+        side=side,
+        qty=qty,
         price=px,
+        created_at=now,
     ))
+    return {"secid": secid, "side": side, "qty": qty, "price": px}
 
 
-async def sell(
+async def buy(
     session: AsyncSession,
     *,
     account_id: int,
@@ -94,39 +172,61 @@ async def sell(
     qty: float,
     price: float | None,
     board: str = "TQBR",
-):
+) -> dict:
     if qty <= 0:
         raise HTTPException(status_code=400, detail="qty must be > 0")
+    secid = secid.upper()
+    inst_id, px = _pick_price(await _resolve_instruments(session, [secid], board=board), secid, price, board)
+    return await _execute(session, account_id=account_id, instrument_id=inst_id, secid=secid, side="BUY", qty=qty, px=px)
 
-    inst = await _get_instrument(session, secid, board=board)
-    px = float(price) if price is not None else await _get_last_price(session, secid, board=board)
-    if px <= 0:
-        raise HTTPException(status_code=400, detail="price must be > 0")
-
-    acc = (await session.execute(select(Account).where(Account.id == account_id))).scalar_one_or_none()
-    if not acc:
-        raise HTTPException(status_code=404, detail="Account not found")
-
-    pos = (await session.execute(
-        select(Position).where(
-            Position.account_id == account_id,
-            Position.instrument_id == inst.id,
-        )
-    )).scalar_one_or_none()
-
-    if pos is None or float(pos.qty) < float(qty):
-        raise HTTPException(status_code=400, detail="Not enough position qty to sell")
 
-    pos.qty = float(pos.qty) - float(qty)
-    if pos.qty == 0:
-        pos.avg_price = 0.0
+async def sell(
+    session: AsyncSession,
+    *,
+    account_id: int,
+    secid: str,
+    qty: float,
+    price: float | None,
+    board: str = "TQBR",
+) -> dict:
+    if qty <= 0:
+        raise HTTPException(status_code=400, detail="qty must be > 0")
+    secid = secid.upper()
+    inst_id, px = _pick_price(await _resolve_instruments(session, [secid], board=board), secid, price, board)
+    return await _execute(session, account_id=account_id, instrument_id=inst_id, secid=secid, side="SELL", qty=qty, px=px)
 
-    acc.cash = float(acc.cash) + (float(qty) * px)
 
-    session.add(Trade(
-        account_id=account_id,
-        instrument_id=inst.id,
-        side="SELL",
-        qty=float(qty),
-        price=px,
-    ))
+async def execute_orders(
+    session: AsyncSession,
+    *,
+    account_id: int,
+    orders: list[dict],
+    board: str = "TQBR",
+) -> list[dict]:
+    """
+    Пачка рыночных заявок [{secid, side, qty, price?}] в одной транзакции:
+    цены/инструменты резолвятся одним запросом, любая ошибка откатывает всю пачку
+    (коммит — на вызывающей стороне).
+    """
+    if not orders:
+        return []
+    if len(orders) > MAX_BATCH_ORDERS:
+        raise HTTPException(status_code=400, detail=f"Too many orders: max {MAX_BATCH_ORDERS}")
+
+    secids = sorted({o["secid"].upper() for o in orders})
+    resolved = await _resolve_instruments(session, secids, board=board)
+
+    fills = []
+    for o in orders:
+        secid = o["secid"].upper()
+        inst_id, px = _pick_price(resolved, secid, o.get("price"), board)
+        fills.append(await _execute(
+            session,
+            account_id=account_id,
+            instrument_id=inst_id,
+            secid=secid,
+            side=o["side"].upper(),
+            qty=o["qty"],
+            px=px,
+        ))
+    return fills
@@ -1,6 +1,7 @@
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+from app.db.bulk import bulk_upsert
 from app.db.models import User, Account
 
 async def upsert_user_by_telegram(
@@ -11,28 +12,27 @@ async def upsert_user_by_telegram(
     last_name: str | None,
     photo_url: str | None,
 ) -> int:
-    stmt = mysql_insert(User).values({
-        "telegram_id": telegram_id,
-        "username": username,
-        "first_name": first_name,
-        "last_name": last_name,
-        "photo_url": photo_url,
-    })
-    stmt = stmt.on_duplicate_key_update(
-        username=stmt.inserted.username,
-        first_name=stmt.inserted.first_name,
-        last_name=stmt.inserted.last_name,
-        photo_url=stmt.inserted.photo_url,
+    await bulk_upsert(
+        session,
+        User,
+        [{
+            "telegram_id": telegram_id,
+            "username": username,
+            "first_name": first_name,
+            "last_name": last_name,
+            "photo_url": photo_url,
+        }],
+        index_elements=("telegram_id",),
+        update=("username", "first_name", "last_name", "photo_url"),
     )
-    await session.execute(stmt)
 
     q = select(User.id).where(User.telegram_id == telegram_id)
     return (await session.execute(q)).scalar_one()
 
 async def ensure_account(session: AsyncSession, user_id: int) -> int:
-    stmt = mysql_insert(Account).values({"user_id": user_id})
-    stmt = stmt.on_duplicate_key_update(user_id=stmt.inserted.user_id)
-    await session.execute(stmt)
+    # no-op update: аналог INSERT IGNORE, но переносимый
+    await bulk_upsert(session, Account, [{"user_id": user_id}], index_elements=("user_id",), update=("user_id",))
 
     q = select(Account.id).where(Account.user_id == user_id)
     return (await session.execute(q)).scalar_one()
+
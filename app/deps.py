@@ -1,8 +1,68 @@
 import httpx
+from app.config import settings
+from app.db.core import SessionLocal
 from app.services.moex_iss import MoexIssClient
+from app.services.quotes import QuoteHub
+from app.services.order_book import OrderBooks
+from app.services.trade_journal import TradeJournal
+from app.services.equity_curve import EquityCurves
+from app.services.indicators import IndicatorEngine
+from app.services.replay import MarketReplay
+from app.services.risk import RiskModel
+from app.services.screener import BoardSnapshot
+from app.services.alerts import AlertEngine, LogNotifier
+from app.services.instrument_search import InstrumentSearch
+from app.auth.principal import PrincipalCache
+from app.services.shared_cache import SharedCache, make_backend
+from app.services.response_cache import ResponseCache
+from app.services.rollup_folder import RollupFolder
 
 _http = httpx.AsyncClient(timeout=20)
 moex = MoexIssClient(http=_http)
 
+# живые цены + отложенные заявки (в памяти процесса, восстанавливаются из БД на старте)
+quotes = QuoteHub()
+order_books = OrderBooks(SessionLocal)
+# ценовые алерты: индексы порогов по бумагам, доставка через notifier (пока лог)
+alert_engine = AlertEngine(SessionLocal, LogNotifier())
+# проигрывание истории свечей в тот же QuoteHub (REPLAY_ENABLED)
+replay = MarketReplay(quotes, SessionLocal)
+
+# групповой коммит рыночных заявок (TRADE_INGEST_MODE=journal)
+trade_journal = TradeJournal(
+    SessionLocal,
+    max_delay_ms=settings.TRADE_JOURNAL_MAX_DELAY_MS,
+    max_batch=settings.TRADE_JOURNAL_MAX_BATCH,
+)
+
+# кривые капитала по счетам (кэш в памяти, догружается по мере новых свечей/сделок)
+equity_curves = EquityCurves()
+# индикаторы по свечам из БД (LRU, досчёт по новым барам)
+indicator_engine = IndicatorEngine()
+# дневные матрицы доходностей/ковариаций для /portfolio/risk
+risk_model = RiskModel()
+# колоночный снимок всей доски TQBR для скринера (фоновое обновление)
+board_snapshot = BoardSnapshot(moex, quotes, interval_s=settings.SCREENER_REFRESH_S)
+# поиск по справочнику инструментов, ранжирование по обороту из снимка доски
+instrument_search = InstrumentSearch(turnover=board_snapshot.turnover)
+# пользователь+счёт для get_current_user: TTL-кэш, сброс при логине и сделках
+principals = PrincipalCache(ttl_s=settings.AUTH_CACHE_TTL_S, max_size=settings.AUTH_CACHE_SIZE)
+# кэш, общий для воркеров (бэкенд — CACHE_BACKEND)
+shared_cache = SharedCache(make_backend(
+    settings.CACHE_BACKEND,
+    memory_max_entries=settings.CACHE_MEMORY_MAX_ENTRIES,
+    mmap_path=settings.CACHE_MMAP_PATH,
+    mmap_slots=settings.CACHE_MMAP_SLOTS,
+    mmap_slot_bytes=settings.CACHE_MMAP_SLOT_BYTES,
+    redis_url=settings.CACHE_REDIS_URL,
+))
+# агрегаты сделок для /api/stats/trading — фоном, вне транзакций сделок
+rollup_folder = RollupFolder(SessionLocal, interval_s=settings.ROLLUP_FOLD_INTERVAL_S)
+# сериализованные ответы со свечами (версия — updated_at покрытия CandleCache)
+candle_responses = ResponseCache(
+    max_bytes=settings.CANDLE_RESPONSE_CACHE_BYTES,
+    gzip_min_bytes=settings.CANDLE_RESPONSE_GZIP_MIN_BYTES,
+)
+
 async def shutdown_http():
     await _http.aclose()
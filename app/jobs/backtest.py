@@ -0,0 +1,101 @@
+"""
+Бэктест стратегии по сетке параметров и списку тикеров (только локальные свечи).
+
+    python -m app.jobs.backtest sma_cross SBER,GAZP,LKOH --grid fast=5,10,20 --grid slow=50,100 \
+        --from 2020-01-01 --to 2024-12-31 --fee 0.0005 --slippage 0.0005 --workers 4
+
+Результаты пишутся в backtest_runs (одна партия = один batch), в конце — runs/sec и лучшие прогоны.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import uuid
+from datetime import date
+
+import numpy as np
+from sqlalchemy import insert
+
+from app.db.core import engine, SessionLocal
+from app.db.models import BacktestRun
+from app.db.repo.candles_repo import read_candle_columns
+from app.services.backtest import STRATEGIES, run_grid
+
+
+def _parse_grid(items: list[str]) -> dict[str, list]:
+    grid: dict[str, list] = {}
+    for item in items:
+        key, _, raw = item.partition("=")
+        vals = [v for v in raw.split(",") if v]
+        if not key or not vals:
+            raise SystemExit(f"bad --grid: {item}")
+        try:
+            grid[key] = [int(v) for v in vals]
+        except ValueError:
+            grid[key] = [float(v) for v in vals]
+    return grid
+
+
+async def main(args: argparse.Namespace) -> None:
+    grid = _parse_grid(args.grid)
+    secids = [s.strip().upper() for s in args.secids.split(",") if s.strip()]
+
+    series: dict[str, np.ndarray] = {}
+    async with SessionLocal() as session:
+        for secid in secids:
+            cols = await read_candle_columns(session, secid, args.board, args.interval, args.date_from)
+            mask = cols["d"] <= np.datetime64(args.date_to, "D") if args.date_to else slice(None)
+            close = cols["close"][mask]
+            if len(close) >= 2:
+                series[secid] = close
+            else:
+                print(f"skip {secid}: no candles in DB")
+
+        res = run_grid(args.strategy, series, grid, fee=args.fee, slippage=args.slippage, workers=args.workers)
+
+        if res.runs and not args.no_save:
+            batch = uuid.uuid4().hex
+            await session.execute(insert(BacktestRun), [
+                {
+                    "batch": batch,
+                    "strategy": args.strategy,
+                    "secid": r["secid"],
+                    "interval": args.interval,
+                    "params": json.dumps(r["params"], sort_keys=True),
+                    "date_from": args.date_from,
+                    "date_to": args.date_to,
+                    "fee": args.fee,
+                    "slippage": args.slippage,
+                    **{k: r[k] for k in ("final_equity", "total_return", "max_drawdown", "sharpe", "trades", "exposure")},
+                }
+                for r in res.runs
+            ])
+            await session.commit()
+            print(f"saved batch {batch}")
+    await engine.dispose()
+
+    print(f"runs: {len(res.runs)}  elapsed: {res.elapsed_s:.3f}s  runs/sec: {res.runs_per_sec:.1f}")
+    for r in sorted(res.runs, key=lambda x: x["total_return"], reverse=True)[: args.top]:
+        print(
+            f"{r['secid']:<8} {json.dumps(r['params'], sort_keys=True):<40} "
+            f"ret={r['total_return'] * 100:8.2f}%  dd={r['max_drawdown'] * 100:6.2f}%  "
+            f"sharpe={r['sharpe']:5.2f}  trades={r['trades']}"
+        )
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="backtest over stored candles")
+    p.add_argument("strategy", choices=sorted(STRATEGIES))
+    p.add_argument("secids", help="через запятую")
+    p.add_argument("--grid", action="append", default=[], help="param=v1,v2,... (можно несколько)")
+    p.add_argument("--from", dest="date_from", type=date.fromisoformat, default=None)
+    p.add_argument("--to", dest="date_to", type=date.fromisoformat, default=None)
+    p.add_argument("--board", default="TQBR")
+    p.add_argument("--interval", type=int, default=24)
+    p.add_argument("--fee", type=float, default=0.0)
+    p.add_argument("--slippage", type=float, default=0.0)
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--top", type=int, default=10)
+    p.add_argument("--no-save", action="store_true")
+    asyncio.run(main(p.parse_args()))
@@ -0,0 +1,55 @@
+"""
+Снимок капитала всех счетов на конец дня (для рейтингов за неделю/месяц/год).
+
+    python -m app.jobs.equity_snapshot              # за сегодня
+
+Снимок берёт текущие cash и последние цены, поэтому пишется только за сегодня:
+прошедший день им не восстановить. Повторный запуск за тот же день перезаписывает снимок.
+"""
+from __future__ import annotations
+
+import sys
+import asyncio
+from datetime import date
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.bulk import bulk_upsert
+from app.db.core import engine, SessionLocal
+from app.db.models import Account, EquitySnapshot
+from app.db.repo.leaderboard_repo import positions_value_by_account
+from app.deps import shared_cache
+
+
+async def take_snapshot(session: AsyncSession, d: date, *, board: str = "TQBR", interval: int = 24) -> int:
+    # текущее состояние счетов по последним ценам — под датой d, которая должна быть сегодняшней
+    pv = await positions_value_by_account(session, board=board, interval=interval)
+    rows = [
+        {"d": d, "account_id": acc_id, "cash": float(cash or 0.0), "equity": float(cash or 0.0) + pv.get(acc_id, 0.0)}
+        for acc_id, cash in (await session.execute(select(Account.id, Account.cash))).all()
+    ]
+    return await bulk_upsert(
+        session,
+        EquitySnapshot,
+        rows,
+        index_elements=("d", "account_id"),
+        update=("equity", "cash"),
+    )
+
+
+async def main(d: date):
+    async with SessionLocal() as session:
+        n = await take_snapshot(session, d)
+        await session.commit()
+    # рейтинги за период считаются по снимкам — сбрасываем их во всех воркерах (для mmap/redis)
+    await shared_cache.bump("leaderboard")
+    print({"d": d.isoformat(), "accounts": n})
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    d = date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else date.today()
+    if d != date.today():
+        raise SystemExit(f"snapshot is taken from current cash and prices, only today ({date.today()}) is allowed, got {d}")
+    asyncio.run(main(d))
@@ -0,0 +1,52 @@
+"""
+Колоночная выгрузка свечей/сделок в файл (см. app.services.columnar_export).
+
+    python -m app.jobs.export candles -o candles.npz --secids SBER,GAZP --from 2024-01-01
+    python -m app.jobs.export trades -o trades.arrows --format arrow
+
+Формат по умолчанию — по расширению файла (.npz -> npz, иначе arrow, если есть pyarrow).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from datetime import date
+
+from app.db.core import engine, ReadSessionLocal
+from app.db.repo.candles_repo import iter_candle_batches
+from app.db.repo.trades_repo import iter_trade_batches
+from app.services.columnar_export import CANDLE_SCHEMA, TRADE_SCHEMA, export_stream, default_format
+
+
+async def main(args: argparse.Namespace) -> None:
+    fmt = args.format or ("npz" if args.output.endswith(".npz") else default_format())
+    t0 = time.perf_counter()
+    size = 0
+    async with ReadSessionLocal() as session:
+        if args.what == "candles":
+            secids = [s.strip().upper() for s in args.secids.split(",") if s.strip()] if args.secids else None
+            batches = iter_candle_batches(session, secids, args.board, args.interval, args.date_from, args.date_to)
+            schema = CANDLE_SCHEMA
+        else:
+            batches = iter_trade_batches(session, date_from=args.date_from, date_to=args.date_to)
+            schema = TRADE_SCHEMA
+        with open(args.output, "wb") as f:
+            async for chunk in export_stream(batches, schema, fmt):
+                f.write(chunk)
+                size += len(chunk)
+    print({"what": args.what, "format": fmt, "file": args.output, "bytes": size, "elapsed_s": round(time.perf_counter() - t0, 3)})
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("what", choices=("candles", "trades"))
+    p.add_argument("-o", "--output", required=True)
+    p.add_argument("--format", choices=("arrow", "npz"))
+    p.add_argument("--secids")
+    p.add_argument("--from", dest="date_from", type=date.fromisoformat)
+    p.add_argument("--to", dest="date_to", type=date.fromisoformat)
+    p.add_argument("--interval", type=int, default=24)
+    p.add_argument("--board", default="TQBR")
+    asyncio.run(main(p.parse_args()))
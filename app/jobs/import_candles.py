@@ -0,0 +1,77 @@
+"""
+Массовая загрузка истории свечей из ISS в БД (candles_repo.import_candles: большие пачки —
+через LOAD DATA + staging при DB_LOCAL_INFILE=true, иначе upsert пачками).
+
+    python -m app.jobs.import_candles --from 2015-01-01 --to 2024-12-31               # все инструменты доски
+    python -m app.jobs.import_candles --from 2024-01-01 --secids SBER,GAZP --interval 60
+
+Тикеры тянутся параллельно (--concurrency), пишутся группами по --chunk тикеров, одна транзакция на группу.
+Загруженные диапазоны отмечаются в candle_cache — API отдаёт их из БД без похода в ISS.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from datetime import date
+
+import httpx
+from sqlalchemy import select
+
+from app.db.core import engine, SessionLocal
+from app.db.models import Instrument
+from app.db.repo.candles_repo import import_candles, mark_cache_range
+from app.deps import moex, shutdown_http
+from app.routers.market import normalize_iss_candles
+
+
+async def main(args: argparse.Namespace) -> None:
+    t0 = time.perf_counter()
+    date_to = args.date_to or date.today()
+    async with SessionLocal() as session:
+        if args.secids:
+            secids = [s.strip().upper() for s in args.secids.split(",") if s.strip()]
+        else:
+            secids = list((await session.execute(
+                select(Instrument.secid).where(Instrument.board == args.board).order_by(Instrument.secid)
+            )).scalars().all())
+
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async def fetch(secid: str) -> list[dict] | None:
+        async with sem:
+            try:
+                return normalize_iss_candles(await moex.candles_tqbr_all(secid, args.date_from, date_to, interval=args.interval))
+            except httpx.HTTPError as e:
+                print({"secid": secid, "error": repr(e)})
+                return None
+
+    rows = 0
+    failed: list[str] = []
+    for i in range(0, len(secids), args.chunk):
+        chunk = secids[i:i + args.chunk]
+        fetched = await asyncio.gather(*(fetch(s) for s in chunk))
+        rows_by_secid = {s: r for s, r in zip(chunk, fetched) if r is not None}
+        failed += [s for s, r in zip(chunk, fetched) if r is None]
+        async with SessionLocal() as session:
+            rows += await import_candles(session, args.board, args.interval, rows_by_secid)
+            for secid in rows_by_secid:
+                await mark_cache_range(session, secid, args.board, args.interval, args.date_from, date_to)
+            await session.commit()
+        print({"done": i + len(chunk), "of": len(secids), "rows": rows})
+
+    print({"secids": len(secids), "failed": failed, "rows": rows, "elapsed_s": round(time.perf_counter() - t0, 3)})
+    await shutdown_http()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--from", dest="date_from", type=date.fromisoformat, required=True)
+    p.add_argument("--to", dest="date_to", type=date.fromisoformat)
+    p.add_argument("--secids")
+    p.add_argument("--board", default="TQBR")
+    p.add_argument("--interval", type=int, default=24)
+    p.add_argument("--concurrency", type=int, default=4)
+    p.add_argument("--chunk", type=int, default=50)
+    asyncio.run(main(p.parse_args()))
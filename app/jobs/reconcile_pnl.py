@@ -0,0 +1,31 @@
+"""
+Пересборка лотов и P&L из журнала trades (сверка инкрементальных значений).
+
+    python -m app.jobs.reconcile_pnl            # все счета
+    python -m app.jobs.reconcile_pnl 42         # один счёт
+"""
+from __future__ import annotations
+
+import sys
+import asyncio
+
+from sqlalchemy import select
+
+from app.db.core import engine, SessionLocal
+from app.db.models import Account
+from app.db.repo.lots_repo import reconcile_account
+
+
+async def main(account_ids: list[int] | None = None):
+    async with SessionLocal() as session:
+        if not account_ids:
+            account_ids = list((await session.execute(select(Account.id).order_by(Account.id))).scalars().all())
+        for acc_id in account_ids:
+            res = await reconcile_account(session, acc_id)
+            await session.commit()
+            print(res)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main([int(a) for a in sys.argv[1:]]))
@@ -0,0 +1,35 @@
+"""
+Агрегаты trade_rollups.
+
+    python -m app.jobs.trade_rollups --fold                   # доложить новые сделки (если ROLLUP_FOLD_INTERVAL_S=0 — по cron)
+    python -m app.jobs.trade_rollups                          # пересчёт всей истории
+    python -m app.jobs.trade_rollups 2024-05-01 2024-05-31    # пересчёт диапазона дней (UTC)
+
+Пересчёт берёт сделки до водяного знака, остальные докладываются следом тем же проходом, что и --fold.
+"""
+from __future__ import annotations
+
+import sys
+import asyncio
+from datetime import date
+
+from app.db.core import engine, SessionLocal
+from app.db.repo.stats_repo import rebuild_rollups
+from app.services.rollup_folder import RollupFolder
+
+
+async def main(date_from: date | None, date_to: date | None, *, fold_only: bool = False):
+    n = None
+    if not fold_only:
+        async with SessionLocal() as session:
+            n = await rebuild_rollups(session, date_from, date_to)
+            await session.commit()
+    folded = await RollupFolder(SessionLocal).fold()
+    print({"from": date_from and date_from.isoformat(), "to": date_to and date_to.isoformat(), "rows": n, "folded": folded})
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    fold_only = "--fold" in sys.argv[1:]
+    args = [date.fromisoformat(a) for a in sys.argv[1:3] if a != "--fold"]
+    asyncio.run(main(args[0] if args else None, args[1] if len(args) > 1 else None, fold_only=fold_only))
@@ -11,13 +11,27 @@ from app.routers.trading import router as trading_router
 from app.routers.portfolio import router as portfolio_router
 from app.routers.positions import router as positions_router
 from app.routers.leaderboard import router as leaderboard_router
+from app.routers.metrics import router as metrics_router
+from app.routers.orders import router as orders_router
+from app.routers.quotes_stream import router as quotes_stream_router
+from app.routers.replay import router as replay_router
+from app.routers.alerts import router as alerts_router
+from app.routers.instruments import router as instruments_router
+from app.routers.trades import router as trades_router
+from app.routers.stats import router as stats_router
+from app.routers.export import router as export_router
 
 
 
-from app.db.core import engine
+from app.config import settings
+from app.db.core import engine, SessionLocal
 from app.db.init_db import init_db
+from app.deps import quotes, order_books, trade_journal, replay, board_snapshot, alert_engine, principals, candle_responses, rollup_folder
+from app.db.repo import candles_repo
+from app.services.fast_json import FastJSONResponse
 
-app = FastAPI(title="MOEX Demo")
+# orjson вместо stdlib json для всех ответов (см. app/services/fast_json.py)
+app = FastAPI(title="MOEX Demo", default_response_class=FastJSONResponse)
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -29,6 +43,18 @@ app.include_router(trading_router, prefix="/api")
 app.include_router(portfolio_router, prefix="/api")
 app.include_router(positions_router, prefix="/api")
 app.include_router(leaderboard_router, prefix="/api")
+app.include_router(orders_router, prefix="/api")
+app.include_router(quotes_stream_router, prefix="/api")
+app.include_router(alerts_router, prefix="/api")
+app.include_router(instruments_router, prefix="/api")
+app.include_router(trades_router, prefix="/api")
+app.include_router(stats_router, prefix="/api")
+if settings.METRICS_ENABLED:
+    app.include_router(metrics_router, prefix="/api")
+if settings.REPLAY_ENABLED:
+    app.include_router(replay_router, prefix="/api")
+if settings.EXPORT_ENABLED:
+    app.include_router(export_router, prefix="/api")
 
 
 
@@ -42,3 +68,38 @@ app.include_router(me_router, prefix="/api")  # если в me_router нет pre
 @app.on_event("startup")
 async def _startup():
     await init_db(engine)
+
+    # отложенные заявки: книги из БД + подписка на поток цен
+    async with SessionLocal() as session:
+        await order_books.load(session)
+    quotes.subscribe(order_books.on_tick)
+    quotes.subscribe(alert_engine.on_tick)
+    # свечи перезаписаны — готовые ответы по этим бумагам устарели
+    if candle_responses.invalidate not in candles_repo.on_candles_changed:
+        candles_repo.on_candles_changed.append(candle_responses.invalidate)
+
+    if settings.SCREENER_REFRESH_S > 0:
+        board_snapshot.start()
+    if settings.ROLLUP_FOLD_INTERVAL_S > 0:
+        rollup_folder.start()
+
+    journal = settings.TRADE_INGEST_MODE == "journal"
+
+    def _account_changed(account_id: int) -> None:
+        # исполнение отложенной заявки: cash в кэше пользователя и состояние журнала устарели
+        principals.invalidate_account(account_id)
+        if journal:
+            trade_journal.invalidate(account_id)
+
+    order_books.on_account_changed = _account_changed
+    if journal:
+        trade_journal.start()
+
+
+@app.on_event("shutdown")
+async def _shutdown():
+    await replay.stop()
+    await board_snapshot.stop()
+    await rollup_folder.stop()
+    # дописываем то, что уже принято журналом
+    await trade_journal.stop()
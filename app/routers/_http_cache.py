@@ -0,0 +1,47 @@
+import hashlib
+
+from fastapi import Request, Response
+
+# сколько браузер/nginx держат ответ и сколько ещё могут отдавать его, обновляя в фоне
+CANDLES_CACHE_CONTROL = "public, max-age=60, stale-while-revalidate=600"
+LAST_CACHE_CONTROL = "public, max-age=5, stale-while-revalidate=30"
+POPULAR_CACHE_CONTROL = "public, max-age=15, stale-while-revalidate=60"
+LEADERBOARD_CACHE_CONTROL = "public, max-age=30, stale-while-revalidate=120"
+
+
+def make_etag(*parts) -> str:
+    """Слабый ETag по версии данных (слабый — тело может уйти и в gzip, и без)."""
+    h = hashlib.blake2b(digest_size=12)
+    for p in parts:
+        h.update(p if isinstance(p, bytes) else repr(p).encode())
+        h.update(b"\x00")
+    return f'W/"{h.hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match сравнивается слабо: W/ не учитываем
+    opaque = etag.removeprefix("W/")
+    return any(t.strip().removeprefix("W/") == opaque for t in header.split(","))
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def with_validators(response: Response, etag: str, cache_control: str) -> Response:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+
+def json_bytes(request: Request, body: bytes, cache_control: str) -> Response:
+    """Готовое JSON-тело (например, из общего кэша): ETag — хэш тела, 304 без отправки."""
+    etag = make_etag(body)
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control)
+    return with_validators(Response(body, media_type="application/json"), etag, cache_control)
@@ -0,0 +1,20 @@
+from fastapi import HTTPException
+
+# сколько тикеров можно запросить одним батчем
+MAX_BATCH_SECIDS = 50
+
+
+def parse_secids(secids: str) -> list[str]:
+    """
+    "sber, GAZP,sber" -> ["SBER", "GAZP"] (порядок сохраняется, дубли выкидываются).
+    """
+    out: list[str] = []
+    for s in secids.split(","):
+        s = s.strip().upper()
+        if s and s not in out:
+            out.append(s)
+    if not out:
+        raise HTTPException(status_code=400, detail="secids is empty")
+    if len(out) > MAX_BATCH_SECIDS:
+        raise HTTPException(status_code=400, detail=f"Too many secids: max {MAX_BATCH_SECIDS}")
+    return out
@@ -0,0 +1,104 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.core import get_session
+from app.auth.deps import get_current_user
+from app.db.repo.alerts_repo import create_alert, list_alerts, update_alert, cancel_alert
+from app.deps import alert_engine, quotes
+
+router = APIRouter(prefix="/alerts", tags=["alerts"])
+
+
+class AlertRequest(BaseModel):
+    secid: str = Field(..., min_length=1)
+    price: float = Field(..., gt=0)
+    # не указан — по текущей цене: порог выше неё => ABOVE, ниже => BELOW
+    direction: Literal["ABOVE", "BELOW"] | None = None
+    note: str | None = Field(None, max_length=255)
+
+    class Config:
+        extra = "forbid"
+
+
+class AlertUpdate(BaseModel):
+    price: float | None = Field(None, gt=0)
+    direction: Literal["ABOVE", "BELOW"] | None = None
+    note: str | None = Field(None, max_length=255)
+
+    class Config:
+        extra = "forbid"
+
+
+@router.post("")
+async def add_alert(
+    body: AlertRequest,
+    session: AsyncSession = Depends(get_session),
+    user_acc=Depends(get_current_user),
+):
+    user, acc = user_acc
+    direction = body.direction
+    if direction is None:
+        last = quotes.last(body.secid)
+        if last is None:
+            raise HTTPException(status_code=400, detail="No live price for secid, pass direction explicitly")
+        direction = "ABOVE" if body.price > last[0] else "BELOW"
+
+    alert = await create_alert(
+        session,
+        user_id=user.id,
+        secid=body.secid,
+        direction=direction,
+        price=body.price,
+        note=body.note,
+    )
+    await session.commit()
+    alert_engine.invalidate(alert["secid"])
+    return {"ok": True, "alert": alert}
+
+
+@router.get("")
+async def my_alerts(
+    status: Literal["ACTIVE", "TRIGGERED", "CANCELLED"] | None = None,
+    limit: int = 100,
+    session: AsyncSession = Depends(get_session),
+    user_acc=Depends(get_current_user),
+):
+    user, acc = user_acc
+    return {"items": await list_alerts(session, user_id=user.id, status=status, limit=limit)}
+
+
+@router.patch("/{alert_id}")
+async def edit_alert(
+    alert_id: int,
+    body: AlertUpdate,
+    session: AsyncSession = Depends(get_session),
+    user_acc=Depends(get_current_user),
+):
+    user, acc = user_acc
+    values = body.model_dump(exclude_unset=True)
+    if not values:
+        raise HTTPException(status_code=400, detail="Nothing to update")
+    alert = await update_alert(session, user_id=user.id, alert_id=alert_id, values=values)
+    if alert is None:
+        raise HTTPException(status_code=404, detail="Active alert not found")
+    await session.commit()
+    alert_engine.invalidate(alert["secid"])
+    return {"ok": True, "alert": alert}
+
+
+@router.delete("/{alert_id}")
+async def delete_alert(
+    alert_id: int,
+    session: AsyncSession = Depends(get_session),
+    user_acc=Depends(get_current_user),
+):
+    user, acc = user_acc
+    secid = await cancel_alert(session, user_id=user.id, alert_id=alert_id)
+    if secid is None:
+        raise HTTPException(status_code=404, detail="Active alert not found")
+    await session.commit()
+    alert_engine.invalidate(secid)
+    return {"ok": True}
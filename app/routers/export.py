@@ -0,0 +1,66 @@
+from datetime import date
+from typing import Literal
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.db.core import ReadSessionLocal
+from app.db.repo.candles_repo import iter_candle_batches
+from app.db.repo.trades_repo import iter_trade_batches
+from app.services.columnar_export import (
+    CANDLE_SCHEMA, TRADE_SCHEMA, MEDIA_TYPES, EXTENSIONS, export_stream, default_format, check_format,
+)
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+
+def _response(batches, schema: tuple, fmt: str, name: str) -> StreamingResponse:
+    return StreamingResponse(
+        export_stream(batches, schema, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{EXTENSIONS[fmt]}"'},
+    )
+
+
+def _format(fmt: str | None) -> str:
+    try:
+        return check_format(fmt or default_format())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/candles")
+async def export_candles(
+    secids: str | None = Query(None, description="через запятую; пусто — все бумаги доски"),
+    date_from: date | None = Query(None, alias="from"),
+    date_to: date | None = Query(None, alias="to"),
+    interval: int = 24,
+    board: str = "TQBR",
+    format: Literal["arrow", "npz"] | None = None,
+):
+    fmt = _format(format)
+    wanted = [s.strip().upper() for s in secids.split(",") if s.strip()] if secids else None
+
+    async def batches():
+        # своя сессия: тело ответа пишется после выхода из роута
+        async with ReadSessionLocal() as session:
+            async for rows in iter_candle_batches(session, wanted, board, interval, date_from, date_to):
+                yield rows
+
+    return _response(batches(), CANDLE_SCHEMA, fmt, f"candles_{board}_{interval}")
+
+
+@router.get("/trades")
+async def export_trades(
+    date_from: date | None = Query(None, alias="from"),
+    date_to: date | None = Query(None, alias="to"),
+    format: Literal["arrow", "npz"] | None = None,
+):
+    fmt = _format(format)
+
+    async def batches():
+        async with ReadSessionLocal() as session:
+            async for rows in iter_trade_batches(session, date_from=date_from, date_to=date_to):
+                yield rows
+
+    return _response(batches(), TRADE_SCHEMA, fmt, "trades")
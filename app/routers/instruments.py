@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.core import get_read_session
+from app.deps import instrument_search
+
+router = APIRouter(prefix="/instruments", tags=["instruments"])
+
+
+@router.get("/search")
+async def search(
+    q: str = Query(..., min_length=1, max_length=64),
+    limit: int = Query(10, ge=1, le=50),
+    session: AsyncSession = Depends(get_read_session),
+):
+    # индекс в памяти; БД трогаем только при первой загрузке справочника
+    await instrument_search.ensure_loaded(session)
+    return {"q": q, "items": instrument_search.search(q, limit=limit)}
@@ -1,16 +1,33 @@
-from fastapi import APIRouter, Depends
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.core import get_session
-from app.db.repo.leaderboard_repo import get_leaderboard
+from app.db.core import get_read_session
+from app.db.repo.leaderboard_repo import get_leaderboard, get_period_leaderboard
+from app.deps import shared_cache
+from app.routers._http_cache import LEADERBOARD_CACHE_CONTROL, json_bytes
+from app.services.fast_json import dumps
 
 router = APIRouter(tags=["leaderboard"])
 
+LEADERBOARD_TTL_S = 30.0
+
 
 @router.get("/leaderboard")
 async def leaderboard(
+    request: Request,
     top: int = 10,
-    session: AsyncSession = Depends(get_session),
+    period: Literal["week", "month", "ytd"] | None = None,
+    session: AsyncSession = Depends(get_read_session),
 ):
-    items = await get_leaderboard(session, top=top)
-    return {"items": items}
+    # без period — текущий капитал, с period — доходность по дневным снимкам;
+    # считается по всем счетам, поэтому готовое тело общее для воркеров на LEADERBOARD_TTL_S
+    # (после снимка equity_snapshot сбрасывает пространство "leaderboard")
+    async def load() -> bytes:
+        if period:
+            return dumps({"period": period, "items": await get_period_leaderboard(session, period=period, top=top)})
+        return dumps({"items": await get_leaderboard(session, top=top)})
+
+    body = await shared_cache.get_or_set_bytes("leaderboard", f"{period or 'now'}:{top}", LEADERBOARD_TTL_S, load)
+    return json_bytes(request, body, LEADERBOARD_CACHE_CONTROL)
@@ -1,43 +1,76 @@
+import asyncio
+import time
 from datetime import date
-from fastapi import APIRouter, Depends, Query
+from typing import Callable, Literal
+
+import httpx
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.core import get_session
-from app.deps import moex
+from app.db.core import get_session, get_read_session
+from app.deps import (
+    moex, quotes as quote_hub, indicator_engine, board_snapshot, instrument_search, shared_cache, candle_responses,
+)
+from app.routers._params import parse_secids
+from app.routers._http_cache import (
+    CANDLES_CACHE_CONTROL, POPULAR_CACHE_CONTROL, make_etag, etag_matches, not_modified, with_validators, json_bytes,
+)
+from app.services.fast_json import dumps, FastJSONResponse
 
 from app.db.repo.candles_repo import (
-    cache_is_fresh, read_candles, upsert_candles, mark_cache_range
+    cache_updated_at, candles_version, read_candles, upsert_candles, mark_cache_range,
+    fresh_cache_secids, read_candles_many,
 )
 
 from app.services.popular_by_turnover import popular_today_by_valtoday
+from app.services.indicators import parse_indicators
+from app.services.screener import screen
 from app.db.repo.instruments_repo import (
     upsert_instruments, is_instruments_cache_fresh, get_instrument
 )
 
 router = APIRouter(prefix="/market", tags=["market"])
 
+# сколько параллельных запросов в ISS при батч-загрузке свечей
+ISS_CONCURRENCY = 8
+
+
+POPULAR_TTL_S = 15.0
+
 
 @router.get("/popular-today")
 async def popular_today(
+    request: Request,
     top: int = 15,
     session: AsyncSession = Depends(get_session),
 ):
+    # ISS листается десятками страниц — готовое тело общее для всех воркеров на POPULAR_TTL_S
+    body = await shared_cache.get_or_set_bytes(
+        "popular", str(top), POPULAR_TTL_S, lambda: _popular_today(session, top),
+    )
+    return json_bytes(request, body, POPULAR_CACHE_CONTROL)
+
+
+async def _popular_today(session: AsyncSession, top: int) -> bytes:
     board = "TQBR"
 
     # 1) котировки/оборот (из MOEX)
     quotes = await popular_today_by_valtoday(moex, top_n=top)  # [{secid,last,valtoday,...}]
     secids = [q["secid"] for q in quotes]
+    quote_hub.publish_background([(q["secid"], q["last"]) for q in quotes if q.get("last")])
 
     # 2) если справочник не свежий — обновим
     if not await is_instruments_cache_fresh(session, max_age_hours=24):
         info = await moex.securities_info_tqbr(secids)  # [{SECID,NAME,SHORTNAME,ISIN,LOTSIZE...}]
-        await upsert_instruments(session, board=board, rows=info)
+        values = await upsert_instruments(session, board=board, rows=info)
         await session.commit()
+        instrument_search.upsert(values)
 
     # 3) склеим
     items = []
-    for q in quotes:
-        inst = await get_instrument(session, q["secid"], board=board)
+    insts = await asyncio.gather(*(get_instrument(session, q["secid"], board=board) for q in quotes))
+    for q, inst in zip(quotes, insts):
         items.append({
             "secid": q["secid"],
             "name": (inst["name"] if inst else q["secid"]),
@@ -46,7 +79,7 @@ async def popular_today(
             "time": q.get("time"),
         })
 
-    return {"items": items}
+    return dumps({"items": items})
 
 
 def downsample(items: list[dict], max_points: int = 1500) -> list[dict]:
@@ -57,26 +90,7 @@ def downsample(items: list[dict], max_points: int = 1500) -> list[dict]:
     return items[::step]
 
 
-@router.get("/candles/{secid}")
-async def candles(
-    secid: str,
-    date_from: date = Query(..., alias="from"),
-    date_to: date = Query(..., alias="to"),
-    interval: int = Query(24),
-    max_points: int = Query(1500),
-    session: AsyncSession = Depends(get_session),
-):
-    secid = secid.upper()
-    board = "TQBR"
-
-    if await cache_is_fresh(session, secid, board, interval, date_from, date_to, ttl_minutes=60):
-        data = await read_candles(session, secid, board, interval, date_from, date_to)
-        return {"secid": secid, "candles": downsample(data, max_points=max_points), "source": "db"}
-
-    # 1) тянем из MOEX (пагинация start внутри candles_tqbr_all)
-    rows_raw = await moex.candles_tqbr_all(secid, date_from, date_to, interval=interval)
-
-    # 2) нормализуем
+def normalize_iss_candles(rows_raw: list[dict]) -> list[dict]:
     rows_norm = []
     for r in rows_raw:
         t = r.get("begin") or r.get("BEGIN") or r.get("end") or r.get("END")
@@ -90,6 +104,116 @@ async def candles(
             "close": r.get("close") if r.get("close") is not None else r.get("CLOSE"),
             "volume": r.get("volume") if r.get("volume") is not None else r.get("VOLUME"),
         })
+    return rows_norm
+
+
+@router.get("/candles")
+async def candles_batch(
+    secids: str = Query(..., description="SBER,GAZP,..."),
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    interval: int = Query(24),
+    max_points: int = Query(1500),
+    session: AsyncSession = Depends(get_session),
+    read_session: AsyncSession = Depends(get_read_session),
+):
+    board = "TQBR"
+    wanted = parse_secids(secids)
+
+    # 1) какие тикеры уже свежие в БД — один запрос
+    fresh = await fresh_cache_secids(read_session, wanted, board, interval, date_from, date_to, ttl_minutes=60)
+    stale = [s for s in wanted if s not in fresh]
+
+    # 2) промахи тянем из MOEX параллельно (с ограничением)
+    failed: set[str] = set()
+    if stale:
+        # не держим соединение чтения, пока ждём ISS
+        await read_session.rollback()
+        sem = asyncio.Semaphore(ISS_CONCURRENCY)
+
+        async def fetch(secid: str) -> list[dict] | None:
+            async with sem:
+                try:
+                    return await moex.candles_tqbr_all(secid, date_from, date_to, interval=interval)
+                except httpx.HTTPError:
+                    # сетевые/HTTP ошибки ISS — отдаём что есть в БД; остальное пусть падает
+                    return None
+
+        fetched = await asyncio.gather(*(fetch(s) for s in stale))
+
+        # сессия не потокобезопасна — пишем последовательно, но одним коммитом
+        for secid, rows_raw in zip(stale, fetched):
+            if rows_raw is None:
+                failed.add(secid)
+                continue
+            await upsert_candles(session, secid, board, interval, normalize_iss_candles(rows_raw))
+            await mark_cache_range(session, secid, board, interval, date_from, date_to)
+        await session.commit()
+
+    # 3) читаем всё одним запросом (после записи — из primary, чтобы не ловить лаг реплики)
+    data = await read_candles_many(session if stale else read_session, wanted, board, interval, date_from, date_to)
+
+    items = []
+    for secid in wanted:
+        if secid in fresh:
+            source = "db"
+        elif secid in failed:
+            source = "db (moex error)"
+        else:
+            source = "moex->db"
+        items.append({
+            "secid": secid,
+            "candles": downsample(data[secid], max_points=max_points),
+            "source": source,
+        })
+    # тысячи свечей: сразу в orjson, мимо jsonable_encoder
+    return FastJSONResponse({"items": items})
+
+
+def _candles_body(secid: str, rows: list[dict], source: str) -> dict:
+    return {"secid": secid, "candles": rows, "source": source}
+
+
+def _line_body(secid: str, rows: list[dict], source: str) -> dict:
+    return {"secid": secid, "points": [{"t": c["t"], "close": c["close"]} for c in rows], "source": source}
+
+
+async def _series(
+    request: Request,
+    secid: str,
+    date_from: date,
+    date_to: date,
+    interval: int,
+    max_points: int,
+    session: AsyncSession,
+    read_session: AsyncSession,
+    shape: Callable[[str, list[dict], str], dict],
+):
+    secid = secid.upper()
+    board = "TQBR"
+
+    fresh_at = await cache_updated_at(read_session, secid, board, interval, date_from, date_to, ttl_minutes=60)
+    if fresh_at is not None:
+        # диапазон свежий: у клиента та же версия — 304 без чтения свечей;
+        # иначе готовое тело из кэша, промах — из БД и в кэш под текущей версией.
+        # Версия — покрытие + сами свечи: перезагрузка перекрывающего диапазона её тоже меняет
+        version = (fresh_at, *await candles_version(read_session, secid, board, interval, date_from, date_to))
+        key = (shape.__name__, secid, board, interval, date_from, date_to, max_points)
+        etag = make_etag(*key, version)
+        if etag_matches(request, etag):
+            return not_modified(etag, CANDLES_CACHE_CONTROL)
+        cached = candle_responses.get(key, version)
+        if cached is None:
+            data = await read_candles(read_session, secid, board, interval, date_from, date_to)
+            cached = candle_responses.put(key, secid, version, shape(secid, downsample(data, max_points=max_points), "db"))
+        return with_validators(cached.response(request), etag, CANDLES_CACHE_CONTROL)
+
+    # 1) тянем из MOEX (пагинация start внутри candles_tqbr_all); соединение чтения на это время отдаём
+    await read_session.rollback()
+    rows_raw = await moex.candles_tqbr_all(secid, date_from, date_to, interval=interval)
+
+    # 2) нормализуем
+    rows_norm = normalize_iss_candles(rows_raw)
 
     # 3) сохраняем в MySQL (upsert) + отмечаем кэш
     await upsert_candles(session, secid, board, interval, rows_norm)
@@ -97,25 +221,112 @@ async def candles(
     await session.commit()
 
     data = await read_candles(session, secid, board, interval, date_from, date_to)
-    return {"secid": secid, "candles": downsample(data, max_points=max_points), "source": "moex->db"}
+    return FastJSONResponse(shape(secid, downsample(data, max_points=max_points), "moex->db"))
+
+
+@router.get("/candles/{secid}")
+async def candles(
+    request: Request,
+    secid: str,
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    interval: int = Query(24),
+    max_points: int = Query(1500),
+    session: AsyncSession = Depends(get_session),
+    read_session: AsyncSession = Depends(get_read_session),
+):
+    return await _series(request, secid, date_from, date_to, interval, max_points, session, read_session, _candles_body)
 
 
 @router.get("/line/{secid}")
 async def line(
+    request: Request,
     secid: str,
     date_from: date = Query(..., alias="from"),
     date_to: date = Query(..., alias="to"),
     interval: int = Query(24),
     max_points: int = Query(2000),
     session: AsyncSession = Depends(get_session),
+    read_session: AsyncSession = Depends(get_read_session),
 ):
-    resp = await candles(
-        secid,
-        date_from=date_from,
-        date_to=date_to,
-        interval=interval,
-        max_points=max_points,
-        session=session,
+    return await _series(request, secid, date_from, date_to, interval, max_points, session, read_session, _line_body)
+
+
+@router.get("/indicators/{secid}")
+async def indicators(
+    secid: str,
+    names: str = Query("sma:20"),
+    date_from: date | None = Query(None, alias="from"),
+    date_to: date | None = Query(None, alias="to"),
+    interval: int = Query(24),
+    max_points: int = Query(1500),
+    session: AsyncSession = Depends(get_read_session),
+):
+    # только по свечам, уже лежащим в БД (их подтягивают /candles и импорт)
+    secid = secid.upper()
+    try:
+        specs = parse_indicators(names)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    days, series = await indicator_engine.compute(session, secid, "TQBR", interval, specs)
+    if not len(days):
+        raise HTTPException(status_code=404, detail=f"No candles in DB for {secid} (TQBR, interval={interval})")
+
+    # считаем по всей истории, режем и прореживаем уже готовый результат
+    lo = 0 if date_from is None else int(np.searchsorted(days, np.datetime64(date_from, "D"), side="left"))
+    hi = len(days) if date_to is None else int(np.searchsorted(days, np.datetime64(date_to, "D"), side="right"))
+    idx = np.array(downsample(list(range(lo, hi)), max_points=max_points), dtype=np.int64)
+
+    # колонки numpy уходят в orjson как есть (NaN -> null)
+    return FastJSONResponse({
+        "secid": secid,
+        "interval": interval,
+        "t": days[idx].astype(str).tolist(),
+        "series": {name: {k: arr[idx] for k, arr in outs.items()} for name, outs in series.items()},
+        "source": "db",
+    })
+
+
+@router.get("/screener")
+async def screener(
+    min_last: float | None = None,
+    max_last: float | None = None,
+    min_change: float | None = None,
+    max_change: float | None = None,
+    min_turnover: float | None = None,
+    max_turnover: float | None = None,
+    min_volume: float | None = None,
+    max_volume: float | None = None,
+    min_lot: float | None = None,
+    max_lot: float | None = None,
+    sort: Literal["last", "change", "turnover", "volume", "lot"] = "turnover",
+    order: Literal["asc", "desc"] = "desc",
+    limit: int = Query(50, ge=1, le=500),
+):
+    # только по снимку в памяти — ни БД, ни ISS на запросе
+    snap = board_snapshot.snapshot
+    if snap is None:
+        raise HTTPException(status_code=503, detail="Screener snapshot is not loaded yet")
+
+    t0 = time.perf_counter()
+    matched, items = screen(
+        snap,
+        ranges={
+            "last": (min_last, max_last),
+            "change": (min_change, max_change),
+            "turnover": (min_turnover, max_turnover),
+            "volume": (min_volume, max_volume),
+            "lot": (min_lot, max_lot),
+        },
+        sort=sort,
+        desc=order == "desc",
+        limit=limit,
     )
-    pts = [{"t": c["t"], "close": c["close"]} for c in resp["candles"]]
-    return {"secid": secid.upper(), "points": pts, "source": resp.get("source")}
+    return {
+        "as_of": snap.updated_at,
+        "total": len(snap),
+        "matched": matched,
+        "took_us": round((time.perf_counter() - t0) * 1e6, 1),
+        "items": items,
+    }
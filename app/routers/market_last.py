@@ -1,19 +1,79 @@
-from fastapi import APIRouter, Depends, HTTPException
+import httpx
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.core import get_session
+from app.db.core import get_read_session
 from app.db.models import Candle
+from app.db.repo.candles_repo import read_last_closes
+from app.deps import moex, quotes
+from app.routers._params import parse_secids
+from app.routers._http_cache import LAST_CACHE_CONTROL, make_etag, etag_matches, not_modified, with_validators
 
 router = APIRouter(prefix="/market", tags=["market"])
 
 
+@router.get("/last")
+async def market_last_batch(
+    request: Request,
+    response: Response,
+    secids: str = Query(..., description="SBER,GAZP,..."),
+    session: AsyncSession = Depends(get_read_session),
+):
+    wanted = parse_secids(secids)
+
+    # 1) всё, что есть в БД, — одним запросом
+    found = await read_last_closes(session, wanted, board="TQBR", interval=24)
+
+    # 2) промахи — одним запросом в ISS (marketdata по списку securities=...)
+    missing = [s for s in wanted if s not in found]
+    from_moex: dict[str, dict] = {}
+    if missing:
+        try:
+            rows = await moex.last_prices_tqbr(missing)
+        except httpx.HTTPError:
+            rows = []
+        for r in rows:
+            secid = (r.get("SECID") or "").upper()
+            last = r.get("LAST")
+            if secid in missing and last is not None and float(last) > 0:
+                from_moex[secid] = {"last": float(last), "time": r.get("UPDATETIME")}
+        quotes.publish_background([(s, m["last"]) for s, m in from_moex.items()])
+
+    # у всех элементов одинаковый набор ключей: date — дата свечи из БД, time — UPDATETIME из ISS
+
+    items = []
+    for secid in wanted:
+        if secid in found:
+            close, d = found[secid]
+            items.append({"secid": secid, "last": close, "date": d.isoformat(), "time": None, "source": "db"})
+        elif secid in from_moex:
+            m = from_moex[secid]
+            items.append({"secid": secid, "last": m["last"], "date": None, "time": m["time"], "source": "moex"})
+
+    out = {
+        "items": items,
+        "missing": [s for s in wanted if s not in found and s not in from_moex],
+    }
+    # версия — сами цены (часть может быть из ISS): 304 экономит только передачу
+    etag = make_etag(out)
+    if etag_matches(request, etag):
+        return not_modified(etag, LAST_CACHE_CONTROL)
+    with_validators(response, etag, LAST_CACHE_CONTROL)
+    return out
+
+
 @router.get("/last/{secid}")
-async def market_last(secid: str, session: AsyncSession = Depends(get_session)):
+async def market_last(
+    request: Request,
+    response: Response,
+    secid: str,
+    session: AsyncSession = Depends(get_read_session),
+):
     secid = secid.upper()
 
     q = (
-        select(Candle.close, Candle.d)
+        select(Candle.close, Candle.d, Candle.updated_at)
         .where(Candle.secid == secid, Candle.board == "TQBR", Candle.interval == 24)
         .order_by(Candle.d.desc())
         .limit(1)
@@ -22,5 +82,10 @@ async def market_last(secid: str, session: AsyncSession = Depends(get_session)):
     if not row:
         raise HTTPException(status_code=404, detail="Last price not found (no candles in DB)")
 
-    close, d = row
+    close, d, updated_at = row
+    # версия — последняя свеча и время её обновления
+    etag = make_etag(secid, d, updated_at)
+    if etag_matches(request, etag):
+        return not_modified(etag, LAST_CACHE_CONTROL)
+    with_validators(response, etag, LAST_CACHE_CONTROL)
     return {"secid": secid, "last": float(close), "date": d.isoformat()}
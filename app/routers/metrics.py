@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+
+from app.db.core import engine, read_engine, pool_stats
+from app.deps import shared_cache, candle_responses
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/db")
+async def db_metrics():
+    out = {"primary": pool_stats(engine)}
+    out["replica"] = pool_stats(read_engine) if read_engine is not engine else None
+    return out
+
+
+@router.get("/cache")
+async def cache_metrics():
+    return {"shared": shared_cache.stats(), "candle_responses": candle_responses.stats()}
@@ -0,0 +1,68 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.core import get_session
+from app.auth.deps import get_current_account_id
+from app.db.repo.orders_repo import create_order, list_orders, cancel_order
+from app.deps import order_books
+
+router = APIRouter(prefix="/orders", tags=["orders"])
+
+
+class OrderRequest(BaseModel):
+    secid: str = Field(..., min_length=1)
+    side: Literal["BUY", "SELL"]
+    type: Literal["LIMIT", "STOP"]
+    qty: float = Field(..., gt=0)
+    price: float = Field(..., gt=0)
+
+    class Config:
+        extra = "forbid"
+
+
+@router.post("")
+async def place_order(
+    body: OrderRequest,
+    session: AsyncSession = Depends(get_session),
+    account_id: int = Depends(get_current_account_id),
+):
+    order = await create_order(
+        session,
+        account_id=account_id,
+        secid=body.secid,
+        side=body.side,
+        type=body.type,
+        qty=body.qty,
+        price=body.price,
+    )
+    await session.commit()
+    # в книгу — только после коммита, иначе тик может исполнить несуществующую заявку
+    order_books.add(order)
+    return {"ok": True, "order": order}
+
+
+@router.get("")
+async def my_orders(
+    status: Literal["OPEN", "FILLED", "CANCELLED", "REJECTED"] | None = None,
+    limit: int = 100,
+    session: AsyncSession = Depends(get_session),
+    account_id: int = Depends(get_current_account_id),
+):
+    return {"items": await list_orders(session, account_id=account_id, status=status, limit=limit)}
+
+
+@router.delete("/{order_id}")
+async def cancel_my_order(
+    order_id: int,
+    session: AsyncSession = Depends(get_session),
+    account_id: int = Depends(get_current_account_id),
+):
+    secid = await cancel_order(session, account_id=account_id, order_id=order_id)
+    if secid is None:
+        raise HTTPException(status_code=404, detail="Open order not found")
+    await session.commit()
+    order_books.remove(secid, order_id)
+    return {"ok": True}
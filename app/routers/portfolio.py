@@ -1,17 +1,40 @@
-from fastapi import APIRouter, Depends
+from datetime import date
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.core import get_session
-from app.auth.deps import get_current_user
+from app.auth.deps import get_current_account_id
 from app.db.repo.portfolio_repo import get_portfolio
+from app.deps import equity_curves, risk_model
 
 router = APIRouter(tags=["portfolio"])
 
 
 @router.get("/portfolio")
 async def portfolio(
+    method: Literal["avg", "fifo"] = "avg",
+    session: AsyncSession = Depends(get_session),
+    account_id: int = Depends(get_current_account_id),
+):
+    return await get_portfolio(session, account_id=account_id, method=method)
+
+
+@router.get("/portfolio/history")
+async def portfolio_history(
+    date_from: date | None = Query(None, alias="from"),
+    date_to: date | None = Query(None, alias="to"),
+    session: AsyncSession = Depends(get_session),
+    account_id: int = Depends(get_current_account_id),
+):
+    points = await equity_curves.history(session, account_id, date_from, date_to)
+    return {"account_id": account_id, "points": points}
+
+
+@router.get("/portfolio/risk")
+async def portfolio_risk(
     session: AsyncSession = Depends(get_session),
-    user_acc=Depends(get_current_user),
+    account_id: int = Depends(get_current_account_id),
 ):
-    user, acc = user_acc
-    return await get_portfolio(session, account_id=acc.id)
+    return await risk_model.account_risk(session, account_id)
@@ -2,8 +2,8 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.db.core import get_session
-from app.auth.deps import get_current_user
+from app.db.core import get_read_session
+from app.auth.deps import get_current_account_id_read
 from app.db.models import Position, Instrument
 
 router = APIRouter(tags=["positions"])
@@ -11,17 +11,17 @@ router = APIRouter(tags=["positions"])
 @router.get("/positions/{secid}")
 async def get_my_position(
     secid: str,
-    session: AsyncSession = Depends(get_session),
-    user_acc=Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_session),
+    account_id: int = Depends(get_current_account_id_read),
 ):
-    user, acc = user_acc
-
+    # читаем с реплики (если задана DB_READ_URL): сразу после сделки позиция
+    # может отставать на величину лага репликации; точные данные — /api/portfolio
     q = (
         select(Position.qty, Position.avg_price)
         .select_from(Position)
         .join(Instrument, Instrument.id == Position.instrument_id)
         .where(
-            Position.account_id == acc.id,
+            Position.account_id == account_id,
             Instrument.secid == secid.upper(),
             Instrument.board == "TQBR",
         )
@@ -0,0 +1,46 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.deps import quotes
+from app.routers._params import parse_secids
+
+router = APIRouter(prefix="/quotes", tags=["quotes"])
+
+HEARTBEAT_S = 15.0
+
+
+@router.get("/stream")
+async def stream(
+    request: Request,
+    secids: str | None = Query(None),
+):
+    # SSE: тики из QuoteHub (живые цены, replay); без secids — все бумаги
+    wanted = set(parse_secids(secids)) if secids else None
+
+    async def events():
+        q = quotes.open_stream()
+        try:
+            # сразу отдаём последние известные цены, чтобы клиенту было что рисовать
+            for secid in sorted(wanted or ()):
+                last = quotes.last(secid)
+                if last:
+                    yield f"data: {json.dumps({'secid': secid, 'price': last[0], 't': last[1]})}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    secid, price, ts = await asyncio.wait_for(q.get(), timeout=HEARTBEAT_S)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if wanted is None or secid in wanted:
+                    yield f"data: {json.dumps({'secid': secid, 'price': price, 't': ts})}\n\n"
+        finally:
+            quotes.close_stream(q)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
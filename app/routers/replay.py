@@ -0,0 +1,55 @@
+from datetime import date
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+
+from app.deps import replay
+from app.routers._params import MAX_BATCH_SECIDS
+from app.services.replay import MIN_TICKS_PER_BAR
+
+router = APIRouter(prefix="/replay", tags=["replay"])
+
+
+class ReplayRequest(BaseModel):
+    secids: list[str] | None = Field(None, max_length=MAX_BATCH_SECIDS)  # None — все бумаги со свечами
+    date_from: date
+    date_to: date
+    interval: int = 24
+    speed: float = Field(60.0, gt=0, le=100_000_000)
+    ticks_per_bar: int = Field(50, ge=MIN_TICKS_PER_BAR, le=10_000)
+    seed: int = 0
+
+    class Config:
+        extra = "forbid"
+
+
+@router.post("/start")
+async def start(body: ReplayRequest):
+    if body.date_from > body.date_to:
+        raise HTTPException(status_code=400, detail="date_from > date_to")
+    secids = [s.upper() for s in body.secids] if body.secids else None
+    try:
+        return await replay.start(
+            secids=secids,
+            date_from=body.date_from,
+            date_to=body.date_to,
+            interval=body.interval,
+            speed=body.speed,
+            ticks_per_bar=body.ticks_per_bar,
+            seed=body.seed,
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/stop")
+async def stop():
+    await replay.stop()
+    return replay.status()
+
+
+@router.get("/status")
+async def status():
+    return replay.status()
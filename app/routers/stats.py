@@ -0,0 +1,26 @@
+from datetime import date, datetime, timedelta
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.core import get_read_session
+from app.db.repo.stats_repo import trading_stats
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+DEFAULT_DAYS = 30
+
+
+@router.get("/trading")
+async def stats_trading(
+    date_from: date | None = Query(None, alias="from"),
+    date_to: date | None = Query(None, alias="to"),
+    top: int = Query(10, ge=1, le=100),
+    session: AsyncSession = Depends(get_read_session),
+):
+    # по агрегатам trade_rollups, без GROUP BY по trades; дни — UTC
+    date_to = date_to or datetime.utcnow().date()
+    date_from = date_from or date_to - timedelta(days=DEFAULT_DAYS - 1)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="from > to")
+    return await trading_stats(session, date_from, date_to, top=top)
@@ -10,6 +10,7 @@ from app.config import settings
 from app.db.core import get_session
 from app.db.repo.users_repo import upsert_user_by_telegram, ensure_account
 from app.auth.jwt import create_access_token
+from app.deps import principals
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -73,6 +74,8 @@ async def auth_telegram(payload: TgAuth, session: AsyncSession = Depends(get_ses
     )
     account_id = await ensure_account(session, user_id=user_id)
     await session.commit()
+    # профиль мог поменяться — снимок в кэше больше не верен
+    principals.invalidate(user_id)
 
     # JWT
     access_token = create_access_token(sub=str(user_id), ttl_minutes=settings.JWT_EXPIRE_MINUTES)
@@ -0,0 +1,60 @@
+import csv
+import io
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.deps import get_current_account_id_read
+from app.db.core import get_read_session, ReadSessionLocal
+from app.db.repo.trades_repo import list_trades, iter_trades
+
+router = APIRouter(prefix="/trades", tags=["trades"])
+
+EXPORT_CHUNK = 1000
+CSV_COLUMNS = ("id", "created_at", "secid", "side", "qty", "price", "amount")
+
+
+@router.get("")
+async def my_trades(
+    secid: str | None = None,
+    side: Literal["BUY", "SELL"] | None = None,
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=500),
+    session: AsyncSession = Depends(get_read_session),
+    account_id: int = Depends(get_current_account_id_read),
+):
+    try:
+        items, next_cursor = await list_trades(
+            session, account_id, secid=secid, side=side, cursor=cursor, limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get("/export.csv")
+async def export_trades_csv(
+    secid: str | None = None,
+    side: Literal["BUY", "SELL"] | None = None,
+    account_id: int = Depends(get_current_account_id_read),
+):
+    async def rows():
+        buf = io.StringIO()
+        w = csv.writer(buf)
+        w.writerow(CSV_COLUMNS)
+        yield buf.getvalue()
+        # своя сессия: ответ стримится уже после выхода из зависимостей роутера
+        async with ReadSessionLocal() as session:
+            async for chunk in iter_trades(session, account_id, secid=secid, side=side, chunk=EXPORT_CHUNK):
+                buf.seek(0)
+                buf.truncate()
+                w.writerows([t[c] for c in CSV_COLUMNS] for t in chunk)
+                yield buf.getvalue()
+
+    return StreamingResponse(
+        rows(),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="trades_{account_id}.csv"'},
+    )
@@ -1,17 +1,18 @@
+from typing import Literal
+
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.db.core import get_session
 from app.auth.deps import get_current_user
-from app.db.repo.trading import buy, sell
+from app.db.repo.trading import buy, sell, execute_orders, MAX_BATCH_ORDERS
+from app.deps import trade_journal, principals
 
 router = APIRouter(prefix="/trade", tags=["trade"])
 
 
-# app/routers/trading.py
-from pydantic import BaseModel, Field
-
 class TradeRequest(BaseModel):
     secid: str = Field(..., min_length=1)
     qty: float = Field(..., gt=0)
@@ -19,6 +20,18 @@ class TradeRequest(BaseModel):
     class Config:
         extra = "forbid"
 
+
+class BatchOrder(TradeRequest):
+    side: Literal["BUY", "SELL"]
+
+
+class BatchRequest(BaseModel):
+    orders: list[BatchOrder] = Field(..., min_length=1, max_length=MAX_BATCH_ORDERS)
+
+    class Config:
+        extra = "forbid"
+
+
 @router.post("/buy")
 async def trade_buy(
     body: TradeRequest,
@@ -26,9 +39,13 @@ async def trade_buy(
     user_acc=Depends(get_current_user),
 ):
     user, acc = user_acc
-    await buy(session, account_id=acc.id, secid=body.secid, price=None, qty=body.qty)
-    await session.commit()
-    return {"ok": True}
+    if settings.TRADE_INGEST_MODE == "journal":
+        fill = await trade_journal.submit(account_id=acc.id, secid=body.secid, side="BUY", qty=body.qty)
+    else:
+        fill = await buy(session, account_id=acc.id, secid=body.secid, price=None, qty=body.qty)
+        await session.commit()
+    principals.invalidate(user.id)
+    return {"ok": True, "fill": fill}
 
 
 @router.post("/sell")
@@ -38,6 +55,30 @@ async def trade_sell(
     user_acc=Depends(get_current_user),
 ):
     user, acc = user_acc
-    await sell(session, account_id=acc.id, secid=body.secid, price=None, qty=body.qty)
+    if settings.TRADE_INGEST_MODE == "journal":
+        fill = await trade_journal.submit(account_id=acc.id, secid=body.secid, side="SELL", qty=body.qty)
+    else:
+        fill = await sell(session, account_id=acc.id, secid=body.secid, price=None, qty=body.qty)
+        await session.commit()
+    principals.invalidate(user.id)
+    return {"ok": True, "fill": fill}
+
+
+@router.post("/batch")
+async def trade_batch(
+    body: BatchRequest,
+    session: AsyncSession = Depends(get_session),
+    user_acc=Depends(get_current_user),
+):
+    # всё или ничего: при ошибке в любой заявке сессия закрывается без commit -> rollback
+    user, acc = user_acc
+    fills = await execute_orders(
+        session,
+        account_id=acc.id,
+        orders=[o.model_dump() for o in body.orders],
+    )
     await session.commit()
-    return {"ok": True}
\ No newline at end of file
+    # батч всегда идёт напрямую в БД — состояние счёта в журнале больше не актуально
+    trade_journal.invalidate(acc.id)
+    principals.invalidate(user.id)
+    return {"ok": True, "fills": fills}
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+from typing import Protocol
+
+from sortedcontainers import SortedList
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.db.repo.alerts_repo import load_active_alerts, trigger_alert
+
+log = logging.getLogger(__name__)
+
+
+class Notifier(Protocol):
+    async def notify(self, alert: dict, price: float) -> None: ...
+
+
+class LogNotifier:
+    """Заглушка доставки: пишет в лог. Телеграм/почта — другой класс с тем же notify()."""
+
+    async def notify(self, alert: dict, price: float) -> None:
+        log.info(
+            "alert %s: user=%s %s %s %.4f (price %.4f)",
+            alert["id"], alert["user_id"], alert["secid"], alert["direction"], alert["price"], price,
+        )
+
+
+class AlertIndex:
+    """
+    Пороги одного инструмента, как книга заявок:
+    ABOVE срабатывают при цене >= порога (префикс списка), BELOW — при цене <= порога (суффикс).
+    Тик снимает только пересечённую полосу: O(log n + k).
+    """
+
+    def __init__(self) -> None:
+        self._above: SortedList = SortedList()  # (price, id)
+        self._below: SortedList = SortedList()
+        self._alerts: dict[int, dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._alerts)
+
+    def add(self, a: dict) -> None:
+        if a["id"] in self._alerts:
+            return
+        self._alerts[a["id"]] = a
+        (self._above if a["direction"] == "ABOVE" else self._below).add((a["price"], a["id"]))
+
+    def match(self, price: float) -> list[dict]:
+        i = self._above.bisect_right((price, math.inf))
+        hit = list(self._above[:i])
+        del self._above[:i]
+
+        j = self._below.bisect_left((price, -math.inf))
+        hit += list(reversed(self._below[j:]))
+        del self._below[j:]
+        return [self._alerts.pop(aid) for _, aid in hit]
+
+
+class AlertEngine:
+    """
+    Индексы грузятся лениво: первый тик по бумаге поднимает её ACTIVE-алерты из БД.
+    Любое изменение алертов (CRUD) сбрасывает индекс бумаги — следующий тик перечитает.
+    """
+
+    def __init__(self, sessionmaker: async_sessionmaker, notifier: Notifier) -> None:
+        self._sessionmaker = sessionmaker
+        self.notifier = notifier
+        self._index: dict[str, AlertIndex] = {}
+        self._lock = asyncio.Lock()
+        self.loads = 0
+        self.triggered = 0
+
+    def invalidate(self, secid: str) -> None:
+        self._index.pop(secid.upper(), None)
+
+    async def _get(self, secid: str) -> AlertIndex:
+        idx = self._index.get(secid)
+        if idx is not None:
+            return idx
+        async with self._lock:
+            idx = self._index.get(secid)
+            if idx is None:
+                async with self._sessionmaker() as session:
+                    alerts = await load_active_alerts(session, secid)
+                idx = AlertIndex()
+                for a in alerts:
+                    idx.add(a)
+                self._index[secid] = idx
+                self.loads += 1
+        return idx
+
+    async def on_tick(self, secid: str, price: float) -> None:
+        try:
+            idx = await self._get(secid)
+        except Exception:
+            log.exception("alerts load failed for %s", secid)
+            return
+        hit = idx.match(price)
+        if not hit:
+            return
+
+        fired = []
+        try:
+            async with self._sessionmaker() as session:
+                for a in hit:
+                    if await trigger_alert(session, a["id"], price):
+                        fired.append(a)
+                await session.commit()
+        except Exception:
+            # БД недоступна — алерты остались ACTIVE, возвращаем в индекс
+            log.exception("alerts trigger failed for %s @ %s", secid, price)
+            for a in hit:
+                idx.add(a)
+            return
+
+        self.triggered += len(fired)
+        for a in fired:
+            try:
+                await self.notifier.notify(a, price)
+            except Exception:
+                log.exception("alert %s notify failed", a["id"])
@@ -0,0 +1,164 @@
+"""
+Бэктест простых стратегий по свечам из БД (без обращений к ISS).
+
+Семантика сделок как в app.db.repo.trading: только лонг, без плеча,
+дробное qty, исполнение по close последнего бара. Сигнал, посчитанный
+на закрытии бара t, исполняется по этому же close (цена + проскальзывание,
+комиссия с оборота) и держится на баре t+1.
+Сетка параметров x тикеры раскидывается по процессам (ProcessPoolExecutor).
+"""
+from __future__ import annotations
+
+import itertools
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.services.indicators import sma, rsi
+
+START_CASH = 10000.0  # как у нового счёта
+BARS_PER_YEAR = 252
+
+
+class Strategy:
+    """
+    Стратегия = функция close -> целевая доля в бумаге (0..1) на каждом баре.
+    defaults — параметры по умолчанию, они же задают допустимые имена.
+    """
+
+    name = ""
+    defaults: dict = {}
+
+    def target(self, close: np.ndarray, **params) -> np.ndarray:
+        raise NotImplementedError
+
+
+class BuyAndHold(Strategy):
+    name = "buy_hold"
+    defaults: dict = {}
+
+    def target(self, close: np.ndarray, **params) -> np.ndarray:
+        return np.ones(len(close))
+
+
+class SmaCross(Strategy):
+    name = "sma_cross"
+    defaults = {"fast": 10, "slow": 50}
+
+    def target(self, close: np.ndarray, fast: int = 10, slow: int = 50) -> np.ndarray:
+        if fast >= slow:
+            return np.zeros(len(close))
+        f = sma(close, 0, None, int(fast))["sma"]
+        s = sma(close, 0, None, int(slow))["sma"]
+        return np.nan_to_num((f > s).astype(float) * ~np.isnan(s))
+
+
+class RsiReversion(Strategy):
+    name = "rsi_reversion"
+    defaults = {"period": 14, "low": 30, "high": 70}
+
+    def target(self, close: np.ndarray, period: int = 14, low: float = 30, high: float = 70) -> np.ndarray:
+        # вход ниже low, выход выше high, между ними — держим предыдущее состояние
+        r = rsi(close, 0, None, int(period))["rsi"]
+        state = np.full(len(close), np.nan)
+        state[r < low] = 1.0
+        state[r > high] = 0.0
+        idx = np.where(~np.isnan(state), np.arange(len(state)), 0)
+        np.maximum.accumulate(idx, out=idx)
+        out = state[idx]
+        return np.nan_to_num(out)
+
+
+STRATEGIES: dict[str, Strategy] = {s.name: s for s in (BuyAndHold(), SmaCross(), RsiReversion())}
+
+
+def simulate(
+    close: np.ndarray,
+    target: np.ndarray,
+    *,
+    fee: float = 0.0,
+    slippage: float = 0.0,
+    cash: float = START_CASH,
+) -> dict:
+    """Векторный прогон одной серии: доходности бар-к-бару, издержки на изменение доли."""
+    n = len(close)
+    if n < 2:
+        return {"final_equity": cash, "total_return": 0.0, "max_drawdown": 0.0, "sharpe": 0.0, "trades": 0, "exposure": 0.0}
+
+    w = np.clip(target, 0.0, 1.0)
+    held = np.concatenate([[0.0], w[:-1]])          # доля, с которой входим в бар t
+    ret = np.concatenate([[0.0], close[1:] / close[:-1] - 1.0])
+    turnover = np.abs(np.diff(np.concatenate([[0.0], w])))  # сделки на закрытии бара t
+    # издержки списываются с капитала в момент сделки, как комиссия с суммы заявки
+    strat = (1.0 + held * ret) * (1.0 - turnover * (fee + slippage)) - 1.0
+
+    equity = cash * np.cumprod(1.0 + strat)
+    peak = np.maximum.accumulate(equity)
+    dd = float(np.max(1.0 - equity / peak))
+    sd = float(np.std(strat[1:]))
+    sharpe = float(np.mean(strat[1:]) / sd * np.sqrt(BARS_PER_YEAR)) if sd > 0 else 0.0
+
+    return {
+        "final_equity": float(equity[-1]),
+        "total_return": float(equity[-1] / cash - 1.0),
+        "max_drawdown": dd,
+        "sharpe": sharpe,
+        "trades": int(np.count_nonzero(turnover)),
+        "exposure": float(np.mean(held)),
+    }
+
+
+def param_grid(strategy: Strategy, grid: dict[str, list]) -> list[dict]:
+    unknown = set(grid) - set(strategy.defaults)
+    if unknown:
+        raise ValueError(f"unknown params for {strategy.name}: {', '.join(sorted(unknown))}")
+    keys = list(grid)
+    combos = [dict(zip(keys, vals)) for vals in itertools.product(*(grid[k] for k in keys))]
+    return [{**strategy.defaults, **c} for c in combos] or [dict(strategy.defaults)]
+
+
+def _run_series(args: tuple) -> list[dict]:
+    # в воркере: одна серия (тикер) x вся сетка параметров — массив пересылается один раз
+    strategy_name, secid, close, params_list, fee, slippage = args
+    strategy = STRATEGIES[strategy_name]
+    out = []
+    for params in params_list:
+        res = simulate(close, strategy.target(close, **params), fee=fee, slippage=slippage)
+        out.append({"secid": secid, "params": params, **res})
+    return out
+
+
+@dataclass
+class GridResult:
+    runs: list[dict]
+    elapsed_s: float
+
+    @property
+    def runs_per_sec(self) -> float:
+        return len(self.runs) / self.elapsed_s if self.elapsed_s > 0 else 0.0
+
+
+def run_grid(
+    strategy_name: str,
+    series: dict[str, np.ndarray],
+    grid: dict[str, list],
+    *,
+    fee: float = 0.0,
+    slippage: float = 0.0,
+    workers: int | None = None,
+) -> GridResult:
+    """series: secid -> close. workers=1 — без пула (удобно для отладки)."""
+    strategy = STRATEGIES[strategy_name]
+    params_list = param_grid(strategy, grid)
+    tasks = [(strategy_name, secid, close, params_list, fee, slippage) for secid, close in series.items()]
+
+    t0 = time.perf_counter()
+    if workers == 1:
+        chunks = [_run_series(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunks = list(pool.map(_run_series, tasks))
+    elapsed = time.perf_counter() - t0
+    return GridResult([r for c in chunks for r in c], elapsed)
@@ -0,0 +1,162 @@
+"""
+Колоночная выгрузка свечей и сделок для аналитиков.
+
+Форматы:
+- arrow — Arrow IPC stream (pyarrow.ipc.open_stream / pandas / polars), сжатие zstd;
+  доступен, если установлен pyarrow;
+- npz — обычный zip с .npy по колонкам (np.load). Строковые колонки словарные:
+  <col> — коды int32, <col>_names — значения, т.е. names[codes].
+
+Строки приходят пачками из серверного курсора; в памяти — одна пачка.
+Arrow пишется пачками прямо в ответ. В npz каждая колонка — один массив,
+поэтому колонки копятся во временных файлах на диске, а zip собирается и
+отдаётся потоком в конце.
+"""
+from __future__ import annotations
+
+import io
+import tempfile
+import zipfile
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+except ImportError:  # опциональная зависимость: без неё — только npz
+    pa = None
+
+FORMATS = ("arrow", "npz")
+MEDIA_TYPES = {"arrow": "application/vnd.apache.arrow.stream", "npz": "application/octet-stream"}
+EXTENSIONS = {"arrow": "arrows", "npz": "npz"}
+COPY_BLOCK = 1 << 20
+
+# вид колонки -> dtype numpy
+_DTYPES = {
+    "int": np.dtype(np.int64),
+    "float": np.dtype(np.float64),
+    "date": np.dtype("datetime64[D]"),
+    "datetime": np.dtype("datetime64[us]"),
+    "str": np.dtype(np.int32),  # коды словаря
+}
+
+CANDLE_SCHEMA = (
+    ("secid", "str"), ("d", "date"),
+    ("open", "float"), ("high", "float"), ("low", "float"), ("close", "float"), ("volume", "float"),
+)
+TRADE_SCHEMA = (
+    ("id", "int"), ("created_at", "datetime"), ("account_id", "int"),
+    ("secid", "str"), ("side", "str"), ("qty", "float"), ("price", "float"),
+)
+
+
+def default_format() -> str:
+    return "arrow" if pa is not None else "npz"
+
+
+def check_format(fmt: str) -> str:
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format: {fmt} (expected one of {', '.join(FORMATS)})")
+    if fmt == "arrow" and pa is None:
+        raise ValueError("arrow export needs pyarrow installed; use format=npz")
+    return fmt
+
+
+class _Pipe(io.RawIOBase):
+    """Несикабельный приёмник: писатели (zipfile, pyarrow) пишут сюда, генератор забирает байты."""
+
+    def __init__(self) -> None:
+        self._parts: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._parts.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        out = b"".join(self._parts)
+        self._parts.clear()
+        return out
+
+
+def _column(values: tuple, kind: str) -> np.ndarray:
+    if kind == "float":
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    return np.array(values, dtype=_DTYPES[kind])
+
+
+def _arrow_schema(schema: tuple) -> "pa.Schema":
+    types = {"int": pa.int64(), "float": pa.float64(), "date": pa.date32(), "datetime": pa.timestamp("us"), "str": pa.string()}
+    return pa.schema([(name, types[kind]) for name, kind in schema])
+
+
+async def _arrow_stream(batches: AsyncIterator[list[tuple]], schema: tuple) -> AsyncIterator[bytes]:
+    pipe = _Pipe()
+    arrow_schema = _arrow_schema(schema)
+    options = pa.ipc.IpcWriteOptions(compression="zstd")
+    with pa.ipc.new_stream(pipe, arrow_schema, options=options) as writer:
+        async for rows in batches:
+            cols = list(zip(*rows))
+            arrays = [
+                pa.array(list(values), type=pa.string()) if kind == "str" else pa.array(_column(values, kind))
+                for values, (_, kind) in zip(cols, schema)
+            ]
+            writer.write_batch(pa.record_batch(arrays, schema=arrow_schema))
+            yield pipe.drain()
+    yield pipe.drain()
+
+
+@dataclass
+class _NpzColumn:
+    name: str
+    kind: str
+    file: tempfile.SpooledTemporaryFile
+    names: dict[str, int] | None = None
+
+
+async def _npz_stream(batches: AsyncIterator[list[tuple]], schema: tuple) -> AsyncIterator[bytes]:
+    cols = [
+        _NpzColumn(name, kind, tempfile.SpooledTemporaryFile(max_size=COPY_BLOCK * 8), {} if kind == "str" else None)
+        for name, kind in schema
+    ]
+    n = 0
+    try:
+        async for rows in batches:
+            n += len(rows)
+            for c, values in zip(cols, zip(*rows)):
+                if c.names is not None:
+                    values = tuple(c.names.setdefault(v, len(c.names)) for v in values)
+                c.file.write(_column(values, c.kind).tobytes())
+
+        pipe = _Pipe()
+        # как np.savez_compressed; data descriptor вместо seek — zip пишется в поток
+        with zipfile.ZipFile(pipe, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for c in cols:
+                with zf.open(f"{c.name}.npy", "w", force_zip64=True) as f:
+                    np.lib.format.write_array_header_1_0(f, {
+                        "descr": np.lib.format.dtype_to_descr(_DTYPES[c.kind]),
+                        "fortran_order": False,
+                        "shape": (n,),
+                    })
+                    c.file.seek(0)
+                    while block := c.file.read(COPY_BLOCK):
+                        f.write(block)
+                        yield pipe.drain()
+                if c.names is not None:
+                    names = np.array(list(c.names), dtype=str)
+                    with zf.open(f"{c.name}_names.npy", "w") as f:
+                        np.lib.format.write_array(f, names)
+        yield pipe.drain()
+    finally:
+        for c in cols:
+            c.file.close()
+
+
+def export_stream(batches: AsyncIterator[list[tuple]], schema: tuple, fmt: str) -> AsyncIterator[bytes]:
+    """batches — пачки кортежей в порядке schema (как из iter_candle_batches / iter_trade_batches)."""
+    check_format(fmt)
+    return _arrow_stream(batches, schema) if fmt == "arrow" else _npz_stream(batches, schema)
+
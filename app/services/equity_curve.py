@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Account
+from app.db.repo.candles_repo import read_close_matrix
+from app.db.repo.trades_repo import read_account_trades
+
+
+@dataclass
+class _Curve:
+    secids: list[str]
+    days: np.ndarray     # [T] datetime64[D]
+    pos: np.ndarray      # [T x N] количество на конец дня
+    close: np.ndarray    # [T x N] закрытия, протянутые вперёд
+    cash: np.ndarray     # [T]
+    last_trade_id: int
+
+    @property
+    def value(self) -> np.ndarray:
+        v = np.where(self.pos != 0, self.pos * self.close, 0.0)
+        return np.nan_to_num(v).sum(axis=1)
+
+
+def _ffill(closes: np.ndarray, close0: np.ndarray) -> np.ndarray:
+    # протяжка последней известной цены вниз по дням; close0 — цена "до окна"
+    x = np.vstack([close0[None, :], closes])
+    idx = np.where(~np.isnan(x), np.arange(len(x))[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return x[idx, np.arange(x.shape[1])][1:]
+
+
+def _roll(
+    days: np.ndarray,
+    closes: np.ndarray,
+    secids: list[str],
+    trades: list[tuple],
+    pos0: np.ndarray,
+    cash0: float,
+    close0: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Позиции/кэш/цены по дням окна: сделки раскладываются по торговым дням
+    (сделка в неторговый день — на следующий), дальше cumsum по оси дней.
+    """
+    T, N = closes.shape
+    dq = np.zeros((T, N))
+    dc = np.zeros(T)
+    if trades:
+        col = {s: i for i, s in enumerate(secids)}
+        tdays = np.array([t[5].date() for t in trades], dtype="datetime64[D]")
+        ti = np.searchsorted(days, tdays, side="left")
+        si = np.array([col[t[1]] for t in trades], dtype=np.int64)
+        sign = np.array([1.0 if t[2] == "BUY" else -1.0 for t in trades])
+        qty = np.array([float(t[3]) for t in trades])
+        px = np.array([float(t[4]) for t in trades])
+
+        # сделки позже последнего дня с ценой в окно не попадают (догрузятся при продлении)
+        ok = ti < T
+        np.add.at(dq, (ti[ok], si[ok]), sign[ok] * qty[ok])
+        np.add.at(dc, ti[ok], -sign[ok] * qty[ok] * px[ok])
+
+    pos = pos0[None, :] + np.cumsum(dq, axis=0)
+    cash = cash0 + np.cumsum(dc)
+    return pos, _ffill(closes, close0), cash
+
+
+def _first_prices(secids: list[str], trades: list[tuple]) -> np.ndarray:
+    # цена первой сделки — замена закрытию, пока свечей по бумаге ещё нет
+    out = np.full(len(secids), np.nan)
+    col = {s: i for i, s in enumerate(secids)}
+    for t in trades:
+        i = col.get(t[1])
+        if i is not None and np.isnan(out[i]):
+            out[i] = float(t[4])
+    return out
+
+
+class EquityCurves:
+    """
+    Кривая капитала по счёту (NumPy), кэш на счёт.
+    Кэш покрывает период от первой сделки до последней свечи; на запросе
+    пересчитывается только хвост начиная с последнего закэшированного дня
+    (он мог быть неполным), полная пересборка — если пришла сделка задним числом.
+    """
+
+    def __init__(self, *, max_accounts: int = 1000, board: str = "TQBR", interval: int = 24) -> None:
+        self._cache: OrderedDict[int, _Curve] = OrderedDict()
+        self.max_accounts = max_accounts
+        self.board = board
+        self.interval = interval
+
+        self.builds = 0
+        self.extends = 0
+
+    def invalidate(self, account_id: int) -> None:
+        self._cache.pop(account_id, None)
+
+    async def _build(self, session: AsyncSession, account_id: int) -> _Curve | None:
+        trades = await read_account_trades(session, account_id)
+        if not trades:
+            return None
+        cash_now = (await session.execute(
+            select(Account.cash).where(Account.id == account_id)
+        )).scalar_one_or_none()
+        if cash_now is None:
+            return None
+
+        flows = sum((-1.0 if t[2] == "BUY" else 1.0) * float(t[3]) * float(t[4]) for t in trades)
+        cash_start = float(cash_now) - flows
+
+        secids = list(dict.fromkeys(t[1] for t in trades))
+        first_day = min(t[5] for t in trades).date()
+        days, closes = await read_close_matrix(session, secids, self.board, self.interval, first_day, None)
+        if not len(days):
+            return None
+
+        pos, close, cash = _roll(
+            days, closes, secids, trades,
+            np.zeros(len(secids)), cash_start, _first_prices(secids, trades),
+        )
+        self.builds += 1
+        return _Curve(secids, days, pos, close, cash, max(t[0] for t in trades))
+
+    async def _extend(self, session: AsyncSession, account_id: int, curve: _Curve) -> _Curve | None:
+        k = len(curve.days) - 1
+        if k < 1:
+            return None
+        start = curve.days[k].astype(object)
+        # хвост считается от состояния на конец дня k-1, поэтому перечитываем всё, что _roll
+        # кладёт на день k: сделки после дня k-1, включая выходные между k-1 и k
+        since = (curve.days[k - 1] + np.timedelta64(1, "D")).astype(object)
+
+        trades = await read_account_trades(
+            session, account_id, since_day=since, after_id=curve.last_trade_id,
+        )
+        # новая сделка датой раньше окна — проще пересобрать целиком
+        if any(t[0] > curve.last_trade_id and t[5].date() < since for t in trades):
+            return None
+        trades = [t for t in trades if t[5].date() >= since]
+
+        secids = list(curve.secids)
+        pos_prev, close_prev = curve.pos[:k], curve.close[:k]
+        new = [s for s in dict.fromkeys(t[1] for t in trades) if s not in curve.secids]
+        if new:
+            secids += new
+            pos_prev = np.hstack([pos_prev, np.zeros((k, len(new)))])
+            close_prev = np.hstack([close_prev, np.full((k, len(new)), np.nan)])
+
+        days, closes = await read_close_matrix(session, secids, self.board, self.interval, start, None)
+        if not len(days):
+            return None
+
+        close0 = close_prev[-1].copy()
+        seed = _first_prices(secids, trades)
+        close0 = np.where(np.isnan(close0), seed, close0)
+
+        pos, close, cash = _roll(days, closes, secids, trades, pos_prev[-1], float(curve.cash[k - 1]), close0)
+        self.extends += 1
+        last_id = max([curve.last_trade_id] + [t[0] for t in trades])
+        return _Curve(
+            secids,
+            np.concatenate([curve.days[:k], days]),
+            np.vstack([pos_prev, pos]),
+            np.vstack([close_prev, close]),
+            np.concatenate([curve.cash[:k], cash]),
+            last_id,
+        )
+
+    async def get(self, session: AsyncSession, account_id: int) -> _Curve | None:
+        curve = self._cache.get(account_id)
+        if curve is not None:
+            curve = await self._extend(session, account_id, curve)
+        if curve is None:
+            curve = await self._build(session, account_id)
+        if curve is None:
+            self._cache.pop(account_id, None)
+            return None
+
+        self._cache[account_id] = curve
+        self._cache.move_to_end(account_id)
+        while len(self._cache) > self.max_accounts:
+            self._cache.popitem(last=False)
+        return curve
+
+    async def history(
+        self,
+        session: AsyncSession,
+        account_id: int,
+        date_from: date | None = None,
+        date_to: date | None = None,
+    ) -> list[dict]:
+        curve = await self.get(session, account_id)
+        if curve is None:
+            return []
+
+        lo = 0 if date_from is None else int(np.searchsorted(curve.days, np.datetime64(date_from, "D"), side="left"))
+        hi = len(curve.days) if date_to is None else int(np.searchsorted(curve.days, np.datetime64(date_to, "D"), side="right"))
+        cash = curve.cash[lo:hi]
+        value = curve.value[lo:hi]
+        return [
+            {"t": str(d), "equity": float(c + v), "cash": float(c), "positions_value": float(v)}
+            for d, c, v in zip(curve.days[lo:hi], cash, value)
+        ]
@@ -0,0 +1,54 @@
+"""
+JSON для ответов API: orjson, если установлен, иначе stdlib json с тем же выводом
+(компактно, UTF-8 без \\u-экранирования).
+
+orjson сам сериализует datetime/date, numpy-массивы и скаляры (NaN -> null),
+т.е. колонки можно отдавать без перегона в списки Python.
+
+FastJSONResponse — default_response_class приложения. Для dict, возвращённого из
+роута, FastAPI всё равно прогоняет jsonable_encoder; горячие роуты возвращают
+FastJSONResponse(...) сами (или уже готовые байты из кэша) — тогда без него.
+"""
+from __future__ import annotations
+
+import json
+from datetime import date, datetime
+from typing import Any
+
+import numpy as np
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # опциональная зависимость: без неё — stdlib json
+    orjson = None
+
+_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+
+def _default(obj: Any) -> Any:
+    # для stdlib json: то, что orjson умеет из коробки
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.kind == "f":
+            return [None if v != v else v for v in obj.tolist()]
+        return obj.tolist()
+    if isinstance(obj, np.generic):  # np.float64 — подкласс float, сюда не попадает
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=_OPTIONS)
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default).encode()
+
+
+def loads(data: bytes | str) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,235 @@
+"""
+Индикаторы считаются по всей сохранённой истории (чтобы прогрев не зависел от from/to).
+Каждая функция принимает (close, k, prev, *params) и возвращает массивы для close[k:];
+prev — выходы прошлого расчёта на close[:k] (с "_скрытыми" переносами для рекурсивных),
+так новые бары досчитываются без пересчёта всей серии.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.repo.candles_repo import candle_data_version, read_candle_columns
+
+MAX_PARAM = 500
+
+
+def _ema(x: np.ndarray, alpha: float, y_prev: float | None = None) -> np.ndarray:
+    # y[i] = alpha*x[i] + (1-alpha)*y[i-1]; без предыдущего значения стартуем с x[0]
+    if not len(x):
+        return x.copy()
+    y0 = x[0] if y_prev is None or np.isnan(y_prev) else y_prev
+    y, _ = lfilter([alpha], [1.0, alpha - 1.0], x, zi=[(1.0 - alpha) * y0])
+    return y
+
+
+def _prev(prev: dict | None, name: str, k: int) -> float | None:
+    return None if prev is None or k == 0 else float(prev[name][k - 1])
+
+
+def _warmup(y: np.ndarray, k: int, n: int) -> np.ndarray:
+    # первые n-1 баров серии — прогрев, наружу не отдаём
+    out = y.copy()
+    idx = np.arange(k, k + len(y))
+    out[idx < n - 1] = np.nan
+    return out
+
+
+def _rolling(close: np.ndarray, k: int, n: int) -> np.ndarray:
+    # окна длины n, заканчивающиеся на барах k..N-1 (NaN, пока окно неполное)
+    lo = max(0, k - n + 1)
+    x = close[lo:]
+    out = np.full((len(close) - k, n), np.nan)
+    if len(x) >= n:
+        w = sliding_window_view(x, n)
+        out[len(out) - len(w):] = w
+    return out
+
+
+def sma(close: np.ndarray, k: int, prev: dict | None, n: int) -> dict[str, np.ndarray]:
+    return {"sma": _rolling(close, k, n).mean(axis=1)}
+
+
+def ema(close: np.ndarray, k: int, prev: dict | None, n: int) -> dict[str, np.ndarray]:
+    y = _ema(close[k:], 2.0 / (n + 1), _prev(prev, "_ema", k))
+    return {"ema": _warmup(y, k, n), "_ema": y}
+
+
+def rsi(close: np.ndarray, k: int, prev: dict | None, n: int) -> dict[str, np.ndarray]:
+    # RSI Уайлдера: сглаживание приростов/падений с alpha=1/n
+    lo = max(k, 1)
+    d = close[lo:] - close[lo - 1:-1]
+    g = _ema(np.maximum(d, 0.0), 1.0 / n, _prev(prev, "_gain", lo))
+    l = _ema(np.maximum(-d, 0.0), 1.0 / n, _prev(prev, "_loss", lo))
+    if lo > k:
+        g = np.concatenate([[np.nan], g])
+        l = np.concatenate([[np.nan], l])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = 100.0 - 100.0 / (1.0 + g / l)
+    r = np.where((l == 0) & (g > 0), 100.0, r)
+    r = np.where((l == 0) & (g == 0), 50.0, r)
+    return {"rsi": _warmup(r, k, n + 1), "_gain": g, "_loss": l}
+
+
+def macd(close: np.ndarray, k: int, prev: dict | None, fast: int, slow: int, signal: int) -> dict[str, np.ndarray]:
+    f = _ema(close[k:], 2.0 / (fast + 1), _prev(prev, "_fast", k))
+    s = _ema(close[k:], 2.0 / (slow + 1), _prev(prev, "_slow", k))
+    m = f - s
+    sig = _ema(m, 2.0 / (signal + 1), _prev(prev, "_signal", k))
+    return {
+        "macd": _warmup(m, k, slow),
+        "signal": _warmup(sig, k, slow + signal - 1),
+        "hist": _warmup(m - sig, k, slow + signal - 1),
+        "_fast": f, "_slow": s, "_signal": sig,
+    }
+
+
+def bollinger(close: np.ndarray, k: int, prev: dict | None, n: int, width: float) -> dict[str, np.ndarray]:
+    w = _rolling(close, k, n)
+    mid = w.mean(axis=1)
+    sd = w.std(axis=1)
+    return {"mid": mid, "upper": mid + width * sd, "lower": mid - width * sd}
+
+
+# имя -> (функция, параметры по умолчанию)
+INDICATORS = {
+    "sma": (sma, (20,)),
+    "ema": (ema, (20,)),
+    "rsi": (rsi, (14,)),
+    "macd": (macd, (12, 26, 9)),
+    "bb": (bollinger, (20, 2.0)),
+}
+ALIASES = {"bollinger": "bb"}
+
+
+def parse_indicators(names: str, max_items: int = 10) -> list[tuple[str, tuple]]:
+    """
+    "sma:20,ema:50,rsi,macd:12:26:9,bb:20:2" -> [("sma", (20,)), ...]
+    Неуказанные параметры берутся по умолчанию. Ошибки — ValueError.
+    """
+    out: list[tuple[str, tuple]] = []
+    for raw in names.split(","):
+        raw = raw.strip().lower()
+        if not raw:
+            continue
+        kind, *args = raw.split(":")
+        kind = ALIASES.get(kind, kind)
+        if kind not in INDICATORS:
+            raise ValueError(f"unknown indicator: {kind}")
+        defaults = INDICATORS[kind][1]
+        if len(args) > len(defaults):
+            raise ValueError(f"too many params for {kind}")
+        params = []
+        for i, d in enumerate(defaults):
+            try:
+                v = type(d)(args[i]) if i < len(args) else d
+            except ValueError:
+                raise ValueError(f"bad param for {kind}: {args[i]}") from None
+            if not (0 < v <= MAX_PARAM):
+                raise ValueError(f"param out of range for {kind}: {v}")
+            params.append(v)
+        spec = (kind, tuple(params))
+        if spec not in out:
+            out.append(spec)
+    if not out:
+        raise ValueError("names is empty")
+    if len(out) > max_items:
+        raise ValueError(f"too many indicators (max {max_items})")
+    return out
+
+
+def label(kind: str, params: tuple) -> str:
+    return ":".join([kind, *(f"{p:g}" for p in params)])
+
+
+@dataclass
+class _Entry:
+    days: np.ndarray
+    close: np.ndarray
+    out: dict[str, np.ndarray]
+
+
+class IndicatorEngine:
+    """
+    LRU по (secid, board, interval, indicator, params, версия данных).
+    Версия — (кол-во баров, последний день, max updated_at) серии.
+    При новой версии берётся последний расчёт той же серии и досчитывается
+    с его последнего бара (он мог обновиться); если бары сдвинулись не только
+    в хвосте (дозагрузили историю) — полный пересчёт.
+    """
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self._lru: OrderedDict[tuple, _Entry] = OrderedDict()
+        self._latest: dict[tuple, tuple] = {}
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.incremental = 0
+        self.full = 0
+
+    def _put(self, series: tuple, key: tuple, entry: _Entry) -> None:
+        self._lru[key] = entry
+        self._latest[series] = key
+        while len(self._lru) > self.max_entries:
+            old, _ = self._lru.popitem(last=False)
+            if self._latest.get(old[:-1]) == old:
+                del self._latest[old[:-1]]
+
+    async def compute(
+        self,
+        session: AsyncSession,
+        secid: str,
+        board: str,
+        interval: int,
+        specs: list[tuple[str, tuple]],
+    ) -> tuple[np.ndarray, dict[str, dict[str, np.ndarray]]]:
+        version = await candle_data_version(session, secid, board, interval)
+        if version[0] == 0:
+            return np.empty(0, dtype="datetime64[D]"), {}
+
+        columns: dict = {}
+
+        async def read(date_from):
+            if date_from not in columns:
+                columns[date_from] = await read_candle_columns(session, secid, board, interval, date_from)
+            return columns[date_from]
+
+        days = None
+        result: dict[str, dict[str, np.ndarray]] = {}
+        for kind, params in specs:
+            fn = INDICATORS[kind][0]
+            series = (secid, board, interval, kind, params)
+            key = series + (version,)
+
+            entry = self._lru.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._lru.move_to_end(key)
+            else:
+                base = self._lru.get(self._latest.get(series, ()))
+                if base is not None and len(base.days) >= 2:
+                    k = len(base.days) - 1
+                    tail = await read(base.days[k].astype(object))
+                    if len(tail["d"]) and tail["d"][0] == base.days[k] and k + len(tail["d"]) == version[0]:
+                        close = np.concatenate([base.close[:k], tail["close"]])
+                        new = fn(close, k, base.out, *params)
+                        entry = _Entry(
+                            np.concatenate([base.days[:k], tail["d"]]),
+                            close,
+                            {name: np.concatenate([base.out[name][:k], arr]) for name, arr in new.items()},
+                        )
+                        self.incremental += 1
+                if entry is None:
+                    cols = await read(None)
+                    entry = _Entry(cols["d"], cols["close"], fn(cols["close"], 0, None, *params))
+                    self.full += 1
+                self._put(series, key, entry)
+
+            days = entry.days
+            result[label(kind, params)] = {n: a for n, a in entry.out.items() if not n.startswith("_")}
+        return days, result
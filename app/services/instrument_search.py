@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import re
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from typing import Callable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from unidecode import unidecode
+
+from app.db.models import Instrument
+
+NGRAM = 3
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize(s: str | None) -> str:
+    # "Сбербанк ПАО" -> "sberbank pao": кириллица транслитом, регистр и пунктуация не важны
+    return " ".join(_WORD.findall(unidecode(s or "").lower()))
+
+
+def _ngrams(s: str) -> set[str]:
+    return {s[i:i + NGRAM] for i in range(len(s) - NGRAM + 1)}
+
+
+@dataclass(frozen=True)
+class _Doc:
+    secid: str
+    board: str
+    name: str
+    shortname: str
+    isin: str
+    lotsize: int
+    hay: str            # нормализованные secid|shortname|name|isin через пробел
+    words: tuple[str, ...]
+
+
+class InstrumentSearch:
+    """
+    Поиск по справочнику instruments (secid, shortname, name, ISIN) в памяти:
+    - префиксы слов — отсортированный список (слово, secid), бинарный поиск;
+    - подстроки — индекс триграмм, кандидаты проверяются по строке.
+    Порядок: точный secid, префикс secid, префикс слова, подстрока; внутри — по обороту.
+    Справочник грузится при первом запросе, дальше обновляется точечно через upsert().
+    """
+
+    def __init__(self, turnover: Callable[[], dict[str, float]] | None = None) -> None:
+        self._docs: dict[str, _Doc] = {}
+        self._prefix: list[tuple[str, str]] = []
+        self._grams: dict[str, set[str]] = {}
+        self._turnover = turnover or (lambda: {})
+        self._loaded = False
+        self._lock = asyncio.Lock()
+        self._order: tuple[int, int, list[str]] | None = None  # (id(turnover), len(docs), secids по обороту)
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    async def ensure_loaded(self, session: AsyncSession, board: str = "TQBR") -> None:
+        if self._loaded:
+            return
+        async with self._lock:
+            if self._loaded:
+                return
+            rows = (await session.execute(select(Instrument).where(Instrument.board == board))).scalars().all()
+            self.upsert([
+                {"secid": r.secid, "board": r.board, "name": r.name, "shortname": r.shortname,
+                 "isin": r.isin, "lotsize": r.lotsize}
+                for r in rows
+            ])
+            self._loaded = True
+
+    def _drop(self, doc: _Doc) -> None:
+        for w in set(doc.words):
+            i = bisect_left(self._prefix, (w, doc.secid))
+            if i < len(self._prefix) and self._prefix[i] == (w, doc.secid):
+                del self._prefix[i]
+        for g in _ngrams(doc.hay):
+            keys = self._grams.get(g)
+            if keys is not None:
+                keys.discard(doc.secid)
+                if not keys:
+                    del self._grams[g]
+
+    def upsert(self, rows: list[dict]) -> None:
+        """rows — как values в upsert_instruments (secid/board/name/shortname/isin/lotsize)."""
+        added: list[tuple[str, str]] = []
+        for r in rows:
+            secid = (r.get("secid") or "").upper()
+            if not secid:
+                continue
+            old = self._docs.get(secid)
+            if old is not None:
+                self._drop(old)
+            fields = [secid, r.get("shortname") or "", r.get("name") or "", r.get("isin") or ""]
+            hay = " ".join(normalize(f) for f in fields if f)
+            doc = _Doc(
+                secid=secid,
+                board=r.get("board") or "TQBR",
+                name=r.get("name") or secid,
+                shortname=r.get("shortname") or "",
+                isin=r.get("isin") or "",
+                lotsize=int(r.get("lotsize") or 1),
+                hay=hay,
+                words=tuple(dict.fromkeys(hay.split())),
+            )
+            self._docs[secid] = doc
+            self._order = None
+            added.extend((w, secid) for w in doc.words)
+            for g in _ngrams(hay):
+                self._grams.setdefault(g, set()).add(secid)
+
+        if added:
+            # вставка пачки: на полной перезагрузке дешевле пересортировать целиком
+            if len(added) > len(self._prefix) // 8:
+                self._prefix = sorted(set(self._prefix) | set(added))
+            else:
+                for item in added:
+                    i = bisect_left(self._prefix, item)
+                    if i == len(self._prefix) or self._prefix[i] != item:
+                        insort(self._prefix, item)
+
+    def _prefix_hits(self, q: str) -> set[str]:
+        lo = bisect_left(self._prefix, (q, ""))
+        hi = bisect_left(self._prefix, (q + "\uffff", ""), lo)
+        return {secid for _, secid in self._prefix[lo:hi]}
+
+    def _by_turnover(self, turnover: dict[str, float]) -> list[str]:
+        # общий порядок справочника по обороту; пересчитывается при новом снимке доски
+        key = (id(turnover), len(self._docs))
+        if self._order is None or self._order[:2] != key:
+            self._order = (*key, sorted(self._docs, key=lambda s: (-turnover.get(s, 0.0), s)))
+        return self._order[2]
+
+    def search(self, query: str, limit: int = 10) -> list[dict]:
+        q = normalize(query)
+        if not q:
+            return []
+        terms = q.split()
+
+        # каждое слово запроса — префикс какого-то слова документа...
+        by_term = [self._prefix_hits(t) for t in terms]
+        prefix = set.intersection(*by_term)
+        cand = prefix
+        if len(prefix) < limit:
+            # ...или, если префиксов мало, подстрока (триграммы + проверка по строке)
+            cand = None
+            for t, hits in zip(terms, by_term):
+                if len(t) >= NGRAM:
+                    grams = sorted((self._grams.get(g, set()) for g in _ngrams(t)), key=len)
+                    sub = set.intersection(*grams)
+                    hits = hits | {s for s in sub if t in self._docs[s].hay}
+                cand = hits if cand is None else cand & hits
+                if not cand:
+                    return []
+
+        turnover = self._turnover()
+        qs = q.replace(" ", "")
+
+        def rank(secid: str) -> tuple:
+            low = secid.lower()
+            if low == qs:
+                tier = 0
+            elif low.startswith(qs):
+                tier = 1
+            elif secid in prefix:
+                tier = 2
+            else:
+                tier = 3
+            return tier, -turnover.get(secid, 0.0), secid
+
+        if len(cand) <= limit * 16:
+            top = heapq.nsmallest(limit, cand, key=rank)
+        else:
+            # широкий запрос: точные/префиксные secid вперёд, остальное — проходом по обороту
+            head = [s for s in cand if s.lower().startswith(qs)]
+            top = heapq.nsmallest(limit, head, key=rank)
+            seen = set(top)
+            for tier_set in (prefix, cand):
+                for s in self._by_turnover(turnover):
+                    if len(top) >= limit:
+                        break
+                    if s in tier_set and s not in seen:
+                        top.append(s)
+                        seen.add(s)
+        return [
+            {
+                "secid": d.secid,
+                "board": d.board,
+                "name": d.name,
+                "shortname": d.shortname,
+                "isin": d.isin,
+                "lotsize": d.lotsize,
+                "turnover": turnover.get(d.secid),
+            }
+            for d in (self._docs[s] for s in top)
+        ]
@@ -111,6 +111,23 @@ class MoexIssClient:
         payload = r.json()
         return _rows_to_dicts(payload["marketdata"])
     
+    async def board_snapshot_tqbr(self) -> tuple[list[dict], list[dict]]:
+        """
+        Вся доска TQBR одним запросом: (securities, marketdata).
+        Для скринера: лот/пред. цена + последняя цена/изменение/оборот.
+        """
+        url = f"{ISS_BASE}/engines/stock/markets/shares/boards/TQBR/securities.json"
+        params: dict[str, Any] = {
+            "iss.meta": "off",
+            "iss.only": "securities,marketdata",
+            "securities.columns": "SECID,SHORTNAME,LOTSIZE,PREVPRICE",
+            "marketdata.columns": "SECID,LAST,LASTTOPREVPRICE,VALTODAY,VOLTODAY,UPDATETIME",
+        }
+        r = await self.http.get(url, params=params)
+        r.raise_for_status()
+        payload = r.json()
+        return _rows_to_dicts(payload["securities"]), _rows_to_dicts(payload["marketdata"])
+
     async def securities_info_tqbr(self, secids: Iterable[str]) -> list[dict]:
         """
         Возвращает описания бумаг (имя/короткое имя/ISIN/лот) для списка тикеров.
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import logging
+import math
+from dataclasses import dataclass
+from typing import Callable
+
+from fastapi import HTTPException
+from sortedcontainers import SortedList
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db.repo.orders_repo import load_open_orders, claim_order, reject_order
+from app.db.repo.trading import _execute
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class BookOrder:
+    id: int
+    account_id: int
+    instrument_id: int
+    secid: str
+    side: str   # BUY/SELL
+    type: str   # LIMIT/STOP
+    qty: float
+    price: float
+
+
+class OrderBook:
+    """
+    Отложенные заявки одного инструмента в двух отсортированных по цене списках:
+    - up: срабатывают, когда цена >= ключа (SELL LIMIT, BUY STOP);
+    - down: срабатывают, когда цена <= ключа (BUY LIMIT, SELL STOP).
+    Тик снимает с края списка ровно сработавшие заявки: O(log n + fills).
+    """
+
+    def __init__(self, secid: str) -> None:
+        self.secid = secid
+        self._up: SortedList = SortedList()    # (price, id)
+        self._down: SortedList = SortedList()  # (price, id)
+        self._orders: dict[int, BookOrder] = {}
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def _side_list(self, o: BookOrder) -> SortedList:
+        fires_up = (o.side == "SELL") == (o.type == "LIMIT")
+        return self._up if fires_up else self._down
+
+    def add(self, o: BookOrder) -> None:
+        if o.id in self._orders:
+            return
+        self._orders[o.id] = o
+        self._side_list(o).add((o.price, o.id))
+
+    def remove(self, order_id: int) -> BookOrder | None:
+        o = self._orders.pop(order_id, None)
+        if o is not None:
+            self._side_list(o).discard((o.price, o.id))
+        return o
+
+    def match(self, price: float) -> list[BookOrder]:
+        # up: все ключи <= price — префикс списка
+        i = self._up.bisect_right((price, math.inf))
+        hit = list(self._up[:i])
+        del self._up[:i]
+
+        # down: все ключи >= price — суффикс списка (от лучшей цены к худшей)
+        j = self._down.bisect_left((price, -math.inf))
+        hit_down = list(reversed(self._down[j:]))
+        del self._down[j:]
+
+        out = []
+        for _, oid in hit + hit_down:
+            out.append(self._orders.pop(oid))
+        return out
+
+
+class OrderBooks:
+    """
+    Книги по всем инструментам процесса. Источник истины — таблица orders:
+    при старте книги восстанавливаются из OPEN-заявок, а исполнение захватывает
+    заявку условным UPDATE, поэтому несколько воркеров не исполнят её дважды.
+    """
+
+    def __init__(self, sessionmaker: async_sessionmaker) -> None:
+        self._sessionmaker = sessionmaker
+        self._books: dict[str, OrderBook] = {}
+        # вызывается после коммита исполнений (например, сбросить состояние счёта в журнале)
+        self.on_account_changed: Callable[[int], None] | None = None
+
+    def book(self, secid: str) -> OrderBook:
+        secid = secid.upper()
+        b = self._books.get(secid)
+        if b is None:
+            b = self._books[secid] = OrderBook(secid)
+        return b
+
+    def add(self, order: dict) -> None:
+        self.book(order["secid"]).add(BookOrder(
+            id=order["id"],
+            account_id=order["account_id"],
+            instrument_id=order["instrument_id"],
+            secid=order["secid"],
+            side=order["side"],
+            type=order["type"],
+            qty=float(order["qty"]),
+            price=float(order["price"]),
+        ))
+
+    def remove(self, secid: str, order_id: int) -> None:
+        self.book(secid).remove(order_id)
+
+    async def load(self, session: AsyncSession) -> int:
+        self._books.clear()
+        orders = await load_open_orders(session)
+        for o in orders:
+            self.add(o)
+        return len(orders)
+
+    async def on_tick(self, secid: str, price: float) -> None:
+        book = self._books.get(secid)
+        if not book:
+            return
+        hit = book.match(price)
+        if not hit:
+            return
+
+        try:
+            async with self._sessionmaker() as session:
+                for o in hit:
+                    await self._fill(session, o, price)
+                await session.commit()
+            if self.on_account_changed is not None:
+                for acc_id in {o.account_id for o in hit}:
+                    self.on_account_changed(acc_id)
+        except Exception:
+            # БД недоступна — заявки остаются OPEN в таблице, возвращаем их в книгу
+            log.exception("order matching failed for %s @ %s", secid, price)
+            for o in hit:
+                book.add(o)
+
+    async def _fill(self, session: AsyncSession, o: BookOrder, price: float) -> None:
+        try:
+            async with session.begin_nested():
+                if not await claim_order(session, o.id, price):
+                    return  # уже отменена/исполнена
+                # та же логика, что у рыночных заявок: cash/позиция/trade
+                await _execute(
+                    session,
+                    account_id=o.account_id,
+                    instrument_id=o.instrument_id,
+                    secid=o.secid,
+                    side=o.side,
+                    qty=o.qty,
+                    px=price,
+                )
+        except HTTPException as e:
+            await reject_order(session, o.id, str(e.detail))
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+TickListener = Callable[[str, float], Awaitable[None]]
+
+
+class QuoteHub:
+    """
+    Единая точка, через которую проходят "живые" цены:
+    хранит последнюю цену по тикеру и раздаёт тики подписчикам (матчинг заявок и т.п.)
+    и клиентским потокам (SSE) через очереди.
+    """
+
+    def __init__(self) -> None:
+        self._last: dict[str, tuple[float, float]] = {}  # secid -> (price, unix ts)
+        self._listeners: list[TickListener] = []
+        self._tasks: set[asyncio.Task] = set()
+        self._streams: set[asyncio.Queue] = set()
+        self.dropped = 0  # тики, выкинутые из очередей медленных клиентов
+
+    def subscribe(self, listener: TickListener) -> None:
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def last(self, secid: str) -> tuple[float, float] | None:
+        return self._last.get(secid.upper())
+
+    async def publish(self, secid: str, price: float) -> None:
+        secid = secid.upper()
+        price = float(price)
+        if price <= 0:
+            return
+        ts = time.time()
+        self._last[secid] = (price, ts)
+        for listener in self._listeners:
+            await listener(secid, price)
+        for q in self._streams:
+            if q.full():
+                # медленный клиент: теряет самый старый тик, а не тормозит остальных
+                q.get_nowait()
+                self.dropped += 1
+            q.put_nowait((secid, price, ts))
+
+    def open_stream(self, maxsize: int = 1000) -> asyncio.Queue:
+        q: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._streams.add(q)
+        return q
+
+    def close_stream(self, q: asyncio.Queue) -> None:
+        self._streams.discard(q)
+
+    @property
+    def streams(self) -> int:
+        return len(self._streams)
+
+    def publish_background(self, ticks: list[tuple[str, float]]) -> None:
+        """
+        Для обработчиков запросов: раздача тиков не должна задерживать ответ.
+        """
+        if not ticks:
+            return
+
+        async def run():
+            for secid, price in ticks:
+                await self.publish(secid, price)
+
+        task = asyncio.create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db.repo.candles_repo import read_candles_many, list_candle_secids
+from app.services.quotes import QuoteHub
+
+# длительность бара по interval ISS, секунды
+BAR_SECONDS = {1: 60, 10: 600, 60: 3600, 24: 86400, 7: 7 * 86400, 31: 30 * 86400, 4: 91 * 86400}
+MAX_TICKS = 5_000_000
+MIN_TICKS_PER_BAR = 4  # open, два экстремума, close
+
+
+def bar_path(rng: np.random.Generator, o: float, h: float, l: float, c: float, m: int) -> np.ndarray:
+    """
+    m цен внутри бара: open -> первый экстремум -> второй -> close,
+    между опорными точками — линейно + шум, всё в пределах [low, high].
+    """
+    first, second = (h, l) if rng.random() < 0.5 else (l, h)
+    i1, i2 = np.sort(rng.choice(np.arange(1, m - 1), size=2, replace=False))
+    knots_x = np.array([0, i1, i2, m - 1])
+    knots_y = np.array([o, first, second, c])
+    path = np.interp(np.arange(m), knots_x, knots_y)
+    path += rng.normal(0.0, (h - l) * 0.05 + 1e-12, m)
+    path = np.clip(path, l, h)
+    path[knots_x] = knots_y
+    return path
+
+
+@dataclass
+class _Tape:
+    secids: list[str]
+    t: np.ndarray      # секунды "рыночного" времени от начала replay
+    sec: np.ndarray    # индекс в secids
+    price: np.ndarray
+
+
+def build_tape(
+    candles: dict[str, list[dict]],
+    *,
+    interval: int,
+    ticks_per_bar: int,
+    seed: int,
+) -> _Tape:
+    """Поток тиков по всем бумагам, отсортированный по времени. Одинаковый seed — одинаковая лента."""
+    rng = np.random.default_rng(seed)
+    bar_s = BAR_SECONDS.get(interval, 86400)
+    secids = sorted(s for s, rows in candles.items() if rows)
+    days = sorted({r["t"][:10] for s in secids for r in candles[s]})
+    if not days:
+        return _Tape([], np.empty(0), np.empty(0, dtype=np.int64), np.empty(0))
+    day0 = np.datetime64(days[0], "D")
+
+    ts, ss, ps = [], [], []
+    for si, secid in enumerate(secids):
+        for r in candles[secid]:
+            # в candles хранится только дата бара — от неё и отсчитываем
+            start = (np.datetime64(r["t"][:10], "D") - day0).astype(np.int64) * 86400
+            o, h, l, c = (float(r[k]) for k in ("open", "high", "low", "close"))
+            ts.append(start + np.sort(rng.uniform(0.0, bar_s, ticks_per_bar)))
+            ss.append(np.full(ticks_per_bar, si, dtype=np.int64))
+            ps.append(bar_path(rng, o, max(h, o, c), min(l, o, c), c, ticks_per_bar))
+
+    t = np.concatenate(ts)
+    order = np.argsort(t, kind="stable")
+    t = t[order] - t[order][0]
+    return _Tape(secids, t, np.concatenate(ss)[order], np.concatenate(ps)[order])
+
+
+class MarketReplay:
+    """
+    Проигрывает сохранённые свечи как поток котировок в N раз быстрее реального времени.
+    Тики идут через QuoteHub.publish — те же каналы, что у живых цен:
+    последняя цена, матчинг отложенных заявок, SSE-потоки.
+    Одновременно крутится не больше одного replay.
+    """
+
+    def __init__(self, hub: QuoteHub, sessionmaker: async_sessionmaker[AsyncSession]) -> None:
+        self.hub = hub
+        self.sessionmaker = sessionmaker
+        self._task: asyncio.Task | None = None
+        self._tape: _Tape | None = None
+        self.params: dict = {}
+        self.published = 0
+        self.lag_max_s = 0.0
+        self.started_at: float | None = None
+        self.error: str | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(
+        self,
+        *,
+        secids: list[str] | None,
+        date_from: date,
+        date_to: date,
+        interval: int = 24,
+        speed: float = 60.0,
+        ticks_per_bar: int = 50,
+        seed: int = 0,
+        board: str = "TQBR",
+    ) -> dict:
+        if self.running:
+            raise RuntimeError("replay already running")
+
+        async with self.sessionmaker() as session:
+            if not secids:
+                secids = await list_candle_secids(session, board, interval, date_from, date_to)
+            candles = await read_candles_many(session, secids, board, interval, date_from, date_to)
+
+        bars = sum(len(v) for v in candles.values())
+        if bars * ticks_per_bar > MAX_TICKS:
+            raise ValueError(f"too many ticks: {bars * ticks_per_bar} (max {MAX_TICKS})")
+        tape = build_tape(candles, interval=interval, ticks_per_bar=ticks_per_bar, seed=seed)
+
+        self._tape = tape
+        self.params = {
+            "secids": tape.secids, "from": date_from.isoformat(), "to": date_to.isoformat(),
+            "interval": interval, "speed": speed, "ticks_per_bar": ticks_per_bar, "seed": seed,
+        }
+        self.published = 0
+        self.lag_max_s = 0.0
+        self.error = None
+        self.started_at = time.time()
+        self._task = asyncio.create_task(self._run(tape, speed))
+        return self.status()
+
+    async def _run(self, tape: _Tape, speed: float) -> None:
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+        try:
+            for i in range(len(tape.t)):
+                delay = t0 + tape.t[i] / speed - loop.time()
+                if delay > 0.001:
+                    await asyncio.sleep(delay)
+                else:
+                    if delay < 0:
+                        # не успеваем за расписанием (медленные подписчики) — фиксируем отставание
+                        self.lag_max_s = max(self.lag_max_s, -delay)
+                    if i % 256 == 0:
+                        # на больших скоростях не держим event loop целиком
+                        await asyncio.sleep(0)
+                await self.hub.publish(tape.secids[tape.sec[i]], float(tape.price[i]))
+                self.published += 1
+        except Exception as e:
+            self.error = repr(e)
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def status(self) -> dict:
+        total = len(self._tape.t) if self._tape is not None else 0
+        elapsed = (time.time() - self.started_at) if self.started_at else 0.0
+        return {
+            "running": self.running,
+            "params": self.params,
+            "ticks_total": total,
+            "published": self.published,
+            "ticks_per_sec": (self.published / elapsed) if elapsed > 0 else 0.0,
+            "lag_max_s": self.lag_max_s,
+            "error": self.error,
+        }
@@ -0,0 +1,113 @@
+"""
+Кэш готовых HTTP-ответов со свечами в памяти процесса.
+
+Хранятся уже сериализованные тела (большие — сразу в gzip), поэтому на попадании
+нет ни запроса свечей, ни downsample, ни сериализации. Объём ограничен суммой байт
+тел (LRU). Запись помнит версию данных — updated_at покрытия CandleCache плюс
+последний updated_at и число свечей диапазона: после перезагрузки диапазона (или
+перекрывающего его) версия другая и старое тело не отдаётся. Плюс явный сброс
+по secid после commit upsert свечей.
+"""
+from __future__ import annotations
+
+import gzip
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.services.fast_json import dumps
+
+
+@dataclass(slots=True)
+class CachedBody:
+    secid: str
+    version: Any
+    body: bytes
+    gzipped: bool
+
+    def response(self, request: Request) -> Response:
+        headers = {"Vary": "Accept-Encoding"}
+        body = self.body
+        if self.gzipped:
+            if "gzip" in request.headers.get("accept-encoding", ""):
+                headers["Content-Encoding"] = "gzip"
+            else:
+                body = gzip.decompress(body)
+        return Response(body, media_type="application/json", headers=headers)
+
+
+class ResponseCache:
+    def __init__(self, *, max_bytes: int, gzip_min_bytes: int = 4096) -> None:
+        self.max_bytes = max_bytes
+        # тела от этого размера храним сжатыми; <= 0 — не сжимать
+        self.gzip_min_bytes = gzip_min_bytes
+        self._entries: OrderedDict[Hashable, CachedBody] = OrderedDict()
+        self._by_secid: dict[str, set[Hashable]] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _drop(self, key: Hashable) -> None:
+        e = self._entries.pop(key)
+        self.bytes -= len(e.body)
+        keys = self._by_secid.get(e.secid)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_secid[e.secid]
+
+    def get(self, key: Hashable, version: Any) -> CachedBody | None:
+        e = self._entries.get(key)
+        if e is not None and e.version != version:
+            self._drop(key)
+            e = None
+        if e is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return e
+
+    def put(self, key: Hashable, secid: str, version: Any, payload: Any) -> CachedBody:
+        body = dumps(payload)
+        gzipped = 0 < self.gzip_min_bytes <= len(body)
+        if gzipped:
+            body = gzip.compress(body, compresslevel=5)
+        e = CachedBody(secid, version, body, gzipped)
+        if len(body) > self.max_bytes:
+            return e  # не влезает целиком — отдаём, но не храним
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = e
+        self._by_secid.setdefault(secid, set()).add(key)
+        self.bytes += len(body)
+        while self.bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+        return e
+
+    def invalidate(self, secid: str) -> None:
+        for key in list(self._by_secid.get(secid, ())):
+            self._drop(key)
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
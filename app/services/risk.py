@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Account, Position, Instrument
+from app.db.repo.candles_repo import read_close_matrix
+from app.services.moex_iss import MOEXBC_TQBR_SECIDS
+
+LOOKBACK_DAYS = 252
+TRADING_DAYS = 252
+VAR_LEVELS = (95, 99)
+
+
+@dataclass
+class _Matrices:
+    as_of: date
+    secids: list[str]
+    col: dict[str, int]
+    last: np.ndarray     # [N] последнее закрытие
+    returns: np.ndarray  # [T x N] дневные доходности (0 там, где бумага не торговалась)
+    cov: np.ndarray      # [N x N]
+    bench: np.ndarray    # [T] доходность корзины MOEXBC (равные веса)
+    cov_bench: np.ndarray  # [N] ковариация бумаг с корзиной
+    var_bench: float
+
+
+def _ffill(x: np.ndarray) -> np.ndarray:
+    idx = np.where(~np.isnan(x), np.arange(len(x))[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return x[idx, np.arange(x.shape[1])]
+
+
+class RiskModel:
+    """
+    Матрицы доходностей/ковариаций по всем бумагам в позициях + корзине MOEXBC.
+    Строятся раз в день (или когда появилась бумага, которой нет в матрице),
+    дальше риск счёта — выборка строк/столбцов и пара матричных произведений.
+    """
+
+    def __init__(self, *, board: str = "TQBR", interval: int = 24) -> None:
+        self.board = board
+        self.interval = interval
+        self._m: _Matrices | None = None
+        self._lock = asyncio.Lock()
+        self.builds = 0
+
+    async def _build(self, session: AsyncSession, extra: set[str]) -> _Matrices:
+        held = (await session.execute(
+            select(Instrument.secid)
+            .join(Position, Position.instrument_id == Instrument.id)
+            .where(Instrument.board == self.board, Position.qty > 0)
+            .distinct()
+        )).scalars().all()
+        secids = sorted(set(held) | set(MOEXBC_TQBR_SECIDS) | extra)
+
+        today = date.today()
+        # с запасом на выходные/праздники, потом обрезаем до LOOKBACK_DAYS баров
+        days, closes = await read_close_matrix(
+            session, secids, self.board, self.interval, today - timedelta(days=LOOKBACK_DAYS * 2), None,
+        )
+        closes = _ffill(closes)[-(LOOKBACK_DAYS + 1):] if len(days) else np.empty((0, len(secids)))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rets = closes[1:] / closes[:-1] - 1.0
+
+        # корзина — среднее по тем бумагам MOEXBC, у которых в этот день есть цена
+        in_bench = [i for i, s in enumerate(secids) if s in MOEXBC_TQBR_SECIDS]
+        basket = rets[:, in_bench]
+        n_bench = np.isfinite(basket).sum(axis=1)
+        bench = np.where(n_bench > 0, np.nansum(np.where(np.isfinite(basket), basket, 0.0), axis=1) / np.maximum(n_bench, 1), 0.0)
+        rets = np.nan_to_num(rets, nan=0.0, posinf=0.0, neginf=0.0)
+
+        if len(rets) >= 2:
+            cov = np.cov(rets, rowvar=False).reshape(len(secids), len(secids))
+            bc = rets - rets.mean(axis=0)
+            b = bench - bench.mean()
+            cov_bench = bc.T @ b / (len(rets) - 1)
+            var_bench = float(b @ b / (len(rets) - 1))
+        else:
+            cov = np.zeros((len(secids), len(secids)))
+            cov_bench = np.zeros(len(secids))
+            var_bench = 0.0
+
+        last = closes[-1] if len(closes) else np.full(len(secids), np.nan)
+        self.builds += 1
+        return _Matrices(today, secids, {s: i for i, s in enumerate(secids)}, last, rets, cov, bench, cov_bench, var_bench)
+
+    async def matrices(self, session: AsyncSession, need: set[str]) -> _Matrices:
+        async with self._lock:
+            m = self._m
+            if m is None or m.as_of != date.today() or not need <= set(m.col):
+                self._m = m = await self._build(session, need)
+        return m
+
+    async def account_risk(self, session: AsyncSession, account_id: int) -> dict:
+        cash = (await session.execute(select(Account.cash).where(Account.id == account_id))).scalar_one_or_none()
+        rows = (await session.execute(
+            select(Instrument.secid, Position.qty)
+            .join(Instrument, Instrument.id == Position.instrument_id)
+            .where(Position.account_id == account_id, Position.qty > 0)
+            .order_by(Instrument.secid.asc())
+        )).all()
+
+        m = await self.matrices(session, {s for s, _ in rows})
+        # без цены (нет свечей) бумага в риск не попадает
+        rows = [(s, float(q)) for s, q in rows if not np.isnan(m.last[m.col[s]])]
+        secids = [s for s, _ in rows]
+        idx = np.array([m.col[s] for s in secids], dtype=np.int64)
+        value = np.array([q for _, q in rows]) * m.last[idx]
+
+        positions_value = float(value.sum())
+        equity = float(cash or 0.0) + positions_value
+
+        cov = m.cov[np.ix_(idx, idx)]
+        sd = np.sqrt(np.diag(cov))
+        daily_rub = float(np.sqrt(max(value @ cov @ value, 0.0)))
+        pnl = m.returns[:, idx] @ value  # исторические сценарии P&L на 1 день
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = cov / np.outer(sd, sd)
+            beta_pos = m.cov_bench[idx] / m.var_bench if m.var_bench > 0 else np.full(len(idx), np.nan)
+        corr = np.where(np.isfinite(corr), corr, 0.0)
+        np.fill_diagonal(corr, 1.0)
+
+        def pct(x: float) -> float:
+            return x / equity * 100.0 if equity > 0 else 0.0
+
+        var = {}
+        for level in VAR_LEVELS:
+            loss = float(max(-np.percentile(pnl, 100 - level), 0.0)) if len(pnl) else 0.0
+            var[str(level)] = {"rub": loss, "pct": pct(loss)}
+
+        beta = None
+        if m.var_bench > 0 and equity > 0:
+            beta = float(value @ m.cov_bench[idx] / m.var_bench / equity)
+
+        return {
+            "as_of": m.as_of.isoformat(),
+            "lookback_days": int(len(m.returns)),
+            "equity": equity,
+            "positions_value": positions_value,
+            "volatility": {
+                "daily_rub": daily_rub,
+                "daily_pct": pct(daily_rub),
+                "annual_pct": float(pct(daily_rub) * np.sqrt(TRADING_DAYS)),
+            },
+            "var_1d": var,
+            "beta": beta,
+            "benchmark": "MOEXBC (equal-weight)",
+            "correlation": {
+                "secids": secids,
+                "matrix": [[float(v) for v in row] for row in corr],
+            },
+            "positions": [
+                {
+                    "secid": s,
+                    "value": float(value[i]),
+                    "weight": float(value[i] / equity) if equity > 0 else 0.0,
+                    "volatility_annual_pct": float(sd[i] * np.sqrt(TRADING_DAYS) * 100.0),
+                    "beta": None if np.isnan(beta_pos[i]) else float(beta_pos[i]),
+                }
+                for i, s in enumerate(secids)
+            ],
+        }
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db.repo.stats_repo import fold_new_trades
+
+log = logging.getLogger(__name__)
+
+
+class RollupFolder:
+    """
+    Фоновая дописка trade_rollups раз в interval_s (см. stats_repo.fold_new_trades).
+    Воркеров может быть несколько: проходы сериализуются блокировкой водяного знака.
+    """
+
+    def __init__(self, sessionmaker: async_sessionmaker[AsyncSession], *, interval_s: float = 10.0, batch: int = 5000) -> None:
+        self.sessionmaker = sessionmaker
+        self.interval_s = interval_s
+        self.batch = batch
+        self._task: asyncio.Task | None = None
+        self.folded = 0
+        self.errors = 0
+
+    async def fold(self) -> int:
+        """Один проход до конца накопившегося (пачками по batch, каждая — своей транзакцией)."""
+        total = 0
+        while True:
+            async with self.sessionmaker() as session:
+                n = await fold_new_trades(session, batch=self.batch)
+                await session.commit()
+            total += n
+            if n < self.batch:
+                break
+        self.folded += total
+        return total
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.fold()
+            except Exception as e:
+                self.errors += 1
+                log.warning("trade rollups fold failed: %r", e)
+            await asyncio.sleep(self.interval_s)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
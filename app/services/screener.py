@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+
+import httpx
+import numpy as np
+
+from app.services.moex_iss import MoexIssClient
+from app.services.quotes import QuoteHub
+
+log = logging.getLogger(__name__)
+
+# поле API -> колонка снапшота
+FIELDS = {
+    "last": "last",
+    "change": "change_pct",
+    "turnover": "valtoday",
+    "volume": "voltoday",
+    "lot": "lotsize",
+}
+
+
+def _num(x) -> float:
+    try:
+        return float(x) if x is not None else np.nan
+    except (TypeError, ValueError):
+        return np.nan
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """Колоночный снимок доски: одна позиция в массивах = одна бумага."""
+
+    secid: np.ndarray       # str
+    shortname: np.ndarray   # str
+    last: np.ndarray
+    change_pct: np.ndarray
+    valtoday: np.ndarray
+    voltoday: np.ndarray
+    lotsize: np.ndarray
+    live: np.ndarray        # bool: last — цена сделки сегодня (иначе PREVPRICE, только для показа)
+    updated_at: float
+
+    def __len__(self) -> int:
+        return len(self.secid)
+
+
+def build_snapshot(sec_rows: list[dict], md_rows: list[dict]) -> Snapshot:
+    info = {(r.get("SECID") or "").upper(): r for r in sec_rows}
+    md: dict[str, dict] = {}
+    for r in md_rows:
+        secid = (r.get("SECID") or "").upper()
+        if secid:
+            md[secid] = r
+    secids = sorted(s for s in info.keys() | md.keys() if s)
+
+    def col(src: dict, key: str) -> np.ndarray:
+        return np.array([_num(src.get(s, {}).get(key)) for s in secids], dtype=np.float64)
+
+    last = col(md, "LAST")
+    live = ~np.isnan(last)
+    # до первой сделки дня LAST пустой — показываем цену закрытия прошлого дня
+    last = np.where(live, last, col(info, "PREVPRICE"))
+    return Snapshot(
+        secid=np.array(secids, dtype=object),
+        shortname=np.array([info.get(s, {}).get("SHORTNAME") or s for s in secids], dtype=object),
+        last=last,
+        change_pct=col(md, "LASTTOPREVPRICE"),
+        valtoday=col(md, "VALTODAY"),
+        voltoday=col(md, "VOLTODAY"),
+        lotsize=col(info, "LOTSIZE"),
+        live=live,
+        updated_at=time.time(),
+    )
+
+
+def screen(
+    snap: Snapshot,
+    *,
+    ranges: dict[str, tuple[float | None, float | None]],
+    sort: str = "turnover",
+    desc: bool = True,
+    limit: int = 50,
+) -> tuple[int, list[dict]]:
+    """
+    ranges: поле -> (min, max), None — без границы. Возвращает (сколько подошло, топ-limit).
+    NaN по отфильтрованному полю не проходит; при сортировке NaN всегда в конце.
+    """
+    mask = np.ones(len(snap), dtype=bool)
+    for field, (lo, hi) in ranges.items():
+        x = getattr(snap, FIELDS[field])
+        if lo is not None:
+            mask &= x >= lo
+        if hi is not None:
+            mask &= x <= hi
+    idx = np.flatnonzero(mask)
+
+    key = getattr(snap, FIELDS[sort])[idx]
+    key = np.where(np.isnan(key), -np.inf if desc else np.inf, key)
+    if desc:
+        key = -key
+    if limit < len(idx):
+        part = np.argpartition(key, limit)[:limit]
+        order = part[np.argsort(key[part], kind="stable")]
+    else:
+        order = np.argsort(key, kind="stable")
+    top = idx[order]
+
+    def f(v: float) -> float | None:
+        return None if np.isnan(v) else float(v)
+
+    return len(idx), [
+        {
+            "secid": snap.secid[i],
+            "shortname": snap.shortname[i],
+            "last": f(snap.last[i]),
+            "change_pct": f(snap.change_pct[i]),
+            "turnover": f(snap.valtoday[i]),
+            "volume": f(snap.voltoday[i]),
+            "lotsize": f(snap.lotsize[i]),
+        }
+        for i in top
+    ]
+
+
+class BoardSnapshot:
+    """
+    Держит актуальный Snapshot доски TQBR: фоновое обновление раз в interval_s.
+    Свежие цены заодно уходят в QuoteHub (как из popular-today).
+    """
+
+    def __init__(self, moex: MoexIssClient, hub: QuoteHub, *, interval_s: float = 60.0) -> None:
+        self.moex = moex
+        self.hub = hub
+        self.interval_s = interval_s
+        self.snapshot: Snapshot | None = None
+        self._task: asyncio.Task | None = None
+        self._turnover: tuple[Snapshot, dict[str, float]] | None = None
+        self.refreshes = 0
+        self.errors = 0
+
+    async def refresh(self) -> Snapshot:
+        sec_rows, md_rows = await self.moex.board_snapshot_tqbr()
+        snap = build_snapshot(sec_rows, md_rows)
+        prev = self.snapshot
+        self.snapshot = snap
+        self.refreshes += 1
+
+        # в QuoteHub — только настоящие LAST: по PREVPRICE исполнялись бы заявки и срабатывали алерты
+        old = dict(zip(prev.secid, prev.last)) if prev is not None else {}
+        self.hub.publish_background([
+            (s, float(p)) for s, p, live in zip(snap.secid, snap.last, snap.live)
+            if live and old.get(s) != p
+        ])
+        return snap
+
+    def turnover(self) -> dict[str, float]:
+        # secid -> VALTODAY, пересчитывается раз на снимок
+        snap = self.snapshot
+        if snap is None:
+            return {}
+        if self._turnover is None or self._turnover[0] is not snap:
+            self._turnover = (snap, {s: float(v) for s, v in zip(snap.secid, snap.valtoday) if not np.isnan(v)})
+        return self._turnover[1]
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except httpx.HTTPError as e:
+                self.errors += 1
+                log.warning("screener snapshot refresh failed: %r", e)
+            except Exception:
+                # любая другая ошибка не должна останавливать цикл навсегда
+                self.errors += 1
+                log.exception("screener snapshot refresh failed")
+            await asyncio.sleep(self.interval_s)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
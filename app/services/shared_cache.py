@@ -0,0 +1,411 @@
+"""
+Кэш, общий для воркеров uvicorn: один интерфейс, три бэкенда (CACHE_BACKEND).
+
+- memory — LRU в памяти процесса (один воркер / разработка);
+- mmap   — файл-таблица в /dev/shm, общий для воркеров одного хоста:
+           слоты фиксированного размера, ключ -> слот по хэшу (коллизия = вытеснение),
+           запись под flock, чтение без блокировок (seqlock);
+- redis  — Redis по RESP (свой минимальный клиент: GET/SET PX/DEL/INCR).
+
+Версионная инвалидация: ключи живут в пространстве имён ns, версия ns хранится
+в том же бэкенде; bump(ns) делает все старые ключи ns недостижимыми (дальше их
+вытесняет TTL/LRU). Ошибки бэкенда — это промах, а не 500.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Protocol
+from urllib.parse import urlparse
+
+from app.services.fast_json import dumps, loads
+
+try:
+    import fcntl
+except ImportError:  # Windows: mmap-бэкенд недоступен
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+
+class CacheBackend(Protocol):
+    async def get(self, key: str) -> bytes | None: ...
+    async def set(self, key: str, value: bytes, ttl_s: float) -> None: ...
+    async def delete(self, key: str) -> None: ...
+    async def incr(self, key: str) -> int: ...
+    async def counter(self, key: str) -> int: ...
+
+
+# --- memory ---
+
+class MemoryBackend:
+    def __init__(self, max_entries: int = 10_000) -> None:
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._counters: dict[str, int] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        e = self._data.get(key)
+        if e is None:
+            return None
+        if e[0] < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return e[1]
+
+    async def set(self, key: str, value: bytes, ttl_s: float) -> None:
+        self._data[key] = (time.monotonic() + ttl_s, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    async def counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+
+# --- mmap ---
+
+_MAGIC = b"AKKC"
+_FILE_HEADER = struct.Struct("<4sIII")     # magic, формат, slots, slot_bytes
+_COUNTERS = 256                            # счётчики версий: hash(ns) % 256
+_DATA_OFFSET = 4096
+_SLOT_HEADER = struct.Struct("<IQdIH")     # seq, key hash, expires (unix), value len, key len
+
+
+def _hash64(key: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+class MmapBackend:
+    """
+    Прямоотображённая таблица слотов в файле (по умолчанию на tmpfs /dev/shm).
+    Значения больше слота не кэшируются. Счётчики версий — 256 ячеек u64,
+    коллизия двух ns лишь лишний раз сбрасывает чужое пространство.
+    """
+
+    def __init__(self, path: str, *, slots: int = 4096, slot_bytes: int = 65536) -> None:
+        if fcntl is None:
+            raise RuntimeError("mmap cache backend needs fcntl (POSIX)")
+        self.path = path
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        size = _DATA_OFFSET + slots * slot_bytes
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._locked():
+            if os.fstat(self._fd).st_size < size:
+                os.ftruncate(self._fd, size)
+            self._mm = mmap.mmap(self._fd, size)
+            magic, _, n, sb = _FILE_HEADER.unpack_from(self._mm, 0)
+            if magic != _MAGIC or n != slots or sb != slot_bytes:
+                # новый файл или другая геометрия — размечаем заново
+                self._mm[:_DATA_OFFSET] = bytes(_DATA_OFFSET)
+                for i in range(slots):
+                    _SLOT_HEADER.pack_into(self._mm, _DATA_OFFSET + i * slot_bytes, 0, 0, 0.0, 0, 0)
+                _FILE_HEADER.pack_into(self._mm, 0, _MAGIC, 1, slots, slot_bytes)
+
+    def _locked(self):
+        fd = self._fd
+
+        class _Lock:
+            def __enter__(self):
+                fcntl.flock(fd, fcntl.LOCK_EX)
+
+            def __exit__(self, *exc):
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+        return _Lock()
+
+    def _slot(self, h: int) -> int:
+        return _DATA_OFFSET + (h % self.slots) * self.slot_bytes
+
+    async def get(self, key: str) -> bytes | None:
+        k = key.encode()
+        h = _hash64(k)
+        off = self._slot(h)
+        seq, kh, expires, vlen, klen = _SLOT_HEADER.unpack_from(self._mm, off)
+        if seq & 1 or kh != h or klen != len(k) or expires < time.time():
+            return None
+        start = off + _SLOT_HEADER.size
+        if self._mm[start:start + klen] != k:
+            return None
+        value = self._mm[start + klen:start + klen + vlen]
+        # писатель успел поменять слот, пока читали, — считаем промахом
+        if struct.unpack_from("<I", self._mm, off)[0] != seq:
+            return None
+        return value
+
+    async def set(self, key: str, value: bytes, ttl_s: float) -> None:
+        k = key.encode()
+        if _SLOT_HEADER.size + len(k) + len(value) > self.slot_bytes:
+            return
+        h = _hash64(k)
+        off = self._slot(h)
+        with self._locked():
+            seq = struct.unpack_from("<I", self._mm, off)[0]
+            struct.pack_into("<I", self._mm, off, (seq + 1) | 1)  # нечётный — слот пишется
+            start = off + _SLOT_HEADER.size
+            self._mm[start:start + len(k)] = k
+            self._mm[start + len(k):start + len(k) + len(value)] = value
+            _SLOT_HEADER.pack_into(self._mm, off, ((seq + 1) | 1) + 1, h, time.time() + ttl_s, len(value), len(k))
+
+    async def delete(self, key: str) -> None:
+        k = key.encode()
+        h = _hash64(k)
+        off = self._slot(h)
+        with self._locked():
+            seq, kh, _, _, _ = _SLOT_HEADER.unpack_from(self._mm, off)
+            if kh == h:
+                _SLOT_HEADER.pack_into(self._mm, off, (seq | 1) + 1, 0, 0.0, 0, 0)
+
+    async def incr(self, key: str) -> int:
+        off = _FILE_HEADER.size + (_hash64(key.encode()) % _COUNTERS) * 8
+        with self._locked():
+            v = struct.unpack_from("<Q", self._mm, off)[0] + 1
+            struct.pack_into("<Q", self._mm, off, v)
+        return v
+
+    async def counter(self, key: str) -> int:
+        return struct.unpack_from("<Q", self._mm, _FILE_HEADER.size + (_hash64(key.encode()) % _COUNTERS) * 8)[0]
+
+    def close(self) -> None:
+        self._mm.close()
+        os.close(self._fd)
+
+
+# --- redis (RESP2) ---
+
+class RedisError(Exception):
+    pass
+
+
+class RedisBackend:
+    """Минимальный RESP-клиент: пул соединений, по команде на соединение за раз."""
+
+    def __init__(self, url: str, *, pool_size: int = 4, timeout_s: float = 1.0) -> None:
+        u = urlparse(url)
+        self.host = u.hostname or "127.0.0.1"
+        self.port = u.port or 6379
+        self.password = u.password
+        self.db = int((u.path or "/0").lstrip("/") or 0)
+        self.timeout_s = timeout_s
+        self._free: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._sem = asyncio.Semaphore(pool_size)
+
+    @staticmethod
+    def _encode(args: tuple) -> bytes:
+        out = [b"*%d\r\n" % len(args)]
+        for a in args:
+            b = a if isinstance(a, bytes) else str(a).encode()
+            out.append(b"$%d\r\n%s\r\n" % (len(b), b))
+        return b"".join(out)
+
+    @classmethod
+    async def _read(cls, reader: asyncio.StreamReader):
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("redis closed connection")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RedisError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            n = int(rest)
+            if n < 0:
+                return None
+            data = await reader.readexactly(n + 2)
+            return data[:-2]
+        if kind == b"*":
+            n = int(rest)
+            return None if n < 0 else [await cls._read(reader) for _ in range(n)]
+        raise RedisError(f"bad reply: {line!r}")
+
+    async def _open(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        conn = (reader, writer)
+        if self.password:
+            await self._roundtrip(conn, ("AUTH", self.password))
+        if self.db:
+            await self._roundtrip(conn, ("SELECT", self.db))
+        return conn
+
+    async def _roundtrip(self, conn, args: tuple):
+        reader, writer = conn
+        writer.write(self._encode(args))
+        await writer.drain()
+        return await self._read(reader)
+
+    async def command(self, *args):
+        async with self._sem:
+            conn = self._free.pop() if self._free else None
+            try:
+                if conn is None:
+                    conn = await asyncio.wait_for(self._open(), self.timeout_s)
+                reply = await asyncio.wait_for(self._roundtrip(conn, args), self.timeout_s)
+            except RedisError:
+                self._free.append(conn)
+                raise
+            except BaseException:
+                # соединение в неизвестном состоянии — закрываем, следующее откроется заново
+                if conn is not None:
+                    conn[1].close()
+                raise
+            self._free.append(conn)
+            return reply
+
+    async def get(self, key: str) -> bytes | None:
+        return await self.command("GET", key)
+
+    async def set(self, key: str, value: bytes, ttl_s: float) -> None:
+        await self.command("SET", key, value, "PX", max(1, int(ttl_s * 1000)))
+
+    async def delete(self, key: str) -> None:
+        await self.command("DEL", key)
+
+    async def incr(self, key: str) -> int:
+        return await self.command("INCR", key)
+
+    async def counter(self, key: str) -> int:
+        v = await self.command("GET", key)
+        return int(v) if v is not None else 0
+
+    async def close(self) -> None:
+        for _, writer in self._free:
+            writer.close()
+        self._free.clear()
+
+
+# --- фасад ---
+
+class SharedCache:
+    """
+    get/set JSON-значений с TTL в пространствах имён с версиями.
+    get_or_set / get_or_set_bytes склеивают одновременные промахи одного ключа в процессе (single flight).
+    """
+
+    def __init__(self, backend: CacheBackend, *, prefix: str = "akkb", version_ttl_s: float = 1.0) -> None:
+        self.backend = backend
+        self.prefix = prefix
+        # версия ns читается из бэкенда не чаще раза в version_ttl_s: bump виден другим воркерам с такой задержкой
+        self.version_ttl_s = version_ttl_s
+        self._versions: dict[str, tuple[float, int]] = {}
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _vkey(self, ns: str) -> str:
+        return f"{self.prefix}:v:{ns}"
+
+    async def version(self, ns: str) -> int:
+        now = time.monotonic()
+        cached = self._versions.get(ns)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        v = await self.backend.counter(self._vkey(ns))
+        self._versions[ns] = (now + self.version_ttl_s, v)
+        return v
+
+    async def bump(self, ns: str) -> None:
+        """Все ключи ns устаревают (в этом процессе — сразу, в остальных — через version_ttl_s)."""
+        try:
+            v = await self.backend.incr(self._vkey(ns))
+            self._versions[ns] = (time.monotonic() + self.version_ttl_s, v)
+        except Exception as e:
+            self.errors += 1
+            log.warning("cache bump failed for %s: %r", ns, e)
+
+    async def _key(self, ns: str, key: str) -> str:
+        return f"{self.prefix}:{ns}:{await self.version(ns)}:{key}"
+
+    async def get_bytes(self, ns: str, key: str) -> bytes | None:
+        try:
+            raw = await self.backend.get(await self._key(ns, key))
+        except Exception as e:
+            self.errors += 1
+            log.warning("cache get failed for %s:%s: %r", ns, key, e)
+            return None
+        if raw is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return raw
+
+    async def set_bytes(self, ns: str, key: str, value: bytes, ttl_s: float) -> None:
+        try:
+            await self.backend.set(await self._key(ns, key), value, ttl_s)
+        except Exception as e:
+            self.errors += 1
+            log.warning("cache set failed for %s:%s: %r", ns, key, e)
+
+    async def get(self, ns: str, key: str) -> Any | None:
+        raw = await self.get_bytes(ns, key)
+        return None if raw is None else loads(raw)
+
+    async def set(self, ns: str, key: str, value: Any, ttl_s: float) -> None:
+        await self.set_bytes(ns, key, dumps(value), ttl_s)
+
+    async def get_or_set_bytes(self, ns: str, key: str, ttl_s: float, load: Callable[[], Awaitable[bytes]]) -> bytes:
+        raw = await self.get_bytes(ns, key)
+        if raw is not None:
+            return raw
+        flight = f"{ns}:{key}"
+        fut = self._inflight.get(flight)
+        if fut is not None:
+            return await asyncio.shield(fut)
+        fut = self._inflight[flight] = asyncio.get_running_loop().create_future()
+        try:
+            raw = await load()
+            await self.set_bytes(ns, key, raw, ttl_s)
+            fut.set_result(raw)
+            return raw
+        except BaseException as e:
+            fut.set_exception(e)
+            # исключение получил вызывающий; ждущие (если есть) получат его из future
+            fut.exception()
+            raise
+        finally:
+            del self._inflight[flight]
+
+    async def get_or_set(self, ns: str, key: str, ttl_s: float, load: Callable[[], Awaitable[Any]]) -> Any:
+        async def load_bytes() -> bytes:
+            return dumps(await load())
+
+        return loads(await self.get_or_set_bytes(ns, key, ttl_s, load_bytes))
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+def make_backend(kind: str, *, memory_max_entries: int, mmap_path: str, mmap_slots: int,
+                 mmap_slot_bytes: int, redis_url: str) -> CacheBackend:
+    if kind == "memory":
+        return MemoryBackend(memory_max_entries)
+    if kind == "mmap":
+        return MmapBackend(mmap_path, slots=mmap_slots, slot_bytes=mmap_slot_bytes)
+    if kind == "redis":
+        return RedisBackend(redis_url)
+    raise ValueError(f"unknown cache backend: {kind}")
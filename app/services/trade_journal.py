@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from dataclasses import dataclass, field
+
+from fastapi import HTTPException
+from sqlalchemy import select, insert, update, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db.bulk import bulk_upsert
+from app.db.models import Account, Position, PositionLot, Trade
+from app.db.repo.lots_repo import consume_lots
+from app.db.repo.trading import _resolve_instruments, _pick_price
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class _AccountState:
+    cash: float
+    # instrument_id -> [qty, avg_price]; подгружается по мере надобности
+    positions: dict[int, list[float]] = field(default_factory=dict)
+    stale: bool = False
+
+
+@dataclass
+class _Entry:
+    seq: int
+    account_id: int
+    instrument_id: int
+    secid: str
+    side: str
+    qty: float
+    px: float
+    avg_after: float
+    realized_avg: float
+    future: asyncio.Future
+    created: float
+
+
+class TradeJournal:
+    """
+    Режим приёма заявок с групповым коммитом (TRADE_INGEST_MODE=journal).
+
+    Заявка валидируется по состоянию счёта в памяти процесса, получает порядковый
+    номер в журнале и ждёт, пока flusher не запишет пачку (до max_batch заявок или
+    max_delay_ms) в trades/positions/accounts одной транзакцией. Ответ клиенту —
+    только после commit, т.е. когда заявка уже durable.
+
+    Состояние счёта в памяти считается верным, пока этот процесс — единственный,
+    кто меняет cash/позиции журнальных счетов (один воркер). Прочие записи
+    (исполнение отложенных заявок) должны вызывать invalidate().
+    """
+
+    def __init__(self, sessionmaker: async_sessionmaker, *, max_delay_ms: float, max_batch: int) -> None:
+        self._sessionmaker = sessionmaker
+        self.max_delay = max_delay_ms / 1000.0
+        self.max_batch = max_batch
+
+        self._states: dict[int, _AccountState] = {}
+        self._inflight: dict[int, int] = {}
+        self._locks: dict[int, asyncio.Lock] = {}
+        self._pending: list[_Entry] = []
+        self._seq = 0
+        self._wakeup = asyncio.Event()
+        self._full = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+
+        # для бенчмарка/метрик
+        self.batches = 0
+        self.entries = 0
+
+    # --- жизненный цикл ---
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        # без cancel: flusher дописывает текущую пачку и всё принятое, потом выходит сам
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        self._full.set()
+        try:
+            await self._task
+        finally:
+            self._task = None
+
+    def invalidate(self, account_id: int) -> None:
+        st = self._states.get(account_id)
+        if st is None:
+            return
+        if self._inflight.get(account_id, 0) == 0:
+            del self._states[account_id]
+        else:
+            st.stale = True
+
+    # --- приём заявок ---
+
+    async def submit(
+        self,
+        *,
+        account_id: int,
+        secid: str,
+        side: str,
+        qty: float,
+        price: float | None = None,
+        board: str = "TQBR",
+    ) -> dict:
+        if qty <= 0:
+            raise HTTPException(status_code=400, detail="qty must be > 0")
+        if self._task is None:
+            raise HTTPException(status_code=503, detail="Trade journal is not running")
+        secid = secid.upper()
+        qty = float(qty)
+
+        async with self._sessionmaker() as session:
+            resolved = await _resolve_instruments(session, [secid], board=board)
+            inst_id, px = _pick_price(resolved, secid, price, board)
+
+            # под локом счёта — чтение состояния (только при первом обращении) и работа с памятью
+            async with self._locks.setdefault(account_id, asyncio.Lock()):
+                st = await self._state(session, account_id, inst_id)
+                entry = self._append(st, account_id, inst_id, secid, side, qty, px)
+
+        return await entry.future
+
+    def _append(
+        self, st: _AccountState, account_id: int, inst_id: int, secid: str, side: str, qty: float, px: float,
+    ) -> _Entry:
+        if self._stopping or self._task is None or self._task.done():
+            # flusher уже может не вернуться за этой заявкой
+            raise HTTPException(status_code=503, detail="Trade journal is not running")
+        pos = st.positions[inst_id]
+        amount = qty * px
+        realized_avg = 0.0
+        if side == "BUY":
+            if st.cash < amount:
+                raise HTTPException(status_code=400, detail=f"Not enough cash: need {amount}, have {st.cash}")
+            new_qty = pos[0] + qty
+            pos[1] = (pos[0] * pos[1] + qty * px) / new_qty
+            pos[0] = new_qty
+            st.cash -= amount
+        elif side == "SELL":
+            if pos[0] < qty:
+                raise HTTPException(status_code=400, detail="Not enough position qty to sell")
+            realized_avg = (px - pos[1]) * qty
+            pos[0] -= qty
+            if pos[0] == 0:
+                pos[1] = 0.0
+            st.cash += amount
+        else:
+            raise HTTPException(status_code=400, detail=f"Unknown side: {side}")
+
+        self._seq += 1
+        entry = _Entry(
+            seq=self._seq,
+            account_id=account_id,
+            instrument_id=inst_id,
+            secid=secid,
+            side=side,
+            qty=qty,
+            px=px,
+            avg_after=pos[1],
+            realized_avg=realized_avg,
+            future=asyncio.get_running_loop().create_future(),
+            created=time.perf_counter(),
+        )
+        self._pending.append(entry)
+        self._inflight[account_id] = self._inflight.get(account_id, 0) + 1
+        self._wakeup.set()
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        return entry
+
+    async def _state(self, session: AsyncSession, account_id: int, instrument_id: int) -> _AccountState:
+        st = self._states.get(account_id)
+        if st is not None and st.stale and self._inflight.get(account_id, 0) == 0:
+            st = None
+        if st is None:
+            cash = (await session.execute(select(Account.cash).where(Account.id == account_id))).scalar_one_or_none()
+            if cash is None:
+                raise HTTPException(status_code=404, detail="Account not found")
+            st = self._states[account_id] = _AccountState(cash=float(cash))
+        if instrument_id not in st.positions:
+            row = (await session.execute(
+                select(Position.qty, Position.avg_price).where(
+                    Position.account_id == account_id,
+                    Position.instrument_id == instrument_id,
+                )
+            )).first()
+            st.positions[instrument_id] = [float(row[0]), float(row[1] or 0.0)] if row else [0.0, 0.0]
+        return st
+
+    # --- групповой коммит ---
+
+    def _take(self) -> list[_Entry]:
+        batch = self._pending[: self.max_batch]
+        self._pending = self._pending[self.max_batch:]
+        if not self._pending:
+            self._wakeup.clear()
+        if len(self._pending) < self.max_batch:
+            self._full.clear()
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            # копим до max_batch или до истечения бюджета задержки первой заявки (при остановке — не ждём)
+            first = self._pending[0].created if self._pending else time.perf_counter()
+            timeout = self.max_delay - (time.perf_counter() - first)
+            if not self._stopping and timeout > 0 and len(self._pending) < self.max_batch:
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            batch = self._take()
+            if batch:
+                await self._flush(batch)
+            if self._stopping and not self._pending:
+                return
+
+    def _fail(self, batch: list[_Entry], detail: str) -> None:
+        failed_accounts = {e.account_id for e in batch}
+        # то, что уже принято поверх непрошедших заявок тех же счетов, тоже невалидно
+        dropped = [e for e in self._pending if e.account_id in failed_accounts]
+        self._pending = [e for e in self._pending if e.account_id not in failed_accounts]
+        for e in batch + dropped:
+            self._inflight[e.account_id] -= 1
+            if not e.future.done():
+                e.future.set_exception(HTTPException(status_code=503, detail=detail))
+        for acc_id in failed_accounts:
+            self._states.pop(acc_id, None)
+
+    async def _flush(self, batch: list[_Entry]) -> None:
+        acc_rows: dict[int, dict] = {}
+        pos_rows: dict[tuple[int, int], dict] = {}
+        for e in batch:
+            amount = e.qty * e.px
+            acc = acc_rows.setdefault(e.account_id, {"b_id": e.account_id, "b_cash": 0.0, "b_rpnl": 0.0, "b_rpnl_fifo": 0.0})
+            acc["b_cash"] += -amount if e.side == "BUY" else amount
+            acc["b_rpnl"] += e.realized_avg
+            row = pos_rows.setdefault((e.account_id, e.instrument_id), {
+                "account_id": e.account_id, "instrument_id": e.instrument_id, "qty": 0.0, "avg_price": 0.0,
+                "fifo_cost": 0.0, "realized_pnl": 0.0, "realized_pnl_fifo": 0.0,
+            })
+            row["qty"] += e.qty if e.side == "BUY" else -e.qty
+            row["avg_price"] = e.avg_after  # журнал упорядочен — берём состояние после последней заявки
+            row["realized_pnl"] += e.realized_avg
+            if e.side == "BUY":
+                row["fifo_cost"] += amount
+
+        t = Account.__table__
+        now = datetime.utcnow()
+        try:
+            async with self._sessionmaker() as session:
+                await session.execute(insert(Trade), [
+                    {"account_id": e.account_id, "instrument_id": e.instrument_id,
+                     "side": e.side, "qty": e.qty, "price": e.px, "created_at": now}
+                    for e in batch
+                ])
+                # лоты всех покупок пачки — сразу; продажи пачки по построению покрываются более старыми лотами
+                buys = [e for e in batch if e.side == "BUY"]
+                if buys:
+                    await session.execute(insert(PositionLot), [
+                        {"account_id": e.account_id, "instrument_id": e.instrument_id, "qty": e.qty, "price": e.px}
+                        for e in buys
+                    ])
+                for e in batch:
+                    if e.side != "SELL":
+                        continue
+                    realized_fifo, cost = await consume_lots(
+                        session, account_id=e.account_id, instrument_id=e.instrument_id, qty=e.qty, price=e.px,
+                    )
+                    row = pos_rows[(e.account_id, e.instrument_id)]
+                    row["realized_pnl_fifo"] += realized_fifo
+                    row["fifo_cost"] -= cost
+                    acc_rows[e.account_id]["b_rpnl_fifo"] += realized_fifo
+
+                await session.execute(
+                    update(t).where(t.c.id == bindparam("b_id")).values(
+                        cash=t.c.cash + bindparam("b_cash"),
+                        realized_pnl=t.c.realized_pnl + bindparam("b_rpnl"),
+                        realized_pnl_fifo=t.c.realized_pnl_fifo + bindparam("b_rpnl_fifo"),
+                    ),
+                    list(acc_rows.values()),
+                )
+                # приращения — чтобы не затирать чужие записи; avg_price — итоговым значением
+                await bulk_upsert(
+                    session, Position, list(pos_rows.values()),
+                    index_elements=("account_id", "instrument_id"),
+                    update=lambda ex: [
+                        ("avg_price", ex.avg_price),
+                        ("qty", Position.qty + ex.qty),
+                        ("fifo_cost", Position.fifo_cost + ex.fifo_cost),
+                        ("realized_pnl", Position.realized_pnl + ex.realized_pnl),
+                        ("realized_pnl_fifo", Position.realized_pnl_fifo + ex.realized_pnl_fifo),
+                    ],
+                )
+                await session.commit()
+        except asyncio.CancelledError:
+            # задачу всё-таки отменили посреди пачки: исход commit неизвестен — ждущих не вешаем,
+            # состояние счетов перечитается из БД
+            log.warning("trade journal flush cancelled (%d entries)", len(batch))
+            self._fail(batch, "Trade journal stopped, trade state unknown")
+            raise
+        except Exception as exc:
+            log.exception("trade journal flush failed (%d entries)", len(batch))
+            self._fail(batch, f"Trade not persisted: {exc}")
+            return
+
+        self.batches += 1
+        self.entries += len(batch)
+        for e in batch:
+            self._inflight[e.account_id] -= 1
+            if not e.future.done():
+                e.future.set_result({"secid": e.secid, "side": e.side, "qty": e.qty, "price": e.px, "seq": e.seq})
+        for acc_id in acc_rows:
+            st = self._states.get(acc_id)
+            if st is not None and st.stale and self._inflight.get(acc_id, 0) == 0:
+                del self._states[acc_id]
@@ -0,0 +1,77 @@
+"""
+Стоимость сериализации ответа (без БД и сети), мкс на ответ:
+- stdlib    — как было: jsonable_encoder + JSONResponse (json.dumps);
+- default   — dict из роута при default_response_class=FastJSONResponse (jsonable_encoder + orjson);
+- direct    — роут сам возвращает FastJSONResponse (только orjson);
+- prebuilt  — готовые байты из кэша (ResponseCache / SharedCache.get_or_set_bytes).
+
+    python bench_json.py [repeats]
+"""
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse, Response
+
+from app.services.fast_json import FastJSONResponse, dumps, orjson
+
+
+def candles_payload(n: int) -> dict:
+    d0 = date(2020, 1, 1)
+    rng = np.random.default_rng(1)
+    close = 100 + rng.standard_normal(n).cumsum()
+    return {"secid": "SBER", "candles": [
+        {"t": (d0 + timedelta(i)).isoformat(), "open": float(c), "high": float(c) + 1, "low": float(c) - 1,
+         "close": float(c), "volume": 1000.0 + i}
+        for i, c in enumerate(close)
+    ], "source": "db"}
+
+
+def leaderboard_payload(n: int) -> dict:
+    return {"items": [
+        {"rank": i, "equity": 1e6 + i * 13.7, "cash": 5e5 - i, "user": {
+            "username": f"user{i}", "first_name": "Имя", "last_name": "Фамилия", "photo_url": None}}
+        for i in range(1, n + 1)
+    ]}
+
+
+def indicators_payload(n: int) -> tuple[dict, dict]:
+    # (как было: списки Python с None вместо NaN, как стало: колонки numpy)
+    days = np.arange(np.datetime64("2020-01-01"), np.datetime64("2020-01-01") + n)
+    sma = np.convolve(np.arange(n, dtype=float), np.ones(20) / 20, mode="full")[:n]
+    sma[:19] = np.nan
+    old = {"t": [str(d) for d in days], "series": {"sma:20": {"value": [None if np.isnan(v) else float(v) for v in sma]}}}
+    new = {"t": days.astype(str).tolist(), "series": {"sma:20": {"value": sma}}}
+    return old, new
+
+
+def bench(fn, repeats: int) -> float:
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - t0) / repeats * 1e6
+
+
+def main(repeats: int) -> None:
+    print(f"orjson: {'yes' if orjson is not None else 'NO (stdlib fallback)'}")
+    cases = {
+        "candles x1500": (candles_payload(1500), None),
+        "candles x5000": (candles_payload(5000), None),
+        "leaderboard x100": (leaderboard_payload(100), None),
+        "indicators x1500": indicators_payload(1500),
+    }
+    print(f"{'payload':<18} {'bytes':>8} {'stdlib':>9} {'default':>9} {'direct':>9} {'prebuilt':>9}  speedup")
+    for name, (payload, columns) in cases.items():
+        body = dumps(columns if columns is not None else payload)
+        t_std = bench(lambda: JSONResponse(jsonable_encoder(payload)), repeats)
+        t_def = bench(lambda: FastJSONResponse(jsonable_encoder(payload)), repeats)
+        t_dir = bench(lambda: FastJSONResponse(columns if columns is not None else payload), repeats)
+        t_pre = bench(lambda: Response(body, media_type="application/json"), repeats)
+        print(f"{name:<18} {len(body):>8} {t_std:>9.0f} {t_def:>9.0f} {t_dir:>9.0f} {t_pre:>9.1f}  x{t_std / t_dir:.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
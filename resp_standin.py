@@ -0,0 +1,93 @@
+"""
+Локальная замена Redis для разработки и проверки CACHE_BACKEND=redis:
+in-memory, RESP2, только команды, которые нужны app.services.shared_cache.
+
+    python resp_standin.py --port 6380
+    CACHE_BACKEND=redis CACHE_REDIS_URL=redis://127.0.0.1:6380/0 uvicorn app.main:app --workers 4
+"""
+import argparse
+import asyncio
+import time
+
+_data: dict[bytes, tuple[float | None, bytes]] = {}
+
+
+def _alive(key: bytes) -> bytes | None:
+    e = _data.get(key)
+    if e is None:
+        return None
+    if e[0] is not None and e[0] < time.monotonic():
+        del _data[key]
+        return None
+    return e[1]
+
+
+def _bulk(v: bytes | None) -> bytes:
+    return b"$-1\r\n" if v is None else b"$%d\r\n%s\r\n" % (len(v), v)
+
+
+def execute(args: list[bytes]) -> bytes:
+    cmd = args[0].upper()
+    if cmd == b"PING":
+        return b"+PONG\r\n"
+    if cmd in (b"SELECT", b"AUTH"):
+        return b"+OK\r\n"
+    if cmd == b"GET":
+        return _bulk(_alive(args[1]))
+    if cmd == b"SET":
+        expires = None
+        opts = [a.upper() for a in args[3:]]
+        if b"PX" in opts:
+            expires = time.monotonic() + int(args[3 + opts.index(b"PX") + 1]) / 1000
+        elif b"EX" in opts:
+            expires = time.monotonic() + int(args[3 + opts.index(b"EX") + 1])
+        _data[args[1]] = (expires, args[2])
+        return b"+OK\r\n"
+    if cmd == b"DEL":
+        return b":%d\r\n" % sum(_data.pop(k, None) is not None for k in args[1:])
+    if cmd == b"INCR":
+        v = int(_alive(args[1]) or 0) + 1
+        _data[args[1]] = (None, str(v).encode())
+        return b":%d\r\n" % v
+    if cmd == b"FLUSHALL":
+        _data.clear()
+        return b"+OK\r\n"
+    return b"-ERR unknown command '%s'\r\n" % args[0]
+
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            n = int(line[1:-2])
+            args = []
+            for _ in range(n):
+                size = int((await reader.readline())[1:-2])
+                args.append((await reader.readexactly(size + 2))[:-2])
+            writer.write(execute(args))
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host: str, port: int) -> asyncio.AbstractServer:
+    return await asyncio.start_server(handle, host, port)
+
+
+async def main(host: str, port: int) -> None:
+    server = await serve(host, port)
+    print(f"RESP stand-in on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=6380)
+    a = p.parse_args()
+    asyncio.run(main(a.host, a.port))
@@ -0,0 +1,58 @@
+import asyncio
+import os
+from datetime import date, datetime
+
+os.environ.setdefault("BOT_TOKEN", "test")
+os.environ.setdefault("DB_URL", "sqlite+aiosqlite://")
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker  # noqa: E402
+
+from app.db.models import Base, User, Account, Instrument, Candle, Trade  # noqa: E402
+from app.services.equity_curve import EquityCurves  # noqa: E402
+
+
+def _candle(d: date, close: float) -> Candle:
+    return Candle(secid="SBER", board="TQBR", interval=24, d=d, open=close, high=close, low=close, close=close, volume=1)
+
+
+def _buy(trade_id: int, at: datetime) -> Trade:
+    return Trade(id=trade_id, account_id=1, instrument_id=1, side="BUY", qty=1, price=100, created_at=at)
+
+
+async def _weekend_trade_survives_extends() -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    curves = EquityCurves()
+
+    async with Session() as s:
+        s.add(User(id=1, telegram_id=1))
+        s.add(Instrument(id=1, secid="SBER", board="TQBR", name="SBER"))
+        await s.flush()
+        s.add(Account(id=1, user_id=1, cash=900))
+        s.add_all([_candle(date(2024, 1, 4), 100), _candle(date(2024, 1, 5), 100)])  # чт, пт
+        s.add(_buy(1, datetime(2024, 1, 4, 12)))
+        await s.commit()
+        await curves.get(s, 1)
+
+        # покупка в субботу ложится на понедельник
+        s.add(_buy(2, datetime(2024, 1, 6, 12)))
+        s.add(_candle(date(2024, 1, 8), 100))
+        (await s.get(Account, 1)).cash = 800
+        await s.commit()
+        await curves.get(s, 1)
+
+        s.add(_candle(date(2024, 1, 9), 100))
+        await s.commit()
+        cached = await curves.history(s, 1)
+        fresh = await EquityCurves().history(s, 1)
+
+    await engine.dispose()
+    assert curves.extends == 2
+    assert cached == fresh
+    assert cached[-1] == {"t": "2024-01-09", "equity": 1000.0, "cash": 800.0, "positions_value": 200.0}
+
+
+def test_weekend_trade_survives_extends():
+    asyncio.run(_weekend_trade_survives_extends())
@@ -0,0 +1,52 @@
+import asyncio
+import os
+from datetime import datetime
+
+os.environ.setdefault("BOT_TOKEN", "test")
+os.environ.setdefault("DB_URL", "sqlite+aiosqlite://")
+
+from sqlalchemy import select  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker  # noqa: E402
+
+from app.db.init_db import init_db  # noqa: E402
+from app.db.models import Base, User, Account, Instrument, Position, PositionLot, Trade  # noqa: E402
+
+
+def _trade(trade_id: int, side: str, qty: float, price: float) -> Trade:
+    return Trade(id=trade_id, account_id=1, instrument_id=1, side=side, qty=qty, price=price,
+                 created_at=datetime(2024, 1, 1, 10, trade_id))
+
+
+async def _legacy_positions_get_lots() -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+
+    # состояние до position_lots: позиция по средней цене, fifo_cost=0, лотов нет
+    async with Session() as s:
+        s.add(User(id=1, telegram_id=1))
+        s.add(Instrument(id=1, secid="SBER", board="TQBR", name="SBER"))
+        await s.flush()
+        s.add(Account(id=1, user_id=1, cash=1000))
+        s.add_all([_trade(1, "BUY", 2, 100), _trade(2, "BUY", 2, 200), _trade(3, "SELL", 3, 300)])
+        s.add(Position(account_id=1, instrument_id=1, qty=1, avg_price=150))
+        await s.commit()
+
+    await init_db(engine)
+    await init_db(engine)  # повторный запуск ничего не меняет
+
+    async with Session() as s:
+        lots = (await s.execute(select(PositionLot.qty, PositionLot.price))).all()
+        pos = (await s.execute(select(Position))).scalar_one()
+        acc = await s.get(Account, 1)
+    await engine.dispose()
+
+    assert [tuple(r) for r in lots] == [(1.0, 200.0)]
+    assert (pos.qty, pos.fifo_cost) == (1.0, 200.0)
+    assert (pos.realized_pnl, pos.realized_pnl_fifo) == (450.0, 500.0)
+    assert (acc.realized_pnl, acc.realized_pnl_fifo) == (450.0, 500.0)
+
+
+def test_legacy_positions_get_lots():
+    asyncio.run(_legacy_positions_get_lots())
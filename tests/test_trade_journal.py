@@ -0,0 +1,97 @@
+import asyncio
+import os
+from datetime import date
+
+os.environ.setdefault("BOT_TOKEN", "test")
+os.environ.setdefault("DB_URL", "sqlite+aiosqlite://")
+
+from fastapi import HTTPException  # noqa: E402
+from sqlalchemy import select, func  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker  # noqa: E402
+
+from app.db.models import Base, User, Account, Instrument, Candle, Trade  # noqa: E402
+from app.services.trade_journal import TradeJournal  # noqa: E402
+
+
+class _SlowSessions:
+    # sessionmaker, у которого открытие сессии для записи пачки занимает delay секунд
+    def __init__(self, maker: async_sessionmaker) -> None:
+        self.maker = maker
+        self.delay = 0.0
+
+    def __call__(self):
+        session = self.maker()
+        delay = self.delay
+
+        class _Ctx:
+            async def __aenter__(self):
+                await asyncio.sleep(delay)
+                return await session.__aenter__()
+
+            async def __aexit__(self, *exc):
+                return await session.__aexit__(*exc)
+
+        return _Ctx()
+
+
+async def _setup():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    async with Session() as s:
+        s.add(User(id=1, telegram_id=1))
+        s.add(Instrument(id=1, secid="SBER", board="TQBR", name="SBER"))
+        await s.flush()
+        s.add(Account(id=1, user_id=1, cash=1000))
+        s.add(Candle(secid="SBER", board="TQBR", interval=24, d=date(2024, 1, 1),
+                     open=10, high=10, low=10, close=10, volume=1))
+        await s.commit()
+    return engine, Session
+
+
+async def _stop_flushes_pending() -> None:
+    engine, Session = await _setup()
+    journal = TradeJournal(Session, max_delay_ms=60_000, max_batch=100)
+    journal.start()
+    orders = [asyncio.create_task(journal.submit(account_id=1, secid="SBER", side="BUY", qty=1)) for _ in range(5)]
+    await asyncio.sleep(0.1)  # все приняты и ждут бюджета задержки
+
+    await journal.stop()
+    fills = await asyncio.gather(*orders)
+    async with Session() as s:
+        trades = (await s.execute(select(func.count()).select_from(Trade))).scalar_one()
+    await engine.dispose()
+
+    assert [f["seq"] for f in fills] == [1, 2, 3, 4, 5]
+    assert trades == 5
+    assert journal._inflight == {1: 0}
+
+
+async def _cancel_mid_flush_releases_waiters() -> None:
+    engine, Session = await _setup()
+    sessions = _SlowSessions(Session)
+    journal = TradeJournal(sessions, max_delay_ms=50, max_batch=100)
+    journal.start()
+    orders = [asyncio.create_task(journal.submit(account_id=1, secid="SBER", side="BUY", qty=1)) for _ in range(3)]
+    await asyncio.sleep(0.02)  # приняты, пачка ещё копится
+    sessions.delay = 0.5
+    await asyncio.sleep(0.1)  # пачка внутри _flush
+
+    journal._task.cancel()
+    res = await asyncio.wait_for(asyncio.gather(*orders, return_exceptions=True), 2)
+    states_after_cancel = dict(journal._states)
+    late = await asyncio.gather(journal.submit(account_id=1, secid="SBER", side="BUY", qty=1), return_exceptions=True)
+    await engine.dispose()
+
+    assert all(isinstance(r, HTTPException) and r.status_code == 503 for r in res + late)
+    assert journal._inflight == {1: 0}
+    assert states_after_cancel == {}
+
+
+def test_stop_flushes_pending():
+    asyncio.run(_stop_flushes_pending())
+
+
+def test_cancel_mid_flush_releases_waiters():
+    asyncio.run(_cancel_mid_flush_releases_waiters())